@@ -0,0 +1,182 @@
+"""
+Ingredient co-occurrence and "frequently used with" neighbors from the product join table
+
+Builds a sparse product x ingredient matrix from product_ingredients (the output of
+process_ingredients.py) and derives, per ingredient:
+
+    - co-occurrence counts: products containing both ingredients (B^T B on the 0/1 matrix)
+    - position-weighted cosine similarity: the same product on a matrix weighted by list
+      position, so two ingredients near the top of many lists (high concentration) score
+      higher than two trace ingredients that happen to share products
+    - the top-k neighbors by similarity, written as ingredient_neighbors.csv
+
+B^T B is computed a block of ingredient rows at a time. Block sizes come from an upper
+bound on each row's non-zeros, so the working set stays under `max_block_nnz` entries
+however many ingredients the catalog has, and only the top-k of each block is kept.
+
+Usage:
+    python ingredient_cooccurrence.py [--input-dir DIR] [--top-k 20] [--weighting log|inverse|none]
+                                      [--min-count 2] [--max-block-nnz N]
+
+    python process_ingredients.py ... --neighbors 20   # same stage after the export (csv and/or parquet)
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+INPUT_DIR = os.environ.get("DERMODEL_OUTPUT_DIR", "/Users/jaewookang/Downloads/jaewookng/projects/dermodel")
+NEIGHBOR_COLUMNS = ["ingredient_id", "neighbor_id", "rank", "cooccurrence", "similarity"]
+
+DEFAULT_TOP_K = 20
+DEFAULT_MIN_COUNT = 2             # pairs seen in a single product are noise
+DEFAULT_MAX_BLOCK_NNZ = 20_000_000  # ~250 MB of intermediate products per block
+
+# Weight of an ingredient at list position p (1 = first, highest concentration)
+WEIGHTINGS = {
+    "log": lambda p: 1 / np.log2(p + 1),
+    "inverse": lambda p: 1 / p,
+    "none": lambda p: np.ones(len(p)),
+}
+
+
+def product_matrices(product_codes, ingredient_codes, positions, shape, weighting="log"):
+    """0/1 and position-weighted product x ingredient CSR matrices (duplicate pairs keep the lowest position)."""
+    pairs = pd.DataFrame({"p": product_codes, "i": ingredient_codes, "position": positions})
+    pairs = pairs.sort_values("position", kind="stable").drop_duplicates(subset=["p", "i"])
+    rows, cols = pairs["p"].to_numpy(), pairs["i"].to_numpy()
+
+    binary = sp.csr_matrix((np.ones(len(pairs), dtype=np.float32), (rows, cols)), shape=shape)
+    weights = WEIGHTINGS[weighting](pairs["position"].to_numpy(dtype=np.float64)).astype(np.float32)
+    weighted = sp.csr_matrix((weights, (rows, cols)), shape=shape)
+    return binary, weighted
+
+
+def row_blocks(binary, max_block_nnz):
+    """[start, stop) ingredient ranges whose B^T B rows hold at most ~max_block_nnz entries."""
+    n_ingredients = binary.shape[1]
+    # Row i of B^T B has at most (sum of the sizes of products containing i) non-zeros
+    bound = binary.T @ binary.getnnz(axis=1).astype(np.float64)
+    cumulative = np.cumsum(np.minimum(bound, n_ingredients))
+
+    blocks, start = [], 0
+    while start < n_ingredients:
+        already = cumulative[start - 1] if start else 0
+        stop = int(np.searchsorted(cumulative, already + max_block_nnz, side="right"))
+        stop = min(max(stop, start + 1), n_ingredients)  # a single dense row still gets a block
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def top_neighbors(counts, dots, start, norms, top_k, min_count):
+    """(row, neighbor, rank, count, similarity) arrays for one block of B^T B / W^T W rows."""
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr)) + start
+    cols = counts.indices
+    similarity = dots.data / (norms[rows] * norms[cols])
+    keep = (cols != rows) & (counts.data >= min_count)
+    rows, cols, count, similarity = rows[keep], cols[keep], counts.data[keep], similarity[keep]
+
+    # Best first within each row; ties go to the more frequent pair, then the lower code
+    order = np.lexsort((cols, -count, -similarity, rows))
+    rows, cols, count, similarity = rows[order], cols[order], count[order], similarity[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") + 1
+    keep = rank <= top_k
+    return rows[keep], cols[keep], rank[keep], count[keep], similarity[keep]
+
+
+def iter_neighbors(join_table_df, top_k=DEFAULT_TOP_K, weighting="log", min_count=DEFAULT_MIN_COUNT,
+                   max_block_nnz=DEFAULT_MAX_BLOCK_NNZ):
+    """Yield ingredient_neighbors DataFrame blocks from a product_id/ingredient_id/position join table."""
+    product_codes, product_ids = pd.factorize(join_table_df["product_id"])
+    ingredient_codes, ingredient_ids = pd.factorize(join_table_df["ingredient_id"])
+    shape = (len(product_ids), len(ingredient_ids))
+    binary, weighted = product_matrices(
+        product_codes, ingredient_codes, join_table_df["position"].to_numpy(), shape, weighting
+    )
+    ingredient_ids = np.asarray(ingredient_ids, dtype=object)
+
+    binary_t, weighted_t = binary.T.tocsr(), weighted.T.tocsr()
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=0)).ravel())
+
+    for start, stop in row_blocks(binary, max_block_nnz):
+        counts = (binary_t[start:stop] @ binary).tocsr()
+        dots = (weighted_t[start:stop] @ weighted).tocsr()
+        counts.sort_indices()
+        dots.sort_indices()
+        # Both products share one sparsity pattern (weights are positive), so their data aligns
+        if not np.array_equal(counts.indptr, dots.indptr):
+            raise AssertionError("co-occurrence and similarity patterns differ")
+
+        rows, cols, rank, count, similarity = top_neighbors(counts, dots, start, norms, top_k, min_count)
+        yield pd.DataFrame({
+            "ingredient_id": ingredient_ids[rows],
+            "neighbor_id": ingredient_ids[cols],
+            "rank": rank.astype(np.int16),
+            "cooccurrence": count.astype(np.int64),
+            "similarity": similarity.round(4),
+        })
+
+
+def export_neighbors(join_table_df, sink, **options):
+    """Stream every neighbor block into `sink` (anything with write(df)); returns (rows, seconds)."""
+    started = time.perf_counter()
+    rows = 0
+    for block in iter_neighbors(join_table_df, **options):
+        sink.write(block)
+        rows += len(block)
+    return rows, time.perf_counter() - started
+
+
+def read_join_table(input_dir):
+    """product_ingredients from Parquet when present, else CSV."""
+    parquet_path = os.path.join(input_dir, "product_ingredients.parquet")
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    return pd.read_csv(os.path.join(input_dir, "product_ingredients.csv"),
+                       dtype={"product_id": str, "ingredient_id": str})
+
+
+class CsvSink:
+    """Append DataFrame blocks to one CSV file."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.rows = 0
+
+    def write(self, df):
+        df.to_csv(self.file, header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.rows == 0:
+            self.write(pd.DataFrame(columns=NEIGHBOR_COLUMNS))
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingredient co-occurrence neighbors from product_ingredients")
+    parser.add_argument("--input-dir", default=INPUT_DIR, help="process_ingredients.py output directory")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="neighbors kept per ingredient")
+    parser.add_argument("--weighting", choices=sorted(WEIGHTINGS), default="log",
+                        help="position weight for the similarity (default: log = 1/log2(position + 1))")
+    parser.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT,
+                        help="ignore pairs found together in fewer products")
+    parser.add_argument("--max-block-nnz", type=int, default=DEFAULT_MAX_BLOCK_NNZ,
+                        help="bound on intermediate matrix entries per block (memory)")
+    args = parser.parse_args()
+
+    join_table_df = read_join_table(args.input_dir)
+    sink = CsvSink(os.path.join(args.input_dir, "ingredient_neighbors.csv"))
+    rows, elapsed = export_neighbors(join_table_df, sink, top_k=args.top_k, weighting=args.weighting,
+                                     min_count=args.min_count, max_block_nnz=args.max_block_nnz)
+    sink.close()
+    print(f"✅ ingredient_neighbors.csv: {rows} rows from {len(join_table_df)} relationships in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
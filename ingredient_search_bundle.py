@@ -0,0 +1,422 @@
+"""
+Static ingredient autocomplete bundle for the frontend
+
+The ingredient search box queries Supabase on every debounced keystroke. This builds one
+static file from the processed ingredients table (plus FDA / COSING name lists) that the
+frontend downloads once and searches locally, and a Python reader with the same lookup.
+
+A search term matches every name with a word starting with it ("hyal" finds Sodium
+Hyaluronate and Hyaluronic Acid), most used (product_count) first.
+
+Bundle layout (little-endian; every section starts at a multiple of 4 bytes):
+
+    b"DSB1", uint32 header length, header JSON (version, counts, section offsets/lengths)
+    terms          word-start suffixes of every casefolded name (search_key), sorted and
+                   front-coded: per term varint(shared prefix bytes), varint(suffix
+                   bytes), suffix; the shared length restarts at 0 every `block` terms
+    term_blocks    uint32 byte offset of each restart block (binary search on its first term)
+    term_entries   uint32 entry of each term
+    names          display names in entry order, front-coded the same way
+    name_blocks    uint32 byte offset of each names block
+    counts         uint32 product_count per entry (0 for FDA / COSING-only names)
+    id_slots       uint32 row in `ids` per entry, 0xFFFFFFFF without an ingredient_id
+    ids            16 raw bytes per ingredient_id (UUID)
+    prefixes       front-coded prefixes (single block) whose term range exceeds
+                   `scan_limit`; their completions are precomputed
+    top            uint32 [prefixes x top_k] best entries per prefix, 0xFFFFFFFF padded
+
+A lookup binary-searches the block heads, decodes at most two blocks to find the term
+range of the query, then either reads the precomputed top-k (large ranges) or ranks the
+at most `scan_limit` terms in range. Text compresses well on top of this: --compress
+writes .gz (and .br with the brotli package) next to the bundle for static hosting.
+
+Usage:
+    python ingredient_search_bundle.py [--input-dir DIR] [--names fda.txt --names cosing.txt]
+                                       [--output public/ingredient_search.bin] [--compress]
+    python ingredient_search_bundle.py --bundle public/ingredient_search.bin --query hyal
+    python ingredient_search_bundle.py --benchmark [--input-dir DIR | --synthetic 30000]
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import uuid
+import struct
+import argparse
+from bisect import bisect_left
+from functools import lru_cache
+
+import numpy as np
+
+from process_ingredients import OUTPUT_DIR, read_table
+
+# Optional: brotli-compressed copy (--compress)
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+MAGIC = b"DSB1"
+VERSION = 1
+BLOCK = 16            # terms per front-coding restart
+DEFAULT_TOP_K = 10    # precomputed completions per prefix
+SCAN_LIMIT = 256      # larger term ranges get precomputed completions
+NONE = 0xFFFFFFFF
+DEFAULT_OUTPUT = "public/ingredient_search.bin"
+
+# name_key of the canonicalizer, but letters outside ASCII are kept: "Crème" is not "cr me"
+SEARCH_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def search_key(name):
+    """Casefolded key: letters (any script) and digits only, single-spaced."""
+    return SEARCH_SEPARATORS.sub(' ', name.casefold()).strip()
+
+
+# ---------- ENCODING ----------
+def varint(value, out):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, at):
+    value, shift = 0, 0
+    while True:
+        byte = data[at]
+        at += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, at
+        shift += 7
+
+
+def front_code(strings, block=BLOCK):
+    """(blob, block offsets) of `strings` front-coded against their predecessor, restarting every `block`."""
+    blob, offsets = bytearray(), []
+    previous = b""
+    for i, string in enumerate(strings):
+        encoded = string.encode()
+        if i % block == 0:
+            offsets.append(len(blob))
+            previous = b""
+        shared = 0
+        limit = min(len(previous), len(encoded))
+        while shared < limit and previous[shared] == encoded[shared]:
+            shared += 1
+        varint(shared, blob)
+        varint(len(encoded) - shared, blob)
+        blob += encoded[shared:]
+        previous = encoded
+    return bytes(blob), np.asarray(offsets, dtype=np.uint32)
+
+
+def decode_block(blob, start, count):
+    """Up to `count` strings of the block starting at byte `start`."""
+    strings, previous, at = [], b"", start
+    while len(strings) < count and at < len(blob):
+        shared, at = read_varint(blob, at)
+        length, at = read_varint(blob, at)
+        previous = previous[:shared] + bytes(blob[at:at + length])
+        at += length
+        strings.append(previous.decode())
+    return strings
+
+
+def word_starts(key):
+    """Every suffix of `key` that starts a word: "sodium hyaluronate" -> itself and "hyaluronate"."""
+    return [key] + [key[i + 1:] for i, char in enumerate(key) if char == " "]
+
+
+# ---------- BUILD ----------
+def collect_entries(ingredients_df, extra_names=()):
+    """[(key, display name, product_count, ingredient_id or None)] with one entry per search_key.
+
+    Processed ingredients win over FDA / COSING spellings; the most used spelling is shown.
+    """
+    entries = {}
+    rows = ingredients_df.sort_values("product_count", ascending=False, kind="stable")
+    for name, count, ingredient_id in zip(rows["ingredient_name"], rows["product_count"], rows["ingredient_id"]):
+        if not isinstance(name, str) or not search_key(name):
+            continue
+        count = 0 if count != count else int(count)  # NaN
+        entry = entries.get(search_key(name))
+        if entry is None:
+            entries[search_key(name)] = [name, count, ingredient_id]
+        else:
+            entry[1] += count
+    for name in extra_names:
+        key = search_key(name) if isinstance(name, str) else ""
+        if key and key not in entries:
+            entries[key] = [name.strip(), 0, None]
+    return [(key, *entry) for key, entry in sorted(entries.items())]
+
+
+def build_bundle(ingredients_df, extra_names=(), top_k=DEFAULT_TOP_K, scan_limit=SCAN_LIMIT, block=BLOCK):
+    """The bundle bytes for these ingredients (see the module docstring for the layout)."""
+    entries = collect_entries(ingredients_df, extra_names)
+    counts = np.asarray([min(count, NONE) for _, _, count, _ in entries], dtype=np.uint32)
+
+    terms = sorted((term, code) for code, (key, _, _, _) in enumerate(entries) for term in word_starts(key))
+    term_strings = [term for term, _ in terms]
+    term_entries = np.asarray([code for _, code in terms], dtype=np.uint32)
+
+    # Prefixes whose term range is too large to rank on every keystroke, with their top-k
+    # (only those ranges are split further: every longer prefix of a small range is small too)
+    prefixes, top = [], []
+    pending = [(0, len(term_strings), 1)]  # term range sharing a prefix of length - 1
+    while pending:
+        lo, hi, length = pending.pop()
+        start = lo
+        while start < hi:
+            if len(term_strings[start]) < length:
+                start += 1
+                continue
+            prefix = term_strings[start][:length]
+            stop = bisect_left(term_strings, prefix + "\U0010ffff", start, hi)
+            if stop - start > scan_limit:
+                prefixes.append(prefix)
+                top.append(best_entries(term_entries[start:stop], counts, top_k))
+                pending.append((start, stop, length + 1))
+            start = stop
+    order = sorted(range(len(prefixes)), key=prefixes.__getitem__)
+    prefixes = [prefixes[i] for i in order]
+    top_table = np.full((len(prefixes), top_k), NONE, dtype=np.uint32)
+    for row, i in enumerate(order):
+        top_table[row, :len(top[i])] = top[i]
+
+    id_slots = np.full(len(entries), NONE, dtype=np.uint32)
+    ids = bytearray()
+    for code, (_, _, _, ingredient_id) in enumerate(entries):
+        if ingredient_id is not None and ingredient_id == ingredient_id:
+            id_slots[code] = len(ids) // 16
+            ids += uuid.UUID(str(ingredient_id)).bytes
+
+    terms_blob, term_blocks = front_code(term_strings, block)
+    names_blob, name_blocks = front_code([name for _, name, _, _ in entries], block)
+    prefixes_blob, _ = front_code(prefixes, max(1, len(prefixes)))
+    sections = {
+        "terms": terms_blob, "term_blocks": term_blocks.tobytes(), "term_entries": term_entries.tobytes(),
+        "names": names_blob, "name_blocks": name_blocks.tobytes(), "counts": counts.tobytes(),
+        "id_slots": id_slots.tobytes(), "ids": bytes(ids), "prefixes": prefixes_blob, "top": top_table.tobytes(),
+    }
+
+    header = {"version": VERSION, "entries": len(entries), "terms": len(term_strings), "prefixes": len(prefixes),
+              "block": block, "top_k": top_k, "scan_limit": scan_limit, "sections": {}}
+    body, offset = bytearray(), 0
+    for name, data in sections.items():
+        header["sections"][name] = [offset, len(data)]
+        body += data + b"\0" * (-len(data) % 4)
+        offset = len(body)
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    header_bytes += b" " * (-(len(header_bytes) + 8) % 4)
+    return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + bytes(body)
+
+
+def best_entries(entries, counts, limit):
+    """Distinct entries, highest product_count first (ties: lower entry code, i.e. alphabetical)."""
+    entries = np.unique(entries).astype(np.uint64)
+    keys = ((NONE - counts[entries].astype(np.uint64)) << np.uint64(32)) | entries  # unique, so ties are exact
+    if len(keys) > limit:
+        keys = np.partition(keys, limit - 1)[:limit]
+    return (np.sort(keys) & np.uint64(NONE)).astype(np.uint32)
+
+
+# ---------- READER ----------
+class SearchBundle:
+    """Prefix search over a bundle from build_bundle, decoding only the blocks a query touches."""
+
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError("not an ingredient search bundle")
+        (header_length,) = struct.unpack_from("<I", data, 4)
+        self.header = json.loads(data[8:8 + header_length])
+        if self.header["version"] != VERSION:
+            raise ValueError(f"unsupported bundle version {self.header['version']}")
+        base = 8 + header_length
+        view = memoryview(data)
+        section = {name: view[base + start:base + start + length]
+                   for name, (start, length) in self.header["sections"].items()}
+
+        self.block = self.header["block"]
+        self.top_k = self.header["top_k"]
+        self.scan_limit = self.header["scan_limit"]
+        self.n_terms = self.header["terms"]
+        self.terms = section["terms"]
+        self.term_blocks = np.frombuffer(section["term_blocks"], dtype=np.uint32)
+        self.term_entries = np.frombuffer(section["term_entries"], dtype=np.uint32)
+        self.names = section["names"]
+        self.name_blocks = np.frombuffer(section["name_blocks"], dtype=np.uint32)
+        self.counts = np.frombuffer(section["counts"], dtype=np.uint32)
+        self.id_slots = np.frombuffer(section["id_slots"], dtype=np.uint32)
+        self.ids = section["ids"]
+        prefixes = decode_block(section["prefixes"], 0, self.header["prefixes"])
+        top = np.frombuffer(section["top"], dtype=np.uint32).reshape(-1, self.top_k)
+        self.top = dict(zip(prefixes, top))
+        self.heads = [decode_block(self.terms, int(start), 1)[0] for start in self.term_blocks]
+        self.term_block = lru_cache(maxsize=4096)(self._term_block)
+        self.name_block = lru_cache(maxsize=4096)(self._name_block)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def _term_block(self, b):
+        return decode_block(self.terms, int(self.term_blocks[b]), self.block)
+
+    def _name_block(self, b):
+        return decode_block(self.names, int(self.name_blocks[b]), self.block)
+
+    def lower_bound(self, key):
+        """Index of the first term >= key."""
+        if not self.heads:
+            return 0
+        b = max(bisect_left(self.heads, key) - 1, 0)  # a run of equal terms can span blocks
+        return b * self.block + bisect_left(self.term_block(b), key)
+
+    def name(self, code):
+        return self.name_block(code // self.block)[code % self.block]
+
+    def ingredient_id(self, code):
+        slot = self.id_slots[code]
+        return None if slot == NONE else str(uuid.UUID(bytes=bytes(self.ids[16 * slot:16 * slot + 16])))
+
+    def entry(self, code):
+        code = int(code)
+        return {"name": self.name(code), "product_count": int(self.counts[code]), "ingredient_id": self.ingredient_id(code)}
+
+    def search(self, query, limit=DEFAULT_TOP_K):
+        """Best entries with a word starting with `query`, as dicts (name, product_count, ingredient_id)."""
+        key = search_key(query)
+        if not key or limit <= 0:
+            return []
+        precomputed = self.top.get(key)
+        if precomputed is not None and limit <= self.top_k:
+            codes = precomputed[precomputed != NONE][:limit]
+        else:
+            lo, hi = self.lower_bound(key), self.lower_bound(key + "\U0010ffff")
+            codes = best_entries(self.term_entries[lo:hi], self.counts, limit)
+        return [self.entry(code) for code in codes]
+
+    def stats(self):
+        return {name: self.header[name] for name in ("entries", "terms", "prefixes", "top_k")}
+
+
+# ---------- CLI ----------
+def read_names(paths):
+    """Names from text files, one per line (e.g. exported FDA / COSING name columns)."""
+    names = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            names.extend(line.strip() for line in f if line.strip())
+    return names
+
+
+def write_bundle(data, output, compress=False):
+    """Write the bundle (and .gz / .br copies with `compress`), returns {file: bytes}."""
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    files = {output: data}
+    if compress:
+        files[output + ".gz"] = gzip.compress(data, compresslevel=9, mtime=0)
+        if HAS_BROTLI:
+            files[output + ".br"] = brotli.compress(data, quality=11)
+    for path, content in files.items():
+        with open(path, "wb") as f:
+            f.write(content)
+    return {path: len(content) for path, content in files.items()}
+
+
+def synthetic_ingredients(n_ingredients, seed=0):
+    """ingredients table with INCI-style names (scripts/synthetic_catalog.py) and Zipf product counts."""
+    import sys
+    import pandas as pd
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+    from synthetic_catalog import inci_vocabulary
+
+    names = inci_vocabulary(n_ingredients, seed)  # most common first
+    return pd.DataFrame({
+        "ingredient_id": [str(uuid.uuid5(uuid.NAMESPACE_DNS, name)) for name in names],
+        "ingredient_name": names,
+        "product_count": (300_000 / np.arange(1, len(names) + 1) ** 1.1).astype(np.int64),
+    })
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {f"p{q}": round(float(np.percentile(samples, q)), 1) for q in (50, 90, 99)}
+
+
+def benchmark(ingredients_df, extra_names=(), top_k=DEFAULT_TOP_K, queries=5000):
+    """Build time, bundle size (raw / gzip / brotli), load time and lookup latency."""
+    started = time.perf_counter()
+    data = build_bundle(ingredients_df, extra_names, top_k)
+    build_seconds = time.perf_counter() - started
+    sizes = {"raw": len(data), "gzip": len(gzip.compress(data, compresslevel=9))}
+    if HAS_BROTLI:
+        sizes["brotli"] = len(brotli.compress(data, quality=11))
+    plain = sum(len(name.encode()) + 1 for name in ingredients_df["ingredient_name"].dropna())
+
+    started = time.perf_counter()
+    bundle = SearchBundle(data)
+    load_seconds = time.perf_counter() - started
+    print(f"Bundle: {bundle.stats()}, built in {build_seconds:.2f}s, loaded in {load_seconds * 1000:.1f}ms")
+    print(f"Size (KB): " + ", ".join(f"{kind} {size / 1024:,.0f}" for kind, size in sizes.items())
+          + f" (names alone: {plain / 1024:,.0f})")
+
+    rng = np.random.default_rng(1)
+    names = ingredients_df["ingredient_name"].dropna().to_numpy()
+    for length in (1, 2, 3, 5, 8):
+        samples = []
+        for code in rng.integers(0, len(names), queries // 5):
+            words = search_key(names[code]).split()
+            query = words[rng.integers(len(words))][:length] if words else ""
+            started = time.perf_counter()
+            bundle.search(query)
+            samples.append(time.perf_counter() - started)
+        print(f"  {length}-char queries (us): {percentiles(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static ingredient autocomplete bundle for the frontend")
+    parser.add_argument("--input-dir", default=OUTPUT_DIR, help="process_ingredients.py output directory")
+    parser.add_argument("--names", action="append", default=[],
+                        help="extra names, one per line (FDA / COSING exports); repeatable")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"bundle file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="precomputed completions per prefix")
+    parser.add_argument("--compress", action="store_true", help="also write .gz (and .br with brotli installed)")
+    parser.add_argument("--bundle", help="search an existing bundle with --query instead of building one")
+    parser.add_argument("--query", help="print the completions of this query")
+    parser.add_argument("--benchmark", action="store_true", help="time build, size, load and lookups, then exit")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="benchmark N synthetic ingredients")
+    args = parser.parse_args()
+
+    if args.bundle:
+        bundle = SearchBundle.load(args.bundle)
+        for result in bundle.search(args.query or "", args.top_k):
+            print(f"{result['product_count']:>8}  {result['name']}  {result['ingredient_id'] or ''}")
+        return
+
+    ingredients_df = synthetic_ingredients(args.synthetic) if args.synthetic else read_table(args.input_dir, "ingredients")
+    extra_names = read_names(args.names)
+    if args.benchmark:
+        benchmark(ingredients_df, extra_names, args.top_k)
+        return
+
+    started = time.perf_counter()
+    data = build_bundle(ingredients_df, extra_names, args.top_k)
+    sizes = write_bundle(data, args.output, args.compress)
+    print(f"✅ Search bundle: {SearchBundle(data).stats()} in {time.perf_counter() - started:.2f}s")
+    for path, size in sizes.items():
+        print(f"   - {path}: {size / 1024:,.0f} KB")
+    if args.query:
+        for result in SearchBundle(data).search(args.query, args.top_k):
+            print(f"{result['product_count']:>8}  {result['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Ingredient frequency and position statistics over integer-coded ingredients
+
+STEP 4 / STEP 8 of process_ingredients.py used to hash every ingredient string several
+times (drop_duplicates, value_counts, groupby mean, then .map back by name). IngredientStats
+works on the integer codes from one pd.factorize instead and aggregates with np.bincount,
+so one pass over the occurrences yields:
+
+    - product_count: occurrences per ingredient (as before)
+    - avg_position: mean list position, rounded to 2 decimals (as before)
+    - median_position / p90_position: nearest-rank percentiles of the list position
+    - top5_rate: share of occurrences among the first five ingredients of a list
+    - category_count, plus per-(ingredient, category) counts when a category column
+      (e.g. brand) is given
+
+Positions are kept as a per-ingredient histogram of POSITION_BINS bins (the last one holds
+every later position), so memory is linear in the vocabulary, not in the occurrences, and
+chunks can be added one at a time (streaming mode). Percentiles beyond the last bin report
+POSITION_BINS.
+
+Usage:
+    stats = IngredientStats()
+    stats.add(codes, positions, n_ingredients, categories=brands)   # once, or per chunk
+    stats.table(ingredient_ids)             # STATS_COLUMNS
+    stats.category_table(ingredient_ids)    # CATEGORY_COLUMNS
+
+    python ingredient_stats.py --benchmark 5000000   # string-keyed pandas vs integer codes
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+POSITION_BINS = 64  # positions 1..63 exactly, 64+ share the last bin
+TOP_POSITIONS = 5
+STATS_COLUMNS = ["ingredient_id", "product_count", "avg_position", "median_position", "p90_position",
+                 "top5_rate", "category_count"]
+CATEGORY_COLUMNS = ["ingredient_id", "category", "product_count"]
+
+
+class IngredientStats:
+    """Per-ingredient counters indexed by ingredient code; arrays grow with the vocabulary."""
+
+    def __init__(self, position_bins=POSITION_BINS):
+        self.bins = position_bins
+        self.occurrences = np.zeros(0, dtype=np.int64)
+        self.position_sum = np.zeros(0, dtype=np.int64)
+        self.histogram = np.zeros((0, position_bins), dtype=np.int32)
+        self.category_codes = {}  # category -> code, first-seen order
+        self.category_pairs = pd.Series(dtype=np.int64)  # (ingredient << 32 | category) -> occurrences
+
+    def __len__(self):
+        return len(self.occurrences)
+
+    def grow(self, size):
+        if size <= len(self):
+            return
+        extra = size - len(self)
+        self.occurrences = np.concatenate([self.occurrences, np.zeros(extra, dtype=np.int64)])
+        self.position_sum = np.concatenate([self.position_sum, np.zeros(extra, dtype=np.int64)])
+        self.histogram = np.vstack([self.histogram, np.zeros((extra, self.bins), dtype=np.int32)])
+
+    def add(self, codes, positions, size=None, categories=None):
+        """Fold in occurrences: ingredient codes, their list positions and optional categories."""
+        codes = np.asarray(codes, dtype=np.int64)
+        positions = np.asarray(positions, dtype=np.int64)
+        self.grow(size if size is not None else int(codes.max()) + 1 if len(codes) else 0)
+        size = len(self)
+        if len(codes) == 0:
+            return
+
+        self.occurrences += np.bincount(codes, minlength=size)
+        self.position_sum += np.bincount(codes, weights=positions, minlength=size).astype(np.int64)
+        bins = np.minimum(positions, self.bins) - 1
+        histogram = np.bincount(codes * self.bins + bins, minlength=size * self.bins)
+        self.histogram += histogram.reshape(size, self.bins).astype(np.int32)
+
+        if categories is not None:
+            self.add_categories(codes, categories)
+
+    def add_categories(self, codes, categories):
+        categories = pd.Series(np.asarray(categories, dtype=object))
+        present = categories.notna().to_numpy()
+        chunk_codes, uniques = pd.factorize(categories[present])
+        mapping = np.fromiter((self.category_codes.setdefault(name, len(self.category_codes)) for name in uniques),
+                              dtype=np.int64, count=len(uniques))
+        keys = (codes[present] << 32) | mapping[chunk_codes]
+        keys, counts = np.unique(keys, return_counts=True)
+        self.category_pairs = self.category_pairs.add(pd.Series(counts, index=keys), fill_value=0).astype(np.int64)
+
+    def mean_position(self):
+        """avg_position: mean list position rounded to 2 decimals (NaN for unseen codes)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.position_sum / self.occurrences).round(2)
+
+    def position_quantile(self, q):
+        """Nearest-rank q-quantile of each ingredient's position (NaN for unseen codes)."""
+        rank = np.maximum(np.ceil(q * self.occurrences), 1)
+        below = (self.histogram.cumsum(axis=1) < rank[:, None]).sum(axis=1)
+        return np.where(self.occurrences > 0, below + 1, np.nan)
+
+    def top_rate(self, top=TOP_POSITIONS):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.histogram[:, :top].sum(axis=1) / self.occurrences).round(4)
+
+    def category_count(self):
+        """Distinct categories each ingredient occurs in (0 without categories)."""
+        ingredients = self.category_pairs.index.to_numpy(dtype=np.int64) >> 32
+        return np.bincount(ingredients, minlength=len(self))
+
+    def table(self, ingredient_ids):
+        """One row per ingredient code, in code order (ingredient_ids must be in the same order)."""
+        return pd.DataFrame({
+            "ingredient_id": ingredient_ids,
+            "product_count": self.occurrences,
+            "avg_position": self.mean_position(),
+            "median_position": self.position_quantile(0.5),
+            "p90_position": self.position_quantile(0.9),
+            "top5_rate": self.top_rate(),
+            "category_count": self.category_count(),
+        })
+
+    def category_table(self, ingredient_ids):
+        """Occurrences per (ingredient, category), by ingredient code then category first-seen order."""
+        keys = np.sort(self.category_pairs.index.to_numpy(dtype=np.int64))
+        categories = np.asarray(list(self.category_codes), dtype=object)
+        return pd.DataFrame({
+            "ingredient_id": np.asarray(ingredient_ids, dtype=object)[keys >> 32],
+            "category": categories[keys & 0xFFFFFFFF],
+            "product_count": self.category_pairs.loc[keys].to_numpy(),
+        })
+
+
+def stats_from_names(ingredients, positions, categories=None):
+    """Factorize ingredient names once; returns (names in first-seen order, IngredientStats)."""
+    codes, names = pd.factorize(np.asarray(ingredients, dtype=object))
+    stats = IngredientStats()
+    stats.add(codes, positions, len(names), categories)
+    return names, stats
+
+
+def benchmark(occurrences, vocabulary=30_000, seed=0):
+    """Time the string-keyed pandas STEP 4 / STEP 8 against stats_from_names; check they agree."""
+    rng = np.random.default_rng(seed)
+    names = np.asarray([f"INGREDIENT {i}" for i in range(vocabulary)], dtype=object)
+    ingredients = names[np.minimum(rng.zipf(1.3, occurrences), vocabulary) - 1]
+    positions = rng.integers(1, 40, occurrences)
+    expanded_df = pd.DataFrame({"ingredient": ingredients, "position": positions})
+
+    started = time.perf_counter()
+    unique = expanded_df["ingredient"].drop_duplicates().reset_index(drop=True)
+    counts = unique.map(expanded_df["ingredient"].value_counts())
+    averages = unique.map(expanded_df.groupby("ingredient")["position"].mean().round(2))
+    pandas_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    order, stats = stats_from_names(ingredients, positions)
+    codes_seconds = time.perf_counter() - started
+
+    if not (np.array_equal(order, unique.to_numpy()) and np.array_equal(stats.occurrences, counts.to_numpy())
+            and np.allclose(stats.mean_position(), averages.to_numpy())):
+        raise AssertionError("integer-coded statistics differ from the pandas ones")
+    print(f"{occurrences} occurrences, {len(order)} ingredients")
+    print(f"  pandas (strings): {pandas_seconds:.2f}s")
+    print(f"  integer codes:    {codes_seconds:.2f}s (position histogram: {stats.histogram.nbytes / 2**20:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integer-coded ingredient statistics")
+    parser.add_argument("--benchmark", type=int, metavar="N", required=True,
+                        help="compare against the string-keyed pandas version on N synthetic occurrences")
+    args = parser.parse_args()
+    benchmark(args.benchmark)
+
+
+if __name__ == "__main__":
+    main()
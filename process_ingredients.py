@@ -1,162 +1,679 @@
+"""
+Product / ingredient tables for Supabase from the raw product catalog (sss.csv)
+
+Splits every product's ingredient list into normalized ingredient names and writes three
+tables: products, ingredients (product_count, avg_position) and product_ingredients (the
+join table, with each ingredient's list position). Ids are UUIDv5 of the normalized names,
+so a product or ingredient keeps its id from one run to the next.
+
+    - Vectorized: ingredient lists are split, cleaned and title-cased with pandas string
+      operations (casing once per distinct name) and ids are joined with factorize/index
+      lookups; the original row-by-row code is kept as the reference in
+      tests/test_process_ingredients.py
+    - Sharded (--workers): ingredient cells are parsed on a process pool, and the
+      shard-local codes are merged back in input order
+    - Streaming (--chunksize): the catalog is read in chunks, only the name maps and
+      counters stay in memory, and join rows are spooled to disk until written
+
+The batch, sharded and streaming runs write byte-identical CSVs (checked by the tests).
+
+Usage:
+    python process_ingredients.py [--input sss.csv] [--output-dir DIR] [--chunksize N] [--workers N]
+                                  [--format csv|parquet|both] [--previous-dir DIR]
+                                  [--neighbors K] [--weighting log|inverse|none]
+                                  [--stats] [--category-column COLUMN]
+
+    --chunksize streams the input instead of loading it whole; memory then scales with the
+    number of distinct products/ingredients rather than with ingredient occurrences.
+    --workers parses and normalizes ingredient lists on N processes; output does not
+    depend on the worker count.
+    --previous-dir diffs the new tables against an earlier run's CSVs and writes only the
+    new/changed/removed rows to OUTPUT_DIR/delta/ for an incremental load. The previous run
+    is read from its .parquet files when present.
+    --format parquet writes columnar tables (needs pyarrow); the join table is stored with
+    dictionary-encoded ids and an int16 position.
+    --neighbors also writes ingredient_neighbors: the K ingredients most often used with
+    each ingredient, by position-weighted co-occurrence (see ingredient_cooccurrence.py).
+    --stats also writes ingredient_stats: median/p90 position and first-five rate per
+    ingredient (see ingredient_stats.py); with --category-column (e.g. brand) it counts
+    categories per ingredient and writes ingredient_category_counts.
+"""
+
+import argparse
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import re
+import numpy as np
 import uuid
 
-"""
-ORIGINAL APPROACH WITH MINIMAL IMPROVEMENTS
-This is a simplified version based on your original code with just essential enhancements.
-"""
+from ingredient_normalizer import PARENTHESES_PATTERN, TRAILING_PUNCTUATION, Normalizer
+from ingredient_stats import IngredientStats, stats_from_names
+
+# Optional: Parquet output (--format parquet) needs pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Optional: ingredient neighbors (--neighbors) need scipy
+try:
+    from ingredient_cooccurrence import NEIGHBOR_COLUMNS, export_neighbors
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# Defaults for --input / --output-dir; the environment overrides them (benchmarks, CI)
+INPUT_CSV = os.environ.get("DERMODEL_INPUT_CSV", "/Users/jaewookang/Downloads/sss.csv")
+OUTPUT_DIR = os.environ.get("DERMODEL_OUTPUT_DIR", "/Users/jaewookang/Downloads/jaewookng/projects/dermodel")
+INPUT_DTYPES = {"product_name": str, "ingredients": str}
 
 # ---------- STEP 1: load CSV ----------
-df = pd.read_csv("/Users/jaewookang/Downloads/sss.csv")
-
-# ---------- STEP 2: Helper functions ----------
-def remove_parentheses(text):
-    """Remove anything inside parentheses () including the parentheses."""
-    return re.sub(r'\([^)]*\)', '', text)
-
-def normalize_ingredient(name):
-    """Clean spacing and unify formatting."""
-    if not isinstance(name, str):
-        return None
-    
-    # Remove parentheses content
-    name = remove_parentheses(name)
-    
-    # Remove extra whitespace and normalize spaces
-    name = ' '.join(name.split())
-    
-    # Remove trailing punctuation
-    name = name.rstrip(",.;:/")
-    
-    # Title case for consistency (preserves common acronyms)
-    if name and len(name) > 1:
-        # Keep common cosmetic acronyms uppercase
-        acronyms = ['PEG', 'PPG', 'CI', 'MEA', 'DEA', 'TEA', 'SLS', 'SLES']
-        words = name.split()
-        for i, word in enumerate(words):
-            if any(word.upper().startswith(acr) for acr in acronyms):
-                words[i] = word.upper()
-            else:
-                words[i] = word.title()
-        name = ' '.join(words)
-    
-    return name if name else None
-
-def split_ingredients(cell):
-    """Split ingredients by comma and clean them."""
-    if not isinstance(cell, str):
-        return []
-    
-    items = cell.split(',')
-    cleaned = [normalize_ingredient(i) for i in items]
-    # remove empty or None
-    return [x for x in cleaned if x]
-
-# ---------- STEP 3: Expand each product to multiple ingredient rows ----------
-records = []
-for idx, row in df.iterrows():
-    product_name = row["product_name"]
-    ingredient_cell = row["ingredients"]
-    ingredients = split_ingredients(ingredient_cell)
-    
-    # Track position for each ingredient (important for concentration)
-    for position, ing in enumerate(ingredients, 1):
-        records.append({
-            "product_name": product_name,
-            "ingredient": ing,
-            "position": position  # Added: position in ingredient list
-        })
+def load_products(path):
+    """Load the raw product catalog (needs product_name and ingredients columns)."""
+    return drop_unnamed(pd.read_csv(path, dtype=INPUT_DTYPES))
+
+def drop_unnamed(df):
+    """Skip rows without a product name (sss_products.product_name is NOT NULL)."""
+    return df[df["product_name"].notna()]
+
+def check_category_column(path, category_column):
+    """Raise ValueError if `category_column` is set but not in the header of `path`."""
+    if category_column and category_column not in pd.read_csv(path, nrows=0).columns:
+        raise ValueError(f"{path} has no column {category_column!r}")
+
+# ---------- STEP 2 / STEP 3: Normalize names, expand each product to multiple ingredient rows ----------
+# The original row-by-row helpers are the reference in tests/test_process_ingredients.py
+def normalize_ingredient_series(tokens, normalizer):
+    """Vectorized normalize_ingredient over a Series of raw tokens."""
+    cleaned = (
+        tokens
+        .str.replace(PARENTHESES_PATTERN, '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+        .str.rstrip(TRAILING_PUNCTUATION)
+    )
+    # Casing only depends on the cleaned string, so run it once per distinct name
+    codes, uniques = pd.factorize(cleaned)
+    cased = np.array([normalizer.title_case(u) for u in uniques] + [None], dtype=object)
+    return pd.Series(cased[codes], index=tokens.index, dtype=object)
+
+def expand_ingredient_cells(cells, normalizer):
+    """Split + explode + normalize a column of ingredient lists.
+
+    Returns (row, ingredient, position) arrays, where row is the 0-based row of `cells`.
+    """
+    cells = cells.reset_index(drop=True)
+    cells = cells.where(cells.map(lambda c: isinstance(c, str)))
+    tokens = cells.astype(object).str.split(',').explode()
+    tokens = tokens[tokens.notna()]
+
+    ingredients = normalize_ingredient_series(tokens, normalizer)
+    ingredients = ingredients[ingredients.notna().to_numpy()]
+
+    # explode keeps the source row label, so positions restart for every product row
+    rows = ingredients.index.to_numpy(dtype=np.int64)
+    positions = ingredients.groupby(level=0, sort=False).cumcount() + 1
+    return rows, ingredients.to_numpy(), positions.to_numpy(dtype=np.int64)
+
+def expand_products(df, normalizer=None, carry=()):
+    """Vectorized STEP 3: split + explode, normalize, number positions per product row.
+
+    `carry` columns of `df` (e.g. a category) are copied onto every ingredient row.
+    """
+    rows, ingredients, positions = expand_ingredient_cells(df["ingredients"], normalizer or Normalizer())
+
+    if len(rows) == 0:
+        return pd.DataFrame(columns=["product_name", "ingredient", "position", *carry])
+
+    expanded_df = pd.DataFrame({
+        "product_name": df["product_name"].to_numpy()[rows],
+        "ingredient": ingredients,
+        "position": positions,
+        **{column: df[column].to_numpy()[rows] for column in carry},
+    })
+    return expanded_df.infer_objects()
+
+# ---------- PARALLEL PARSING (--workers) ----------
+SHARD_ROWS = 50_000
+_shard_normalizer = None
+
+def expand_shard(cells):
+    """Worker: expand one shard of ingredient cells into local codes + shard vocabulary.
+
+    Returns (row, code, vocabulary, position); vocabulary is in first-seen order.
+    """
+    global _shard_normalizer
+    if _shard_normalizer is None:
+        _shard_normalizer = Normalizer()
+    rows, ingredients, positions = expand_ingredient_cells(cells, _shard_normalizer)
+    codes, vocabulary = pd.factorize(ingredients)
+    return rows, codes, np.asarray(vocabulary, dtype=object), positions
+
+def map_ordered(fn, items, workers):
+    """map(fn, items) over a process pool, in input order, with at most 2 * workers items in flight."""
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def merge_shard_codes(codes, vocabulary, codes_by_name):
+    """Translate shard-local codes to global ones, growing `codes_by_name` in first-seen order."""
+    mapping = np.fromiter(
+        (codes_by_name.setdefault(name, len(codes_by_name)) for name in vocabulary),
+        dtype=np.int64, count=len(vocabulary),
+    )
+    return mapping[codes]
 
-expanded_df = pd.DataFrame(records)
+def expand_products_parallel(df, workers, carry=()):
+    """STEP 3 sharded across `workers` processes; identical to expand_products."""
+    df = df.reset_index(drop=True)
+    shard_rows = max(1, min(SHARD_ROWS, -(-len(df) // workers)))
+    starts = range(0, len(df), shard_rows)
+    shards = (df["ingredients"].iloc[start:start + shard_rows] for start in starts)
+
+    # Shards are merged in input order, so first-seen order does not depend on `workers`
+    codes_by_name = {}
+    rows, codes, positions = [], [], []
+    for start, (shard_rows_, shard_codes, vocabulary, shard_positions) in zip(
+            starts, map_ordered(expand_shard, shards, workers)):
+        rows.append(shard_rows_ + start)
+        codes.append(merge_shard_codes(shard_codes, vocabulary, codes_by_name))
+        positions.append(shard_positions)
+
+    if not codes_by_name:
+        return pd.DataFrame(columns=["product_name", "ingredient", "position", *carry])
+
+    rows = np.concatenate(rows)
+    vocabulary = np.asarray(list(codes_by_name), dtype=object)
+    expanded_df = pd.DataFrame({
+        "product_name": df["product_name"].to_numpy()[rows],
+        "ingredient": vocabulary[np.concatenate(codes)],
+        "position": np.concatenate(positions),
+        **{column: df[column].to_numpy()[rows] for column in carry},
+    })
+    return expanded_df.infer_objects()
 
 # ---------- STEP 4: Create UNIQUE ingredient list ----------
-unique_ingredients_df = (
-    expanded_df["ingredient"]
-    .drop_duplicates()
-    .reset_index(drop=True)
-    .to_frame()
-)
+def unique_ingredients(expanded_df, category_column=None):
+    """Unique ingredients in first-seen order with their statistics (see ingredient_stats.py).
+
+    The names are hashed once (one factorize); counts, positions and categories are then
+    aggregated on integer codes in that same first-seen order.
+    """
+    categories = expanded_df[category_column] if category_column else None
+    names, ingredient_stats = stats_from_names(expanded_df["ingredient"], expanded_df["position"], categories)
 
-# Add frequency count (how many products contain each ingredient)
-ingredient_counts = expanded_df["ingredient"].value_counts()
-unique_ingredients_df["product_count"] = unique_ingredients_df["ingredient"].map(ingredient_counts)
+    # Frequency count (how many products contain each ingredient)
+    unique_ingredients_df = pd.DataFrame({"ingredient": names, "product_count": ingredient_stats.occurrences})
+    return unique_ingredients_df, ingredient_stats
 
 # ---------- STEP 5: Assign UUIDs to products + ingredients ----------
-# (You may replace this with Supabase-generated UUIDs later)
-product_ids = {
-    name: str(uuid.uuid4()) for name in df["product_name"].unique()
-}
+# UUIDv5 of the (normalized) name, so the same product/ingredient keeps its id across runs
+PRODUCT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "products.dermodel.app")
+INGREDIENT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "ingredients.dermodel.app")
 
-ingredient_ids = {
-    ing: str(uuid.uuid4()) for ing in unique_ingredients_df["ingredient"].unique()
-}
+def stable_id(namespace, name):
+    return str(uuid.uuid5(namespace, str(name)))
+
+def assign_ids(product_names, ingredient_names):
+    """Map every product name and ingredient name to its deterministic UUID."""
+    product_ids = {
+        name: stable_id(PRODUCT_NAMESPACE, name) for name in product_names
+    }
+
+    ingredient_ids = {
+        ing: stable_id(INGREDIENT_NAMESPACE, ing) for ing in ingredient_names
+    }
+    return product_ids, ingredient_ids
 
 # ---------- STEP 6: Build JOIN TABLE ----------
-join_rows = []
-for _, row in expanded_df.iterrows():
-    join_rows.append({
-        "product_id": product_ids[row["product_name"]],
-        "ingredient_id": ingredient_ids[row["ingredient"]],
-        "position": row["position"]  # Added: preserve position info
-    })
+def dedupe_join_table(join_table_df):
+    """Remove duplicates - keep first occurrence (lowest position = highest concentration)."""
+    # Stable sort so ties keep input order and the output is reproducible
+    return join_table_df.sort_values('position', kind='stable').drop_duplicates(
+        subset=['product_id', 'ingredient_id'],
+        keep='first'
+    ).reset_index(drop=True)
+
+def lookup_ids(values, ids):
+    """Vectorized dict lookup: integer codes into the key order of `ids`."""
+    codes = pd.Index(list(ids.keys())).get_indexer(values)
+    if (codes < 0).any():
+        raise KeyError(f"{(codes < 0).sum()} values have no assigned id")
+    return np.asarray(list(ids.values()), dtype=object)[codes]
 
-join_table_df = pd.DataFrame(join_rows)
+def build_join_table(expanded_df, product_ids, ingredient_ids):
+    """Vectorized STEP 6 using integer codes instead of per-row dict lookups."""
+    join_table_df = pd.DataFrame({
+        "product_id": lookup_ids(expanded_df["product_name"], product_ids),
+        "ingredient_id": lookup_ids(expanded_df["ingredient"], ingredient_ids),
+        "position": expanded_df["position"].to_numpy(),
+    }).infer_objects()
 
-# Remove duplicates - keep first occurrence (lowest position = highest concentration)
-join_table_df = join_table_df.sort_values('position').drop_duplicates(
-    subset=['product_id', 'ingredient_id'], 
-    keep='first'
-).reset_index(drop=True)
+    return dedupe_join_table(join_table_df)
 
 # ---------- STEP 7: Create Product Table ----------
-products_df = pd.DataFrame({
-    "product_id": list(product_ids.values()),
-    "product_name": list(product_ids.keys())
-})
+def build_products_table(expanded_df, product_ids):
+    products_df = pd.DataFrame({
+        "product_id": list(product_ids.values()),
+        "product_name": list(product_ids.keys())
+    })
 
-# Add ingredient count per product
-ingredient_counts_per_product = expanded_df.groupby("product_name").size()
-products_df["ingredient_count"] = products_df["product_name"].map(ingredient_counts_per_product)
+    # Add ingredient count per product
+    ingredient_counts_per_product = expanded_df.groupby("product_name").size()
+    products_df["ingredient_count"] = products_df["product_name"].map(ingredient_counts_per_product)
+    return products_df
 
 # ---------- STEP 8: Create Ingredient Table ----------
-ingredients_df = pd.DataFrame({
-    "ingredient_id": list(ingredient_ids.values()),
-    "ingredient_name": list(ingredient_ids.keys())
-})
+def build_ingredients_table(ingredient_ids, ingredient_stats):
+    """STEP 8: ingredient_ids and the stats share first-seen order, so nothing is looked up by name."""
+    return pd.DataFrame({
+        "ingredient_id": list(ingredient_ids.values()),
+        "ingredient_name": list(ingredient_ids.keys()),
+        # Product count per ingredient
+        "product_count": ingredient_stats.occurrences,
+        # Average position (lower = typically higher concentration)
+        "avg_position": ingredient_stats.mean_position(),
+    })
+
+def process(df, workers=1, category_column=None):
+    """Run STEP 3 - STEP 8, returning (products_df, ingredients_df, join_table_df, ingredient_stats)."""
+    carry = (category_column,) if category_column else ()
+    expanded_df = expand_products_parallel(df, workers, carry) if workers > 1 else expand_products(df, carry=carry)
+    unique_ingredients_df, ingredient_stats = unique_ingredients(expanded_df, category_column)
+    product_ids, ingredient_ids = assign_ids(df["product_name"].unique(), unique_ingredients_df["ingredient"])
+    join_table_df = build_join_table(expanded_df, product_ids, ingredient_ids)
+    products_df = build_products_table(expanded_df, product_ids)
+    ingredients_df = build_ingredients_table(ingredient_ids, ingredient_stats)
+    return products_df, ingredients_df, join_table_df, ingredient_stats
+
+# ---------- TABLE OUTPUT (CSV / Parquet) ----------
+FORMATS = {"csv": ("csv",), "parquet": ("parquet",), "both": ("csv", "parquet")}
+TEXT_COLUMNS = ["product_id", "product_name", "ingredient_id", "ingredient_name"]
+
+if HAS_PYARROW:
+    # Join table: dictionary-encoded ids (int32 surrogate keys + one copy of each UUID)
+    # and a small-int position instead of two 36-char strings and an int64 per row
+    PARQUET_SCHEMAS = {
+        "product_ingredients": pa.schema([
+            ("product_id", pa.dictionary(pa.int32(), pa.string())),
+            ("ingredient_id", pa.dictionary(pa.int32(), pa.string())),
+            ("position", pa.int16()),
+        ]),
+    }
+
+class TableSink:
+    """Append DataFrame blocks of one table to <table>.csv and/or <table>.parquet."""
+
+    def __init__(self, output_dir, table, columns, formats=("csv",)):
+        if "parquet" in formats and not HAS_PYARROW:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.columns = columns
+        self.csv = open(f"{output_dir}/{table}.csv", "w", newline="") if "csv" in formats else None
+        self.parquet_path = f"{output_dir}/{table}.parquet" if "parquet" in formats else None
+        self.parquet_schema = PARQUET_SCHEMAS.get(table) if HAS_PYARROW else None
+        self.parquet = None
+        self.rows = 0
 
-# Add product count per ingredient
-ingredients_df["product_count"] = ingredients_df["ingredient_name"].map(ingredient_counts)
+    def write(self, df):
+        if self.csv:
+            df.to_csv(self.csv, header=self.rows == 0, index=False)
+        if self.parquet_path:
+            block = pa.Table.from_pandas(df, schema=self.parquet_schema, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.parquet_path, block.schema)
+            self.parquet.write_table(block)
+        self.rows += len(df)
 
-# Calculate average position (lower = typically higher concentration)
-avg_position = expanded_df.groupby("ingredient")["position"].mean().round(2)
-ingredients_df["avg_position"] = ingredients_df["ingredient_name"].map(avg_position)
+    def close(self):
+        if self.rows == 0 and (self.csv or self.parquet is None):
+            self.write(pd.DataFrame(columns=self.columns))
+        if self.csv:
+            self.csv.close()
+        if self.parquet:
+            self.parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_table(output_dir, table):
+    """Load one exported table, from Parquet when available (no CSV re-parse), else CSV."""
+    parquet_path = f"{output_dir}/{table}.parquet"
+    if HAS_PYARROW and os.path.exists(parquet_path):
+        return pq.read_table(parquet_path).to_pandas()
+    return pd.read_csv(f"{output_dir}/{table}.csv", dtype={c: str for c in TEXT_COLUMNS})
+
+# ---------- STREAMING MODE (--chunksize) ----------
+def grow(values, size, fill=0):
+    """Return `values` padded with `fill` up to `size` entries."""
+    if len(values) >= size:
+        return values
+    return np.concatenate([values, np.full(size - len(values), fill, dtype=values.dtype)])
+
+def encode(names, codes_by_name):
+    """Integer codes for `names`, adding unseen names to `codes_by_name` in first-seen order."""
+    chunk_codes, uniques = pd.factorize(np.asarray(names, dtype=object), use_na_sentinel=False)
+    mapping = np.empty(len(uniques), dtype=np.int64)
+    for i, name in enumerate(uniques):
+        mapping[i] = codes_by_name.setdefault(name, len(codes_by_name))
+    return mapping[chunk_codes]
+
+class StreamingProcessor:
+    """
+    Chunked STEP 3 - STEP 8 producing the same three CSVs as the batch path.
+
+    Only the product/ingredient maps and per-name counters stay in memory. Join rows are
+    spooled to disk as int32 code pairs, one file per position, so product_ingredients.csv
+    can be written in (position, input order) order without holding every row at once.
+    """
+
+    JOIN_BLOCK_ROWS = 1_000_000
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        self.product_codes = {}
+        self.ingredient_codes = {}
+        self.product_rows = np.zeros(0, dtype=np.int64)          # ingredient rows per product
+        self.product_last_chunk = np.zeros(0, dtype=np.int64)
+        self.product_multi_chunk = np.zeros(0, dtype=bool)       # needs cross-chunk dedupe
+        self.ingredient_stats = IngredientStats()                # occurrences, positions per ingredient
+        self.spools = {}
+        self.chunks = 0
+
+    def add_chunk(self, product_names, shard, categories=None):
+        """Fold one expanded chunk (see expand_shard) into the maps, counters and join spools."""
+        product_codes = encode(product_names, self.product_codes)
+        n_products = len(self.product_codes)
+        self.product_rows = grow(self.product_rows, n_products)
+        self.product_last_chunk = grow(self.product_last_chunk, n_products, fill=-1)
+        self.product_multi_chunk = grow(self.product_multi_chunk, n_products, fill=False)
+
+        seen = np.unique(product_codes)
+        last = self.product_last_chunk[seen]
+        self.product_multi_chunk[seen] |= (last >= 0) & (last != self.chunks)
+        self.product_last_chunk[seen] = self.chunks
+        self.chunks += 1
+
+        rows, codes, vocabulary, positions = shard
+        if len(rows) == 0:
+            return
+
+        pcodes = product_codes[rows]
+        icodes = merge_shard_codes(codes, vocabulary, self.ingredient_codes)
+        n_ingredients = len(self.ingredient_codes)
+        self.product_rows += np.bincount(pcodes, minlength=n_products)
+        if categories is not None:
+            categories = np.asarray(categories, dtype=object)[rows]
+        self.ingredient_stats.add(icodes, positions, n_ingredients, categories)
+
+        # Same rule as dedupe_join_table, applied within the chunk
+        pairs = pd.DataFrame({"p": pcodes, "i": icodes, "position": positions})
+        keep = ~pairs.sort_values("position", kind="stable").duplicated(subset=["p", "i"]).sort_index()
+        pairs = pairs[keep.to_numpy()]
+
+        for position, group in pairs.groupby("position", sort=False):
+            spool = self.spools.get(position)
+            if spool is None:
+                spool = self.spools[position] = open(os.path.join(self.spool_dir, f"position_{position}.bin"), "wb")
+            group[["p", "i"]].to_numpy(dtype=np.int32).tofile(spool)
+
+    def products_table(self, product_ids):
+        """STEP 7 from the running counters."""
+        counts = pd.Series(self.product_rows)
+        if (self.product_rows == 0).any():
+            # Batch path leaves products without ingredients as NaN
+            counts = counts.where(counts > 0)
+        return pd.DataFrame({
+            "product_id": product_ids,
+            "product_name": list(self.product_codes.keys()),
+            "ingredient_count": counts,
+        })
+
+    def ingredients_table(self, ingredient_ids):
+        """STEP 8 from the running counters."""
+        return pd.DataFrame({
+            "ingredient_id": ingredient_ids,
+            "ingredient_name": list(self.ingredient_codes.keys()),
+            "product_count": self.ingredient_stats.occurrences,
+            "avg_position": self.ingredient_stats.mean_position(),
+        })
+
+    def write_join_table(self, sink, product_ids, ingredient_ids):
+        """STEP 6: replay the spools in position order into `sink`, dropping cross-chunk duplicates."""
+        product_ids = np.asarray(product_ids, dtype=object)
+        ingredient_ids = np.asarray(ingredient_ids, dtype=object)
+        seen_pairs = set()  # only for products whose rows span several chunks
+        sample = None
+
+        for spool in self.spools.values():
+            spool.close()
+
+        with sink:
+            for position in sorted(self.spools):
+                with open(self.spools[position].name, "rb") as spool:
+                    while True:
+                        pairs = np.fromfile(spool, dtype=np.int32, count=2 * self.JOIN_BLOCK_ROWS).reshape(-1, 2)
+                        if len(pairs) == 0:
+                            break
+                        keep = np.ones(len(pairs), dtype=bool)
+                        for j in np.flatnonzero(self.product_multi_chunk[pairs[:, 0]]):
+                            key = (int(pairs[j, 0]), int(pairs[j, 1]))
+                            if key in seen_pairs:
+                                keep[j] = False
+                            else:
+                                seen_pairs.add(key)
+                        pairs = pairs[keep]
+
+                        block = pd.DataFrame({
+                            "product_id": product_ids[pairs[:, 0]],
+                            "ingredient_id": ingredient_ids[pairs[:, 1]],
+                            "position": np.full(len(pairs), position, dtype=np.int64),
+                        })
+                        sink.write(block)
+                        if sample is None:
+                            sample = block.head()
+                os.remove(self.spools[position].name)
+
+        return sink.rows, sample
+
+def process_streaming(path, chunksize, output_dir, workers=1, formats=("csv",), stats=False, category_column=None):
+    """Streaming STEP 1 - STEP 8: read `path` in chunks and write the tables to `output_dir`."""
+    check_category_column(path, category_column)  # before anything is written
+    product_rows = deque()  # (product names, categories) of each chunk in flight
+
+    def ingredient_cells():
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=INPUT_DTYPES):
+            chunk = drop_unnamed(chunk)
+            product_rows.append((chunk["product_name"], chunk[category_column] if category_column else None))
+            yield chunk["ingredients"]
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as spool_dir:
+        stream = StreamingProcessor(spool_dir)
+        for shard in map_ordered(expand_shard, ingredient_cells(), workers):
+            product_names, categories = product_rows.popleft()
+            stream.add_chunk(product_names, shard, categories)
+
+        product_ids, ingredient_ids = assign_ids(list(stream.product_codes), list(stream.ingredient_codes))
+        products_df = stream.products_table(list(product_ids.values()))
+        ingredients_df = stream.ingredients_table(list(ingredient_ids.values()))
+        for table, table_df in (("products", products_df), ("ingredients", ingredients_df)):
+            with TableSink(output_dir, table, list(table_df.columns), formats) as sink:
+                sink.write(table_df)
+        join_sink = TableSink(output_dir, "product_ingredients", ["product_id", "ingredient_id", "position"], formats)
+        relationships, join_sample = stream.write_join_table(
+            join_sink, list(product_ids.values()), list(ingredient_ids.values())
+        )
+        if stats:
+            write_stats(stream.ingredient_stats, list(ingredient_ids.values()), output_dir, formats)
+
+    return products_df, ingredients_df, join_sample, relationships
+
+# ---------- DIFF AGAINST PREVIOUS RUN (--previous-dir) ----------
+TABLE_KEYS = {
+    "products": ["product_id"],
+    "ingredients": ["ingredient_id"],
+    "product_ingredients": ["product_id", "ingredient_id"],
+}
+OUTPUT_FILES = [f"{table}.csv" for table in TABLE_KEYS]
+
+def diff_table(current, previous, key):
+    """Rows of `current` that are new or changed vs `previous`, plus keys only in `previous`."""
+    merged = current.merge(previous, on=key, how="outer", suffixes=("", "_previous"), indicator=True)
+    changed = merged["_merge"] == "left_only"
+    both = merged["_merge"] == "both"
+    for column in current.columns.difference(key):
+        new, old = merged[column], merged[f"{column}_previous"]
+        changed |= both & (new != old) & ~(new.isna() & old.isna())
+    removed = merged.loc[merged["_merge"] == "right_only", key]
+    return merged.loc[changed, list(current.columns)], removed
+
+def write_deltas(output_dir, previous_dir):
+    """Write OUTPUT_DIR/delta/<table>.csv (new or changed rows) and <table>_removed.csv (keys)."""
+    delta_dir = os.path.join(output_dir, "delta")
+    os.makedirs(delta_dir, exist_ok=True)
+
+    print(f"\n🔁 Changes since {previous_dir}:")
+    for table, key in TABLE_KEYS.items():
+        current, previous = (
+            read_table(directory, table).astype({c: object for c in key}) for directory in (output_dir, previous_dir)
+        )
+        changed, removed = diff_table(current, previous, key)
+        changed.to_csv(f"{delta_dir}/{table}.csv", index=False)
+        removed.to_csv(f"{delta_dir}/{table}_removed.csv", index=False)
+        print(f"   - {table}: {len(changed)} new/changed, {len(removed)} removed")
+
+# ---------- STEP 9: Ingredient neighbors (--neighbors) ----------
+def write_neighbors(join_table_df, output_dir, top_k, weighting="log", formats=("csv",)):
+    """Export the top-k co-occurring ingredients of every ingredient to ingredient_neighbors."""
+    with TableSink(output_dir, "ingredient_neighbors", NEIGHBOR_COLUMNS, formats) as sink:
+        rows, elapsed = export_neighbors(join_table_df, sink, top_k=top_k, weighting=weighting)
+    print(f"\n🤝 Ingredient neighbors: {rows} rows (top {top_k}, {weighting} weighting) in {elapsed:.2f}s")
+
+# ---------- Ingredient statistics (--stats) ----------
+def write_stats(ingredient_stats, ingredient_ids, output_dir, formats=("csv",)):
+    """Export ingredient_stats (and ingredient_category_counts when categories were counted)."""
+    tables = {"ingredient_stats": ingredient_stats.table(ingredient_ids)}
+    if ingredient_stats.category_codes:
+        tables["ingredient_category_counts"] = ingredient_stats.category_table(ingredient_ids)
+    for table, table_df in tables.items():
+        with TableSink(output_dir, table, list(table_df.columns), formats) as sink:
+            sink.write(table_df)
+    print(f"\n📊 Ingredient stats: {len(ingredient_ids)} ingredients"
+          + (f", {len(ingredient_stats.category_codes)} categories" if ingredient_stats.category_codes else "")
+          + f" ({ingredient_stats.histogram.nbytes / 2**20:.1f} MB position histogram)")
 
 # ---------- OUTPUT ----------
-print("="*60)
-print("PROCESSING SUMMARY")
-print("="*60)
-print(f"Total Products: {len(products_df)}")
-print(f"Total Unique Ingredients: {len(ingredients_df)}")
-print(f"Total Relationships: {len(join_table_df)}")
-print(f"Avg Ingredients per Product: {len(join_table_df) / len(products_df):.2f}")
+def print_summary(products_df, ingredients_df, join_table_df, relationships=None):
+    if relationships is None:
+        relationships = len(join_table_df)
+
+    print("="*60)
+    print("PROCESSING SUMMARY")
+    print("="*60)
+    print(f"Total Products: {len(products_df)}")
+    print(f"Total Unique Ingredients: {len(ingredients_df)}")
+    print(f"Total Relationships: {relationships}")
+    print(f"Avg Ingredients per Product: {relationships / len(products_df):.2f}")
 
-print("\n📦 Sample Products:")
-print(products_df.head())
+    print("\n📦 Sample Products:")
+    print(products_df.head())
 
-print("\n🧪 Sample Ingredients (sorted by frequency):")
-print(ingredients_df.nlargest(10, "product_count")[["ingredient_name", "product_count", "avg_position"]])
+    print("\n🧪 Sample Ingredients (sorted by frequency):")
+    print(ingredients_df.nlargest(10, "product_count")[["ingredient_name", "product_count", "avg_position"]])
 
-print("\n🔗 Sample Join Table:")
-print(join_table_df.head())
+    print("\n🔗 Sample Join Table:")
+    print(join_table_df.head())
 
 # ---------- EXPORT ----------
-# Save to CSV for Supabase import
-products_df.to_csv("/Users/jaewookang/Downloads/jaewookng/projects/dermodel/products.csv", index=False)
-ingredients_df.to_csv("/Users/jaewookang/Downloads/jaewookng/projects/dermodel/ingredients.csv", index=False) 
-join_table_df.to_csv("/Users/jaewookang/Downloads/jaewookng/projects/dermodel/product_ingredients.csv", index=False)
-
-print("\n✅ Files exported:")
-print("   - products.csv")
-print("   - ingredients.csv")
-print("   - product_ingredients.csv")
+def export_tables(products_df, ingredients_df, join_table_df, output_dir, formats=("csv",)):
+    # Save to CSV for Supabase import (and/or Parquet for analytics)
+    tables = {"products": products_df, "ingredients": ingredients_df, "product_ingredients": join_table_df}
+    for table, table_df in tables.items():
+        with TableSink(output_dir, table, list(table_df.columns), formats) as sink:
+            sink.write(table_df)
+
+    print("\n✅ Files exported:")
+    for table in tables:
+        for file_format in formats:
+            print(f"   - {table}.{file_format}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build product/ingredient tables for Supabase import")
+    parser.add_argument("--input", default=INPUT_CSV, help="raw product catalog CSV")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="directory for the exported CSVs")
+    parser.add_argument("--chunksize", type=int,
+                        help="stream the input in chunks of N rows instead of loading it whole")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse ingredient lists on N processes (default: 1)")
+    parser.add_argument("--previous-dir",
+                        help="earlier run's output directory; writes only the changes to OUTPUT_DIR/delta/")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv",
+                        help="output format (parquet needs pyarrow; default: csv)")
+    parser.add_argument("--neighbors", type=int, metavar="K",
+                        help="also export the top K co-occurring ingredients per ingredient (needs scipy)")
+    parser.add_argument("--weighting", default="log", choices=["log", "inverse", "none"],
+                        help="position weight for --neighbors similarity (default: log)")
+    parser.add_argument("--stats", action="store_true",
+                        help="also export position percentiles and first-five rates per ingredient")
+    parser.add_argument("--category-column",
+                        help="with --stats, count ingredients per value of this input column (e.g. brand)")
+    args = parser.parse_args()
+    formats = FORMATS[args.format]
+
+    if "parquet" in formats and not HAS_PYARROW:
+        parser.error("--format parquet needs pyarrow: pip install pyarrow")
+
+    if args.neighbors and not HAS_SCIPY:
+        parser.error("--neighbors needs scipy: pip install scipy")
+
+    if args.category_column and not args.stats:
+        parser.error("--category-column needs --stats")
+
+    if args.previous_dir and os.path.realpath(args.previous_dir) == os.path.realpath(args.output_dir):
+        parser.error("--previous-dir must differ from --output-dir")
+
+    try:
+        check_category_column(args.input, args.category_column)
+    except ValueError as e:
+        parser.error(f"--category-column: {e}")
+
+    if args.chunksize:
+        products_df, ingredients_df, join_sample, relationships = process_streaming(
+            args.input, args.chunksize, args.output_dir, args.workers, formats, args.stats, args.category_column
+        )
+        print_summary(products_df, ingredients_df, join_sample, relationships)
+        print(f"\n✅ Files exported to {args.output_dir} (streamed in chunks of {args.chunksize} rows)")
+        if args.neighbors:
+            join_table_df = read_table(args.output_dir, "product_ingredients")
+    else:
+        df = load_products(args.input)
+        products_df, ingredients_df, join_table_df, ingredient_stats = process(df, args.workers, args.category_column)
+        print_summary(products_df, ingredients_df, join_table_df)
+        export_tables(products_df, ingredients_df, join_table_df, args.output_dir, formats)
+        if args.stats:
+            write_stats(ingredient_stats, ingredients_df["ingredient_id"].tolist(), args.output_dir, formats)
+
+    if args.neighbors:
+        write_neighbors(join_table_df, args.output_dir, args.neighbors, args.weighting, formats)
+
+    if args.previous_dir:
+        write_deltas(args.output_dir, args.previous_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+"""
+In-memory product/ingredient query service over the process_ingredients.py tables
+
+Loads products, ingredients and product_ingredients once and answers the lookups the
+frontend otherwise sends to Supabase on every interaction:
+
+    - products containing ingredient X, ordered by X's list position
+    - AND / OR / NOT ingredient filters ("contains niacinamide, no fragrance"), ranked by
+      the summed positions of the required ingredients (lower = higher concentration)
+    - ingredient and product name search (prefix matches first, then substrings)
+
+Index layout: product codes are int32 in product-name order; each ingredient owns a
+slice of one postings array (sorted product codes) with a parallel int16 position
+array, CSR style. AND / NOT binary-search the running result (smallest list first) in
+the next sorted posting list, OR is a sorted union, and a page is an argpartition of
+the matching rows, so typical queries take tens of microseconds. Names are indexed by
+casefolded key (sorted, for prefix bisection) and by trigram -> ingredient codes.
+
+Usage:
+    python product_query_service.py [--input-dir DIR] [--port 8770]
+    python product_query_service.py --benchmark [--input-dir DIR | --synthetic 100000]
+
+HTTP API (JSON):
+    GET /products?with=Niacinamide&without=Fragrance&any=Glycerin&any=Squalane&sort=position&offset=0&limit=50
+        with/any/without take ingredient ids or names; repeat the parameter for several
+    GET /ingredients/<ingredient_id>/products?offset=0&limit=50
+    GET /ingredients/search?q=niacin&limit=10
+    GET /products/search?q=serum&limit=10
+    GET /health
+"""
+
+import json
+import time
+import argparse
+import threading
+import http.client
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from ingredient_canonicalizer import name_key
+from process_ingredients import OUTPUT_DIR, read_table
+
+DEFAULT_PORT = 8770
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+SORTS = ("position", "name", "ingredient_count")
+
+
+class QueryError(ValueError):
+    """Bad query parameters (answered with HTTP 400)."""
+
+
+# Sorted-array set operations. Binary search costs O(n log m); once both sides are a
+# sizeable fraction of all products, a bitmap over every product code is cheaper.
+DENSE_RATIO = 16
+
+
+def use_dense(probe, target, universe):
+    return probe * DENSE_RATIO > target and target * DENSE_RATIO > universe
+
+
+def dense_mask(codes, universe):
+    mask = np.zeros(universe, dtype=bool)
+    mask[codes] = True
+    return mask
+
+
+def intersect_sorted(small, large, universe):
+    """Entries of `small` that are in sorted `large`, in `small`'s order."""
+    if len(small) == 0 or len(large) == 0:
+        return small[:0]
+    if use_dense(len(small), len(large), universe):
+        return small[dense_mask(large, universe)[small]]
+    at = np.minimum(np.searchsorted(large, small), len(large) - 1)
+    return small[large[at] == small]
+
+
+def difference_sorted(values, remove, universe):
+    """Sorted unique arrays -> `values` without `remove`."""
+    if len(values) == 0 or len(remove) == 0:
+        return values
+    if use_dense(len(values), len(remove), universe):
+        return values[~dense_mask(remove, universe)[values]]
+    at = np.minimum(np.searchsorted(remove, values), len(remove) - 1)
+    return values[remove[at] != values]
+
+
+def union_sorted(arrays, universe):
+    """Sorted unique arrays -> their sorted union."""
+    total = sum(len(array) for array in arrays)
+    if total * DENSE_RATIO > universe:
+        return np.flatnonzero(dense_mask(np.concatenate(arrays), universe)).astype(np.int32)
+    merged = np.sort(np.concatenate(arrays))
+    return merged[np.concatenate([[True], merged[1:] != merged[:-1]])]
+
+
+def substring_grams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class NameIndex:
+    """Prefix and substring search over a fixed list of names, best `weights` first."""
+
+    def __init__(self, names, weights):
+        self.keys = [name_key(name) if isinstance(name, str) else "" for name in names]
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.order = np.array(sorted(range(len(self.keys)), key=self.keys.__getitem__), dtype=np.int32)
+        self.sorted_keys = [self.keys[code] for code in self.order]
+        self.exact = {}
+        for code in self.order[::-1]:  # first (lowest) code wins for duplicate keys
+            self.exact[self.keys[code]] = int(code)
+
+        grams = {}
+        for code, key in enumerate(self.keys):
+            for gram in substring_grams(key):
+                grams.setdefault(gram, []).append(code)
+        self.grams = {gram: np.array(codes, dtype=np.int32) for gram, codes in grams.items()}
+
+    def lookup(self, name):
+        """Code of the name with exactly this casefolded key, else None."""
+        return self.exact.get(name_key(name))
+
+    def best(self, codes, limit):
+        codes = np.asarray(codes, dtype=np.int32)
+        if len(codes) > limit:
+            codes = codes[np.argpartition(-self.weights[codes], limit - 1)[:limit]]
+        return codes[np.lexsort((codes, -self.weights[codes]))]
+
+    def search(self, query, limit=10):
+        """Codes of names starting with `query`, then names containing it."""
+        key = name_key(query)
+        if not key:
+            return np.zeros(0, dtype=np.int32)
+        lo = bisect_left(self.sorted_keys, key)
+        hi = bisect_left(self.sorted_keys, key + "\uffff", lo)
+        found = self.best(self.order[lo:hi], limit)
+        if len(found) >= limit or len(key) < 3:
+            return found
+
+        postings = sorted((self.grams.get(gram) for gram in substring_grams(key)), key=lambda p: 0 if p is None else len(p))
+        if postings[0] is None:
+            return found
+        candidates = postings[0]
+        for other in postings[1:]:
+            candidates = intersect_sorted(candidates, other, len(self.keys))
+        contains = [code for code in candidates if key in self.keys[code] and not self.keys[code].startswith(key)]
+        return np.concatenate([found, self.best(contains, limit - len(found))])
+
+
+class ProductIndex:
+    """Inverted index ingredient -> (sorted product codes, positions)."""
+
+    def __init__(self, products_df, ingredients_df, join_table_df):
+        started = time.perf_counter()
+        products_df = products_df.sort_values("product_name", kind="stable").reset_index(drop=True)
+        self.product_ids = products_df["product_id"].to_numpy(dtype=object)
+        self.product_names = products_df["product_name"].to_numpy(dtype=object)
+        self.ingredient_counts = products_df["ingredient_count"].fillna(0).to_numpy(dtype=np.int32)
+        self.ingredient_ids = ingredients_df["ingredient_id"].to_numpy(dtype=object)
+        self.ingredient_names = ingredients_df["ingredient_name"].fillna("").to_numpy(dtype=object)
+
+        product_codes = pd.Index(self.product_ids).get_indexer(join_table_df["product_id"])
+        ingredient_codes = pd.Index(self.ingredient_ids).get_indexer(join_table_df["ingredient_id"])
+        known = (product_codes >= 0) & (ingredient_codes >= 0)
+        product_codes, ingredient_codes = product_codes[known], ingredient_codes[known]
+        positions = join_table_df["position"].to_numpy()[known]
+
+        order = np.lexsort((product_codes, ingredient_codes))
+        self.postings = product_codes[order].astype(np.int32)
+        self.positions = positions[order].astype(np.int16)
+        counts = np.bincount(ingredient_codes, minlength=len(self.ingredient_ids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        # Same slices re-sorted by (position, product code): a single-ingredient page is a slice
+        by_position = np.lexsort((product_codes, positions, ingredient_codes))
+        self.postings_by_position = product_codes[by_position].astype(np.int32)
+
+        self.ingredient_search = NameIndex(self.ingredient_names, counts)
+        self.product_search = NameIndex(self.product_names, self.ingredient_counts)
+        self.ingredient_codes_by_id = {ingredient_id: code for code, ingredient_id in enumerate(self.ingredient_ids)}
+        self.build_seconds = time.perf_counter() - started
+
+    @classmethod
+    def load(cls, input_dir):
+        tables = [read_table(input_dir, table) for table in ("products", "ingredients", "product_ingredients")]
+        return cls(*tables)
+
+    def stats(self):
+        arrays = (self.postings, self.positions, self.offsets, self.postings_by_position)
+        return {
+            "products": len(self.product_ids),
+            "ingredients": len(self.ingredient_ids),
+            "relationships": len(self.postings),
+            "postings_bytes": sum(array.nbytes for array in arrays),
+            "build_seconds": round(self.build_seconds, 3),
+        }
+
+    # ---------- resolution ----------
+    def resolve(self, reference):
+        """Ingredient code for an ingredient id or (casefolded) name."""
+        code = self.ingredient_codes_by_id.get(reference)
+        if code is None:
+            code = self.ingredient_search.lookup(reference)
+        if code is None:
+            suggestions = [self.ingredient_names[c] for c in self.ingredient_search.search(reference, 5)]
+            raise QueryError(f"unknown ingredient {reference!r}" + (f", did you mean {suggestions}?" if suggestions else ""))
+        return code
+
+    def products_of(self, code):
+        start, stop = self.offsets[code], self.offsets[code + 1]
+        return self.postings[start:stop], self.positions[start:stop]
+
+    def positions_in(self, code, product_codes, missing=-1):
+        """Position of ingredient `code` in each of `product_codes` (`missing` where it is absent)."""
+        postings, positions = self.products_of(code)
+        if len(postings) == 0:
+            return np.full(len(product_codes), missing, dtype=np.int64)
+        if use_dense(len(product_codes), len(postings), len(self.product_ids)):
+            dense = np.full(len(self.product_ids), missing, dtype=np.int16)
+            dense[postings] = positions
+            return dense[product_codes]
+        at = np.minimum(np.searchsorted(postings, product_codes), len(postings) - 1)
+        return np.where(postings[at] == product_codes, positions[at], missing)
+
+    # ---------- queries ----------
+    def query(self, with_=(), any_=(), without=(), sort="position", offset=0, limit=DEFAULT_LIMIT):
+        """(total, page of product codes, {ingredient code: positions on the page})."""
+        if sort not in SORTS:
+            raise QueryError(f"sort must be one of {SORTS}")
+        required = sorted({self.resolve(r) for r in with_}, key=lambda c: self.offsets[c + 1] - self.offsets[c])
+        optional = {self.resolve(r) for r in any_}
+        excluded = {self.resolve(r) for r in without}
+        if not required and not optional:
+            raise QueryError("give at least one with= or any= ingredient")
+
+        # AND smallest posting list first, so every intersection is at most that long
+        universe = len(self.product_ids)
+        matches = None
+        for code in required:
+            postings = self.products_of(code)[0]
+            matches = postings if matches is None else intersect_sorted(matches, postings, universe)
+            if len(matches) == 0:
+                break
+        if optional and (matches is None or len(matches)):
+            union = union_sorted([self.products_of(code)[0] for code in optional], universe)
+            matches = union if matches is None else intersect_sorted(matches, union, universe)
+        for code in excluded:
+            if len(matches) == 0:
+                break
+            matches = difference_sorted(matches, self.products_of(code)[0], universe)
+
+        if sort == "position" and len(required) == 1 and not optional:
+            # "Products containing X" (minus exclusions): walk X's position-ordered list
+            start, stop = self.offsets[required[0]], self.offsets[required[0] + 1]
+            ordered = self.postings_by_position[start:stop]
+            if len(matches) < len(ordered):
+                ordered = intersect_sorted(ordered, matches, universe)
+            page = ordered[offset:offset + limit]
+            return len(ordered), page, {required[0]: self.positions_in(required[0], page)}
+
+        total = len(matches)
+        page = self.page(matches, required or sorted(optional), sort, offset, limit) if total else matches
+        shown = {code: self.positions_in(code, page) for code in [*required, *optional]}
+        return total, page, shown
+
+    def page(self, matches, ranked_by, sort, offset, limit):
+        """Rows offset:offset+limit of `matches` in `sort` order (ties by product name)."""
+        if sort == "name":
+            return matches[offset:offset + limit]
+        if sort == "ingredient_count":
+            score = self.ingredient_counts[matches].astype(np.int64)
+        else:
+            score = np.zeros(len(matches), dtype=np.int64)
+            for code in ranked_by:
+                # An any= ingredient missing from a product counts as a far-down position
+                score += self.positions_in(code, matches, missing=np.iinfo(np.int16).max)
+        keys = score * len(self.product_ids) + matches  # one int64 key: score, then name order
+        end = offset + limit
+        if end < len(keys):
+            candidates = np.argpartition(keys, end - 1)[:end]
+            return matches[candidates[np.argsort(keys[candidates])]][offset:]
+        return matches[np.argsort(keys)][offset:end]
+
+
+# ---------- HTTP ----------
+def listed(params, name):
+    """Values of a repeated query parameter (not comma-split: INCI names contain commas, e.g. 1,2-Hexanediol)."""
+    return [value.strip() for value in params.get(name, []) if value.strip()]
+
+
+def paging(params):
+    try:
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params.get("limit", [str(DEFAULT_LIMIT)])[0])
+    except ValueError:
+        raise QueryError("offset and limit must be integers")
+    if offset < 0 or not 0 < limit <= MAX_LIMIT:
+        raise QueryError(f"need offset >= 0 and 0 < limit <= {MAX_LIMIT}")
+    return offset, limit
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so benchmark clients reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    index = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = [unquote(part) for part in url.path.split("/") if part]  # ids and names may be percent-encoded
+        started = time.perf_counter()
+        try:
+            if parts == ["products"]:
+                body = self.products(params, listed(params, "with"), listed(params, "any"), listed(params, "without"))
+            elif len(parts) == 3 and parts[0] == "ingredients" and parts[2] == "products":
+                body = self.products(params, [parts[1]], [], [])
+            elif parts == ["ingredients", "search"]:
+                body = self.search(params, self.index.ingredient_search, self.ingredient_row)
+            elif parts == ["products", "search"]:
+                body = self.search(params, self.index.product_search, self.product_row)
+            elif parts == ["health"]:
+                body = self.index.stats()
+            else:
+                self.send_json(404, {"error": f"unknown path {url.path}"})
+                return
+        except QueryError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        body["took_us"] = round((time.perf_counter() - started) * 1e6, 1)
+        self.send_json(200, body)
+
+    def products(self, params, with_, any_, without):
+        offset, limit = paging(params)
+        sort = params.get("sort", ["position"])[0]
+        total, page, shown = self.index.query(with_, any_, without, sort, offset, limit)
+        rows = []
+        for i, code in enumerate(page):
+            row = self.product_row(code)
+            row["positions"] = {self.index.ingredient_names[c]: int(p[i]) for c, p in shown.items() if p[i] >= 0}
+            rows.append(row)
+        return {"total": total, "offset": offset, "limit": limit, "has_more": offset + len(rows) < total, "data": rows}
+
+    def search(self, params, names, row):
+        query = params.get("q", [""])[0]
+        _, limit = paging(params)
+        return {"query": query, "data": [row(code) for code in names.search(query, limit)]}
+
+    def product_row(self, code):
+        index = self.index
+        return {"product_id": index.product_ids[code], "product_name": index.product_names[code],
+                "ingredient_count": int(index.ingredient_counts[code])}
+
+    def ingredient_row(self, code):
+        index = self.index
+        return {"ingredient_id": index.ingredient_ids[code], "ingredient_name": index.ingredient_names[code],
+                "product_count": int(index.offsets[code + 1] - index.offsets[code])}
+
+
+def serve(index, port):
+    QueryHandler.index = index
+    return ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+
+
+# ---------- BENCHMARK ----------
+def synthetic_tables(n_products, n_ingredients=None, seed=0):
+    """products/ingredients/product_ingredients frames with Zipf-like ingredient popularity."""
+    rng = np.random.default_rng(seed)
+    n_ingredients = n_ingredients or max(100, n_products // 10)
+    sizes = rng.integers(5, 40, n_products)
+    products = np.repeat(np.arange(n_products), sizes)
+    ingredients = np.minimum(rng.zipf(1.3, len(products)) - 1, n_ingredients - 1)
+    positions = np.arange(len(products)) - np.repeat(np.cumsum(sizes) - sizes, sizes) + 1
+    join = pd.DataFrame({"p": products, "i": ingredients, "position": positions}).drop_duplicates(["p", "i"])
+
+    product_ids = np.array([f"p{code}" for code in range(n_products)], dtype=object)
+    ingredient_ids = np.array([f"i{code}" for code in range(n_ingredients)], dtype=object)
+    products_df = pd.DataFrame({"product_id": product_ids, "product_name": [f"Product {code}" for code in range(n_products)],
+                                "ingredient_count": np.bincount(join["p"], minlength=n_products)})
+    ingredients_df = pd.DataFrame({"ingredient_id": ingredient_ids,
+                                   "ingredient_name": [f"Ingredient {code}" for code in range(n_ingredients)]})
+    join_df = pd.DataFrame({"product_id": product_ids[join["p"]], "ingredient_id": ingredient_ids[join["i"]],
+                            "position": join["position"].to_numpy()})
+    return products_df, ingredients_df, join_df
+
+
+def random_queries(index, count, seed=0):
+    """Mixed lookups: single ingredient, AND, AND NOT, OR, weighted toward popular ingredients."""
+    rng = np.random.default_rng(seed)
+    sizes = np.diff(index.offsets)
+    popular = np.argsort(-sizes)[:max(10, len(sizes) // 20)]
+    pick = lambda: index.ingredient_ids[rng.choice(popular)]
+    queries = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            queries.append(([pick()], [], []))
+        elif kind == 1:
+            queries.append(([pick(), pick()], [], []))
+        elif kind == 2:
+            queries.append(([pick()], [], [pick(), pick()]))
+        else:
+            queries.append(([], [pick(), pick(), pick()], [pick()]))
+    return queries
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {f"p{q}": round(float(np.percentile(samples, q)), 1) for q in (50, 90, 99)}
+
+
+def benchmark(index, queries=2000, clients=8, seconds=5.0):
+    print(f"Index: {index.stats()}")
+
+    workload = random_queries(index, queries)
+    timings, totals = [], []
+    for with_, any_, without in workload:
+        started = time.perf_counter()
+        total, _, _ = index.query(with_, any_, without, limit=DEFAULT_LIMIT)
+        timings.append(time.perf_counter() - started)
+        totals.append(total)
+    print(f"In-process queries (us): {percentiles(timings)}, median matches {int(np.median(totals))}")
+
+    prefixes = [index.ingredient_names[code][:4] for code in np.random.default_rng(1).integers(0, len(index.ingredient_names), 500)]
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.ingredient_search.search(prefix, 10)
+        timings.append(time.perf_counter() - started)
+    print(f"In-process name search (us): {percentiles(timings)}")
+
+    server = serve(index, 0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    paths = []
+    for with_, any_, without in workload:
+        query = "&".join([f"with={quote(r)}" for r in with_] + [f"any={quote(r)}" for r in any_] +
+                         [f"without={quote(r)}" for r in without])
+        paths.append(f"/products?{query}&limit=20")
+
+    def client(seed):
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        rng = np.random.default_rng(seed)
+        latencies = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            connection.request("GET", paths[rng.integers(len(paths))])
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            latencies.append(time.perf_counter() - started)
+        connection.close()
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [l for result in pool.map(client, range(clients)) for l in result]
+    server.shutdown()
+    print(f"HTTP, {clients} keep-alive clients for {seconds:.0f}s: {len(latencies) / seconds:,.0f} req/s, "
+          f"latency (us): {percentiles(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory product/ingredient query service")
+    parser.add_argument("--input-dir", default=OUTPUT_DIR, help="process_ingredients.py output directory")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time in-process queries and an HTTP load test, then exit")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="benchmark a synthetic catalog of N products instead of --input-dir")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP clients for --benchmark")
+    parser.add_argument("--seconds", type=float, default=5.0, help="HTTP load test duration")
+    args = parser.parse_args()
+
+    index = ProductIndex(*synthetic_tables(args.synthetic)) if args.synthetic else ProductIndex.load(args.input_dir)
+    if args.benchmark:
+        benchmark(index, clients=args.clients, seconds=args.seconds)
+        return
+
+    server = serve(index, args.port)
+    print(f"Query service on http://127.0.0.1:{args.port} ({index.stats()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for process_ingredients.py and populate_papers.py
+
+Generates a synthetic catalog (synthetic_catalog.py), times every STEP of the ingredient
+processor in-process, then runs populate_papers.py against local mocks of Semantic
+Scholar (mock_semantic_scholar.py) and Supabase REST (mock_postgrest.py). Each stage
+records wall time, rows/sec and peak RSS; results can be saved as a baseline JSON and
+later runs compared against it.
+
+Usage:
+    python benchmark_pipeline.py [--products 50000] [--paper-ingredients 500] [--save-baseline]
+    python benchmark_pipeline.py --baseline benchmark_baseline.json   # exit 1 on regressions
+
+A stage regresses when its rows/sec drops, or its peak RSS grows, by more than
+--tolerance (default 25%) relative to the baseline. Baselines are machine-specific:
+record one on the machine (and with the parameters) you compare on.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+import process_ingredients as processor
+from synthetic_catalog import write_catalog
+
+BASELINE_FILE = "benchmark_baseline.json"
+TOLERANCE = 0.25
+MIN_SECONDS = 0.05  # stages faster than this are too noisy to compare
+MIN_RSS_GROWTH_MB = 20
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def rss_mb(pid="self") -> float:
+    """Current resident set size of `pid` (Linux), else this process's peak so far"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB elsewhere
+
+
+class PeakRss:
+    """Sample RSS of this process (or a child `pid`) on a background thread while the block runs"""
+
+    def __init__(self, pid="self", interval: float = 0.002):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0.0
+        self.done = threading.Event()
+
+    def sample(self):
+        while not self.done.is_set():
+            with contextlib.suppress(OSError, ValueError, IndexError):  # child gone
+                self.peak = max(self.peak, rss_mb(self.pid))
+            self.done.wait(self.interval)
+
+    def __enter__(self):
+        if self.pid == "self":
+            self.peak = rss_mb()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.done.set()
+        self.thread.join()
+        if self.pid == "self":
+            self.peak = max(self.peak, rss_mb())
+
+
+class Recorder:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name: str, seconds: float, rows: int, peak_rss_mb: float):
+        self.stages[name] = {
+            "seconds": round(seconds, 4),
+            "rows": rows,
+            "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb, 1),
+        }
+        print(f"  {name:<38} {seconds:8.3f}s {rows:>10,} rows {rows / max(seconds, 1e-9):>14,.0f} rows/s "
+              f"{peak_rss_mb:8.1f} MB", flush=True)
+
+    def run(self, name: str, fn, rows=None):
+        """Time fn() in-process; rows is a count or a function of fn's result"""
+        with PeakRss() as rss, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = fn()
+            seconds = time.perf_counter() - started
+        self.add(name, seconds, rows(result) if callable(rows) else rows, rss.peak)
+        return result
+
+    def run_process(self, name: str, command: list, rows: int, **kwargs):
+        """Time a child process and sample its RSS
+
+        The child's own ru_maxrss is only a fallback: on Linux it includes the pre-exec
+        copy of this (much larger) process.
+        """
+        started = time.perf_counter()
+        child = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs)
+        with PeakRss(child.pid, interval=0.01) as rss:
+            _, status, usage = os.wait4(child.pid, 0)
+        seconds = time.perf_counter() - started
+        child.returncode = os.waitstatus_to_exitcode(status)
+        if child.returncode != 0:
+            raise RuntimeError(f"{name} failed ({child.returncode}): {child.stderr.read().decode()[-2000:]}")
+        peak = usage.ru_maxrss / 2**20 if sys.platform == "darwin" else usage.ru_maxrss / 2**10
+        self.add(name, seconds, rows, rss.peak or peak)
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+def benchmark_processor(recorder: Recorder, catalog: str, output_dir: str, chunksize: int):
+    """STEP 1 - STEP 8 one at a time, the export, streaming mode and (with scipy) neighbors"""
+    df = recorder.run("processor: STEP 1 load", lambda: processor.load_products(catalog), len)
+    expanded = recorder.run("processor: STEP 3 expand", lambda: processor.expand_products(df), len)
+    unique_df, stats = recorder.run("processor: STEP 4 unique", lambda: processor.unique_ingredients(expanded),
+                                     lambda result: len(expanded))
+    product_ids, ingredient_ids = recorder.run(
+        "processor: STEP 5 ids",
+        lambda: processor.assign_ids(df["product_name"].unique(), unique_df["ingredient"]),
+        lambda result: len(result[0]) + len(result[1]),
+    )
+    join_df = recorder.run("processor: STEP 6 join table",
+                           lambda: processor.build_join_table(expanded, product_ids, ingredient_ids),
+                           lambda result: len(expanded))
+    products_df = recorder.run("processor: STEP 7 products table",
+                               lambda: processor.build_products_table(expanded, product_ids), len)
+    ingredients_df = recorder.run("processor: STEP 8 ingredients table",
+                                  lambda: processor.build_ingredients_table(ingredient_ids, stats), len)
+    recorder.run("processor: export csv",
+                 lambda: processor.export_tables(products_df, ingredients_df, join_df, output_dir),
+                 len(products_df) + len(ingredients_df) + len(join_df))
+
+    if processor.HAS_SCIPY:
+        recorder.run("processor: STEP 9 neighbors", lambda: processor.write_neighbors(join_df, output_dir, 20),
+                     len(join_df))
+
+    del expanded
+    streaming_dir = os.path.join(output_dir, "streaming")
+    os.makedirs(streaming_dir)
+    recorder.run(f"processor: streaming (chunks of {chunksize})",
+                 lambda: processor.process_streaming(catalog, chunksize, streaming_dir),
+                 lambda result: result[3])
+    return ingredients_df["ingredient_name"].dropna().tolist()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(script: str, args: list) -> tuple:
+    """Start a mock server subprocess on a free port, return (process, port)"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, os.path.join(SCRIPTS_DIR, script), "--port", str(port), *args],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.2):
+            return process, port
+        time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"{script} did not start")
+
+
+def benchmark_papers(recorder: Recorder, names: list, workdir: str, latency: float, rps: float, concurrency: int):
+    """populate_papers.py against the mocks: a live run, then an offline replay from its cache"""
+    names_file = os.path.join(workdir, "names.txt")
+    with open(names_file, "w") as f:
+        f.write("\n".join(names))
+    run_dir = os.path.join(workdir, "papers")
+    os.makedirs(run_dir)
+
+    scholar, scholar_port = start_mock("mock_semantic_scholar.py", ["--rps", "0", "--latency", str(latency)])
+    postgrest, postgrest_port = start_mock("mock_postgrest.py", ["--names", names_file])
+    try:
+        env = dict(os.environ,
+                   SEMANTIC_SCHOLAR_BASE=f"http://127.0.0.1:{scholar_port}/graph/v1",
+                   SUPABASE_URL=f"http://127.0.0.1:{postgrest_port}")
+        command = [sys.executable, os.path.join(SCRIPTS_DIR, "populate_papers.py"),
+                   "--rps", str(rps), "--concurrency", str(concurrency)]
+        recorder.run_process("papers: search + insert", command, len(names), cwd=run_dir, env=env)
+        recorder.run_process("papers: offline replay (--dry-run)", command + ["--offline", "--dry-run"],
+                             len(names), cwd=run_dir, env=env)
+    finally:
+        for process in (scholar, postgrest):
+            process.terminate()
+            process.wait()
+
+
+# ============================================================================
+# BASELINE
+# ============================================================================
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable regressions of `results` against `baseline`"""
+    if results["parameters"] != baseline.get("parameters"):
+        print(f"⚠️  Parameters differ from the baseline ({baseline.get('parameters')}); comparing rates anyway")
+    regressions = []
+    print(f"\nAgainst baseline ({baseline.get('recorded', 'unknown date')}):")
+    for name, stage in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            print(f"  {name:<38} (new stage)")
+            continue
+        rate, base_rate = stage["rows_per_sec"] or 0, base["rows_per_sec"] or 0
+        rate_change = rate / base_rate - 1 if base_rate else 0.0
+        rss_change = stage["peak_rss_mb"] / base["peak_rss_mb"] - 1 if base["peak_rss_mb"] else 0.0
+        flags = []
+        if max(stage["seconds"], base["seconds"]) >= MIN_SECONDS and rate_change < -tolerance:
+            flags.append(f"rows/sec {rate_change:+.0%}")
+        if rss_change > tolerance and stage["peak_rss_mb"] - base["peak_rss_mb"] > MIN_RSS_GROWTH_MB:
+            flags.append(f"peak RSS {rss_change:+.0%}")
+        status = "❌ " + ", ".join(flags) if flags else "✅"
+        print(f"  {name:<38} rows/sec {rate_change:+7.1%}  RSS {rss_change:+7.1%}  {status}")
+        regressions += [f"{name}: {flag}" for flag in flags]
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingredient processor and paper pipeline")
+    parser.add_argument("--products", type=int, default=50000, help="synthetic catalog size")
+    parser.add_argument("--vocabulary", type=int, help="distinct INCI names (default: products / 5)")
+    parser.add_argument("--chunksize", type=int, default=10000, help="rows per chunk for the streaming stage")
+    parser.add_argument("--paper-ingredients", type=int, default=500,
+                        help="ingredients searched by the paper pipeline (0 = skip it)")
+    parser.add_argument("--latency", type=float, default=0.01, help="mock Semantic Scholar latency per request")
+    parser.add_argument("--rps", type=float, default=500, help="populate_papers.py --rps against the mock")
+    parser.add_argument("--concurrency", type=int, default=16, help="populate_papers.py --concurrency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help=f"baseline JSON (default: {BASELINE_FILE})")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed relative regression")
+    parser.add_argument("--output", help="also write this run's results JSON here")
+    args = parser.parse_args()
+
+    parameters = {key: getattr(args, key) for key in
+                  ("products", "vocabulary", "chunksize", "paper_ingredients", "latency", "rps", "concurrency", "seed")}
+    recorder = Recorder()
+    with tempfile.TemporaryDirectory(prefix="dermodel-bench-") as workdir:
+        print(f"Benchmark {parameters}")
+        catalog = os.path.join(workdir, "sss.csv")
+        rows = recorder.run("catalog: generate", lambda: write_catalog(catalog, args.products, args.vocabulary, args.seed),
+                            lambda written: written)
+        names = benchmark_processor(recorder, catalog, workdir, args.chunksize)
+        if args.paper_ingredients:
+            benchmark_papers(recorder, names[:args.paper_ingredients], workdir, args.latency, args.rps, args.concurrency)
+
+    results = {
+        "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "machine": platform.machine(), "cpus": os.cpu_count()},
+        "parameters": parameters,
+        "catalog_rows": rows,
+        "stages": recorder.stages,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
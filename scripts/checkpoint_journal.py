@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint journal used by populate_papers.py
+
+Each batch commit is one JSON line appended to the journal and fsync'd, so a checkpoint
+costs O(batch) instead of rewriting the whole processed list. The first line is a snapshot
+of everything committed before it; the journal is compacted into a new snapshot (written to
+a temp file, fsync'd, then renamed over the journal) once the appended names outnumber the
+snapshot, which keeps the file under twice the snapshot size and the amortized cost per
+committed name constant.
+
+A crash can only leave a torn last line (discarded and truncated on load) or a stale
+compaction temp file (ignored), never a half-written checkpoint.
+
+Usage:
+    from checkpoint_journal import CheckpointJournal
+
+    journal = CheckpointJournal("checkpoint.jsonl", legacy_path="checkpoint.json")
+    journal.load()
+    journal.commit(["Glycerin", "Niacinamide"], total_papers=8, last_index=2)
+
+    python checkpoint_journal.py --bench 30000   # commit/load cost as the run grows
+
+The crash recovery (SIGKILL mid-append, torn last lines) is tested in tests/test_checkpoint_journal.py.
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+COMPACT_MIN_NAMES = 1000  # never compact journals smaller than this
+
+
+class CheckpointJournal:
+    """Processed ingredient names plus run counters, persisted as a JSON-lines journal"""
+
+    def __init__(self, path: str, legacy_path: str = None, compact_min: int = COMPACT_MIN_NAMES):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_min = compact_min
+        self.processed = {}  # insertion-ordered set of names
+        self.total_papers = 0
+        self.last_index = 0
+        self.merged_shards = {}  # shard checkpoint name -> paper total merged from it (merge_shards.py)
+        self.snapshot_names = 0
+        self.appended_names = 0
+        self._file = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load(self, write: bool = True) -> "CheckpointJournal":
+        """Replay the journal (importing a legacy checkpoint.json once), dropping a torn tail
+
+        write=False only reads: the legacy checkpoint is not converted and a torn tail is kept.
+        """
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            with open(self.legacy_path) as f:
+                legacy = json.load(f)
+            self._apply(legacy)
+            if write:
+                self.compact()
+            return self
+
+        if not os.path.exists(self.path):
+            return self
+
+        good_bytes = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record.get("snapshot"):
+                    self.snapshot_names = len(record.get("processed", []))
+                else:
+                    self.appended_names += len(record.get("processed", []))
+                self._apply(record)
+                good_bytes += len(line)
+
+        if write and good_bytes < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+                os.fsync(f.fileno())
+        return self
+
+    def _apply(self, record: dict):
+        self.processed.update(dict.fromkeys(record.get("processed", [])))
+        self.total_papers = record.get("total_papers", self.total_papers)
+        self.last_index = record.get("last_index", self.last_index)
+        self.merged_shards.update(record.get("merged_shards", {}))
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def commit(self, names: list, total_papers: int = None, last_index: int = None):
+        """Durably record a finished batch (one fsync'd append)"""
+        record = {"processed": [n for n in names if n not in self.processed]}
+        if total_papers is not None:
+            record["total_papers"] = total_papers
+        if last_index is not None:
+            record["last_index"] = last_index
+        record["last_updated"] = datetime.now().isoformat()
+        self._apply(record)
+        self.appended_names += len(record["processed"])
+
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(json.dumps(record).encode() + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        if self.appended_names >= max(self.compact_min, self.snapshot_names):
+            self.compact()
+
+    def compact(self):
+        """Replace the journal with a single snapshot line (atomic rename)"""
+        self.close()
+        snapshot = {
+            "snapshot": True,
+            "processed": list(self.processed),
+            "total_papers": self.total_papers,
+            "last_index": self.last_index,
+            **({"merged_shards": self.merged_shards} if self.merged_shards else {}),
+            "last_updated": datetime.now().isoformat(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(snapshot).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+        self.snapshot_names = len(self.processed)
+        self.appended_names = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fsync_dir(path: str):
+    """Make a rename durable (no-op where directories cannot be opened, e.g. Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def sample_name(i: int) -> str:
+    return f"Ingredient {i:07d}"
+
+
+def bench(total: int, batch: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.jsonl")
+        journal = CheckpointJournal(path)
+        window = []
+        for start in range(0, total, batch):
+            started = time.perf_counter()
+            journal.commit([sample_name(i) for i in range(start, start + batch)],
+                           total_papers=start * 4, last_index=start + batch)
+            window.append(time.perf_counter() - started)
+            done = start + batch
+            if done % (total // 5) == 0:
+                print(f"{done:>8} names: mean commit {sum(window) / len(window) * 1000:.2f} ms, "
+                      f"journal {os.path.getsize(path):,} bytes")
+                window = []
+        journal.close()
+
+        started = time.perf_counter()
+        loaded = CheckpointJournal(path).load()
+        print(f"Load: {len(loaded.processed)} names in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpoint journal benchmark")
+    parser.add_argument("--bench", type=int, metavar="N", required=True, help="time commits up to N names")
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+    bench(args.bench, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Bulk loader for process_ingredients.py output
+Streams products.csv, ingredients.csv and product_ingredients.csv into Postgres
+
+Usage:
+    python load_product_tables.py --dsn postgresql://... [--input-dir DIR] [--delta] [--delete-missing]
+
+Features:
+    - COPY FROM STDIN into temporary staging tables (no per-row INSERTs)
+    - One transaction: upsert from staging, then optional deletes; all or nothing
+    - --delta loads OUTPUT_DIR/delta/ from process_ingredients.py --previous-dir
+      (changed rows are upserted, *_removed.csv keys are deleted)
+    - Replaces sss_ingredient_neighbors when INPUT_DIR/ingredient_neighbors.csv exists
+      (process_ingredients.py --neighbors K)
+    - Reports rows/sec for every COPY and for the whole load
+    - --delete-missing refuses to run while the tables still hold pre-UUIDv5 ids
+      (apply supabase/migrations/20261016000200_remap_sss_ids_to_uuid5.sql first)
+"""
+
+import os
+import time
+import argparse
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Direct Postgres connection string (Supabase Dashboard > Settings > Database)
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+INPUT_DIR = os.environ.get("DERMODEL_OUTPUT_DIR", "/Users/jaewookang/Downloads/jaewookng/projects/dermodel")
+COPY_BLOCK_BYTES = 1 << 20
+
+# Loaded in this order (join table last because of its foreign keys), deleted in reverse.
+# Staging columns are loose so e.g. "3.0" from a float column still loads into INTEGER.
+TABLES = [
+    # (target table, exported file, key columns, {column: staging type})
+    ("sss_products", "products", ["product_id"],
+     {"product_id": "text", "product_name": "text", "ingredient_count": "numeric"}),
+    ("sss_ingredients", "ingredients", ["ingredient_id"],
+     {"ingredient_id": "text", "ingredient_name": "text", "product_count": "numeric", "avg_position": "numeric"}),
+    ("sss_product_ingredients_join", "product_ingredients", ["product_id", "ingredient_id"],
+     {"product_id": "text", "ingredient_id": "text", "position": "numeric"}),
+]
+
+# Derived from the tables above and replaced wholesale when its file is present
+# (process_ingredients.py --neighbors); stale neighbors are never worth keeping
+NEIGHBORS_TABLE = ("sss_ingredient_neighbors", "ingredient_neighbors",
+                   {"ingredient_id": "text", "neighbor_id": "text", "rank": "numeric",
+                    "cooccurrence": "numeric", "similarity": "numeric"})
+
+
+def log(message: str):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+
+# ============================================================================
+# COPY / UPSERT
+# ============================================================================
+
+def copy_csv(cur, staging: str, columns: list, path: str) -> int:
+    """Stream a CSV file into `staging` with COPY FROM STDIN, returns rows copied"""
+    column_list = ", ".join(columns)
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        header = f.readline().decode().strip().split(",")
+        if header != columns:
+            raise ValueError(f"{path}: expected columns {columns}, found {header}")
+        with cur.copy(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)") as copy:
+            while block := f.read(COPY_BLOCK_BYTES):
+                copy.write(block)
+    rows = cur.rowcount
+    elapsed = time.perf_counter() - started
+    log(f"  COPY {os.path.basename(path)}: {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows
+
+
+def create_staging(cur, name: str, types: dict):
+    columns = ", ".join(f"{column} {sql_type}" for column, sql_type in types.items())
+    cur.execute(f"CREATE TEMP TABLE {name} ({columns}) ON COMMIT DROP")
+
+
+def upsert(cur, table: str, staging: str, keys: list, columns: list) -> int:
+    """INSERT ... ON CONFLICT DO UPDATE from staging, skipping rows that did not change"""
+    column_list = ", ".join(columns)
+    values = [c for c in columns if c not in keys]
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in values)
+    changed = " OR ".join(f"{table}.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in values)
+    cur.execute(
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates} WHERE {changed}"
+    )
+    return cur.rowcount
+
+
+def delete_keys(cur, table: str, staging: str, keys: list, missing: bool) -> int:
+    """Delete rows whose key is in `staging` (or, with missing=True, not in it)"""
+    match = " AND ".join(f"s.{k} = t.{k}" for k in keys)
+    exists = "NOT EXISTS" if missing else "EXISTS"
+    cur.execute(f"DELETE FROM {table} t WHERE {exists} (SELECT 1 FROM {staging} s WHERE {match})")
+    return cur.rowcount
+
+
+def replace_table(cur, table: str, staging: str, columns: list) -> int:
+    """Swap the contents of `table` for the staging rows (same transaction, so readers never see it empty)"""
+    column_list = ", ".join(columns)
+    cur.execute(f"DELETE FROM {table}")
+    cur.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging}")
+    return cur.rowcount
+
+
+def count_legacy_ids(cur) -> int:
+    """Products/ingredients whose id is not a UUIDv5 (random uuid4s from before the remap migration)"""
+    cur.execute(
+        "SELECT (SELECT count(*) FROM sss_products WHERE substr(product_id, 15, 1) <> '5') + "
+        "(SELECT count(*) FROM sss_ingredients WHERE substr(ingredient_id, 15, 1) <> '5')"
+    )
+    return cur.fetchone()[0]
+
+
+def load(dsn: str, input_dir: str, delta: bool = False, delete_missing: bool = False) -> int:
+    """Load all tables in one transaction, returns total rows copied"""
+    source_dir = os.path.join(input_dir, "delta") if delta else input_dir
+    started = time.perf_counter()
+    copied = 0
+
+    with psycopg.connect(dsn) as conn:  # commits on success, rolls back on error
+        with conn.cursor() as cur:
+            # The CSVs only carry UUIDv5 ids, so a full sync would delete every older row
+            # and cascade to product_favorites
+            if delete_missing and (legacy := count_legacy_ids(cur)):
+                raise RuntimeError(f"{legacy} rows still have pre-UUIDv5 ids; apply "
+                                   "20261016000200_remap_sss_ids_to_uuid5.sql before --delete-missing")
+
+            for table, file_name, keys, types in TABLES:
+                staging = f"stage_{table}"
+                create_staging(cur, staging, types)
+                copied += copy_csv(cur, staging, list(types), os.path.join(source_dir, f"{file_name}.csv"))
+                log(f"  {table}: {upsert(cur, table, staging, keys, list(types))} rows inserted/updated")
+
+                if delta:
+                    removed = f"stage_{table}_removed"
+                    create_staging(cur, removed, {k: types[k] for k in keys})
+                    copied += copy_csv(cur, removed, keys, os.path.join(source_dir, f"{file_name}_removed.csv"))
+
+            # Deletes run child-first so foreign keys never see a dangling row
+            for table, _, keys, _ in reversed(TABLES):
+                if delta:
+                    log(f"  {table}: {delete_keys(cur, table, f'stage_{table}_removed', keys, False)} rows deleted")
+                elif delete_missing:
+                    log(f"  {table}: {delete_keys(cur, table, f'stage_{table}', keys, True)} rows deleted")
+
+            # Neighbors reference ingredients, so they load after the deletes above
+            table, file_name, types = NEIGHBORS_TABLE
+            path = os.path.join(input_dir, f"{file_name}.csv")
+            if os.path.exists(path):
+                create_staging(cur, f"stage_{table}", types)
+                copied += copy_csv(cur, f"stage_{table}", list(types), path)
+                log(f"  {table}: replaced with {replace_table(cur, table, f'stage_{table}', list(types))} rows")
+
+    elapsed = time.perf_counter() - started
+    log(f"Committed {copied} rows in {elapsed:.2f}s ({copied / max(elapsed, 1e-9):,.0f} rows/sec overall)")
+    return copied
+
+
+# ============================================================================
+# MAIN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load process_ingredients.py output into Postgres")
+    parser.add_argument("--dsn", default=DATABASE_URL, help="Postgres connection string (default: $DATABASE_URL)")
+    parser.add_argument("--input-dir", default=INPUT_DIR, help="directory with the exported CSVs")
+    parser.add_argument("--delta", action="store_true",
+                        help="load INPUT_DIR/delta/ (from process_ingredients.py --previous-dir)")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="full sync: delete rows that are not in the CSVs (cascades to product_favorites!)")
+    args = parser.parse_args()
+
+    if psycopg is None:
+        parser.error("psycopg is not installed: pip install 'psycopg[binary]'")
+    if not args.dsn:
+        parser.error("set DATABASE_URL or pass --dsn")
+    if args.delta and args.delete_missing:
+        parser.error("--delete-missing only applies to full loads")
+
+    log(f"Loading {'delta from ' if args.delta else ''}{args.input_dir}")
+    load(args.dsn, args.input_dir, args.delta, args.delete_missing)
+
+
+if __name__ == "__main__":
+    main()
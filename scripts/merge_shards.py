@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Merge the per-shard checkpoints and logs of populate_papers.py --shard i/N
+
+Usage:
+    python merge_shards.py [--force] [--checkpoints 'checkpoint.shard*.jsonl'] [--logs 'populate_papers.shard*.log']
+
+Writes:
+    - checkpoint.jsonl: the existing merged checkpoint (or, before the first merge, the legacy
+      checkpoint.json) plus every shard's processed ingredients, paper totals summed (later
+      runs, sharded or not, skip everything in it); merging the same shards again is a no-op
+    - populate_papers.log: all shard logs interleaved by timestamp, each line tagged [i/N]
+
+Names that appear in more than one shard checkpoint (e.g. after changing N) are reported;
+they are counted once.
+"""
+
+import os
+import re
+import glob
+import heapq
+import argparse
+
+from checkpoint_journal import CheckpointJournal
+
+SHARD_PATTERN = re.compile(r"\.shard(\d+)of(\d+)\.")
+TIMESTAMP = re.compile(r"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] ")
+
+
+def shard_tag(path: str) -> str:
+    match = SHARD_PATTERN.search(os.path.basename(path))
+    return f"[{match[1]}/{match[2]}]" if match else f"[{os.path.basename(path)}]"
+
+
+def merge_checkpoints(paths: list, output: str, legacy_path: str = None) -> CheckpointJournal:
+    """Add every shard's processed names and paper total to the merged checkpoint (one snapshot)
+
+    The existing merged checkpoint (or, before the first merge, the legacy checkpoint.json) is
+    the starting point: shard runs skip the names in it, so no shard file holds them. A shard
+    merged before is counted once: its earlier paper total is replaced by its current one.
+    """
+    merged = CheckpointJournal(output, legacy_path=legacy_path).load(write=False)
+    if merged.processed:
+        source = output if os.path.exists(output) else legacy_path
+        print(f"  {source}: {len(merged.processed)} ingredients, {merged.total_papers} papers (already merged)")
+    owner = {}
+    overlaps = 0
+    for path in paths:
+        shard = CheckpointJournal(path).load()
+        for name in shard.processed:
+            if name in owner:
+                overlaps += 1
+            else:
+                owner[name] = path
+        merged.processed.update(shard.processed)
+        name = os.path.basename(path)
+        merged.total_papers += shard.total_papers - merged.merged_shards.get(name, 0)
+        merged.merged_shards[name] = shard.total_papers
+        print(f"  {path}: {len(shard.processed)} ingredients, {shard.total_papers} papers")
+    merged.last_index = len(merged.processed)
+    merged.compact()
+    if overlaps:
+        print(f"  {overlaps} ingredients were processed by more than one shard")
+    return merged
+
+
+def log_records(path: str):
+    """(timestamp, tag, lines) per log entry; untimestamped lines stay with the entry above"""
+    tag = shard_tag(path)
+    timestamp, lines = "", []
+    with open(path) as f:
+        for line in f:
+            match = TIMESTAMP.match(line)
+            if match and lines:
+                yield timestamp, tag, lines
+                lines = []
+            if match:
+                timestamp = match[1]
+                line = f"[{timestamp}] {tag} {line[match.end():]}"
+            lines.append(line)
+    if lines:
+        yield timestamp, tag, lines
+
+
+def merge_logs(paths: list, output: str) -> int:
+    """Interleave shard logs by timestamp (each log is already in order, so this streams)
+
+    Written to a temp file and renamed over `output`, so an existing log is only replaced
+    once everything was read (it may be one of the inputs).
+    """
+    entries = 0
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "w") as out:
+        for _, _, lines in heapq.merge(*(log_records(path) for path in paths), key=lambda r: r[0]):
+            out.writelines(lines)
+            entries += 1
+    os.replace(tmp_path, output)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge populate_papers.py shard checkpoints and logs")
+    parser.add_argument("--checkpoints", default="checkpoint.shard*of*.jsonl", help="shard checkpoint glob")
+    parser.add_argument("--logs", default="populate_papers.shard*of*.log", help="shard log glob")
+    parser.add_argument("--output", default="checkpoint.jsonl", help="merged checkpoint")
+    parser.add_argument("--log-output", default="populate_papers.log", help="merged log")
+    parser.add_argument("--legacy", default="checkpoint.json",
+                        help="pre-journal checkpoint, the starting point when --output does not exist yet")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite an existing --log-output (the checkpoint is always merged into)")
+    args = parser.parse_args()
+
+    checkpoints = sorted(glob.glob(args.checkpoints))
+    logs = sorted(glob.glob(args.logs))
+    if not checkpoints:
+        parser.error(f"no shard checkpoints match {args.checkpoints}")
+    if logs and os.path.exists(args.log_output) and not args.force:
+        parser.error(f"{args.log_output} exists, pass --force to overwrite it")
+
+    print(f"Merging {len(checkpoints)} checkpoints into {args.output}")
+    merged = merge_checkpoints(checkpoints, args.output, args.legacy)
+    print(f"  -> {len(merged.processed)} ingredients, {merged.total_papers} papers")
+
+    if logs:
+        entries = merge_logs(logs, args.log_output)
+        print(f"Merged {len(logs)} logs into {args.log_output} ({entries} entries)")
+
+
+if __name__ == "__main__":
+    main()
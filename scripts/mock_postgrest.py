@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Local in-memory mock of the Supabase REST API (PostgREST) for testing populate_papers.py offline
+
+Usage:
+    python mock_postgrest.py [--port 8766] [--names names.txt] [--latency 0.005]
+    SUPABASE_URL=http://localhost:8766 python populate_papers.py
+
+Serves /rest/v1/<table> with the subset of PostgREST that populate_papers.py uses:
+    GET    select=, order=col.asc, limit=, offset=, col=eq.x / gt.x filters (keyset paging)
+    POST   bulk insert, ?on_conflict=a,b with Prefer: resolution=ignore-duplicates or
+           merge-duplicates, and return=representation
+    PATCH  update rows matching the filters
+    POST   /rest/v1/rpc/paper_refresh_candidates and /rest/v1/rpc/touch_ingredient_references
+           (Python versions of the SQL functions in 20261016000600_incremental_paper_refresh.sql)
+
+The ingredients (FDA, "INGREDIENT_NAME") and COSING_ingredients ("INCI name") tables are
+seeded from --names (one per line, split between the two tables with some overlap);
+ingredients_master does not exist (404), like on a database without that migration.
+"""
+
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class Table:
+    """Rows plus optional unique key, guarded by one lock"""
+
+    def __init__(self, rows=None, unique=None, defaults=None):
+        self.rows = rows or []
+        self.unique = unique
+        self.defaults = defaults or {}  # column -> callable, like a column DEFAULT
+        self.keys = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def matches(self, row, filters):
+        for column, op, value in filters:
+            current = row.get(column)
+            if current is None:
+                return False
+            # Query strings are text; compare numbers as numbers (id=gt.999)
+            value = type(current)(value) if isinstance(current, (int, float)) else value
+            if op == "eq" and current != value:
+                return False
+            if op == "gt" and not current > value:
+                return False
+        return True
+
+    def select(self, filters, order, limit, offset):
+        with self.lock:
+            rows = [row for row in self.rows if self.matches(row, filters)]
+        if order:
+            column, _, direction = order.partition(".")
+            column = column.strip('"')
+            present = [row for row in rows if row.get(column) is not None]
+            present.sort(key=lambda row: row[column], reverse=direction.startswith("desc"))
+            rows = present + [row for row in rows if row.get(column) is None]  # NULLS LAST
+        return rows[offset:offset + limit if limit is not None else None]
+
+    def insert(self, rows, conflict, resolution):
+        """Insert rows, returns the rows written"""
+        written = []
+        with self.lock:
+            for row in rows:
+                row = dict(row)
+                key = tuple(row.get(column) for column in conflict) if conflict else None
+                if key is not None and key in self.keys:
+                    if resolution == "merge-duplicates":
+                        self.keys[key].update(row)
+                        written.append(self.keys[key])
+                    continue
+                row.setdefault("id", self.next_id)
+                for column, default in self.defaults.items():
+                    row.setdefault(column, default())
+                self.next_id += 1
+                self.rows.append(row)
+                if key is not None:
+                    self.keys[key] = row
+                written.append(row)
+        return written
+
+    def update(self, filters, changes):
+        with self.lock:
+            rows = [row for row in self.rows if self.matches(row, filters)]
+            for row in rows:
+                row.update(changes)
+        return len(rows)
+
+
+def project(rows, select):
+    if not select or select == "*":
+        return rows
+    columns = [column.strip().strip('"') for column in select.split(",")]
+    return [{column: row.get(column) for column in columns} for row in rows]
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def paper_refresh_candidates(tables: dict, source: str = "tables", max_age_days: float = None) -> list:
+    """Names without papers or with papers older than max_age_days (no product counts here)"""
+    if source == "master":
+        raise LookupError("relation \"ingredients_master\" does not exist")
+    names = set()
+    for table, column in (("ingredients", "INGREDIENT_NAME"), ("COSING_ingredients", "INCI name")):
+        with tables[table].lock:
+            names.update(row[column].strip() for row in tables[table].rows if (row.get(column) or "").strip())
+    last_fetched = {}
+    references = tables["ingredient_references_master"]
+    with references.lock:
+        for row in references.rows:
+            name = row["ingredient_name"]
+            last_fetched[name] = max(last_fetched.get(name, ""), row["fetched_at"])
+    cutoff = None
+    if max_age_days is not None:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+    candidates = [{"name": name, "last_fetched": last_fetched.get(name), "product_count": None}
+                  for name in names
+                  if name not in last_fetched or (cutoff is not None and last_fetched[name] < cutoff)]
+    # product_count is NULL for every name, so: new names first, then oldest first
+    candidates.sort(key=lambda row: (row["last_fetched"] is not None, row["last_fetched"] or "", row["name"]))
+    return candidates
+
+
+def touch_ingredient_references(tables: dict, names: list) -> int:
+    names = set(names)
+    references = tables["ingredient_references_master"]
+    with references.lock:
+        rows = [row for row in references.rows if row["ingredient_name"] in names]
+        stamp = now()
+        for row in rows:
+            row["fetched_at"] = stamp
+    return len(rows)
+
+
+FUNCTIONS = {
+    "paper_refresh_candidates": paper_refresh_candidates,
+    "touch_ingredient_references": touch_ingredient_references,
+}
+
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    tables = {}
+    latency = 0.0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def route(self):
+        """(table, params, filters) for /rest/v1/<table>, or None after answering 404"""
+        PostgrestHandler.requests += 1
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        name = url.path.rsplit("/", 1)[-1]
+        table = self.tables.get(name)
+        if not url.path.startswith("/rest/v1/") or table is None:
+            self.send_json(404, {"code": "PGRST205", "message": f"Could not find the table 'public.{name}'"})
+            return None
+        params = dict(parse_qsl(url.query))
+        filters = []
+        for column, value in params.items():
+            if column not in RESERVED_PARAMS:
+                op, _, operand = value.partition(".")
+                filters.append((column.strip('"'), op, operand))
+        return table, params, filters
+
+    def read_body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+
+    def do_GET(self):
+        routed = self.route()
+        if routed:
+            table, params, filters = routed
+            limit = int(params["limit"]) if "limit" in params else None
+            rows = table.select(filters, params.get("order"), limit, int(params.get("offset", 0)))
+            self.send_json(200, project(rows, params.get("select")))
+
+    def call_function(self, name: str, params: dict):
+        PostgrestHandler.requests += 1
+        time.sleep(self.latency)
+        function = FUNCTIONS.get(name)
+        if function is None:
+            self.send_json(404, {"code": "PGRST202", "message": f"Could not find the function public.{name}"})
+            return
+        try:
+            self.send_json(200, function(self.tables, **(params or {})))
+        except LookupError as e:
+            self.send_json(400, {"code": "42P01", "message": str(e)})
+
+    def do_POST(self):
+        body = self.read_body()
+        path = urlparse(self.path).path
+        if path.startswith("/rest/v1/rpc/"):
+            self.call_function(path.rsplit("/", 1)[-1], body)
+            return
+        routed = self.route()
+        if routed:
+            table, params, _ = routed
+            prefer = self.headers.get("Prefer", "")
+            resolution = next((p.split("=", 1)[1] for p in prefer.split(",") if p.strip().startswith("resolution=")), None)
+            conflict = params.get("on_conflict", "").split(",") if params.get("on_conflict") else table.unique
+            rows = body if isinstance(body, list) else [body]
+            written = table.insert(rows, conflict, resolution and resolution.strip())
+            if "return=representation" in prefer:
+                self.send_json(201, project(written, params.get("select")))
+            else:
+                self.send_json(201)
+
+    def do_PATCH(self):
+        body = self.read_body()
+        routed = self.route()
+        if routed:
+            table, _, filters = routed
+            table.update(filters, body)
+            self.send_json(204)
+
+
+def seed_tables(names: list) -> dict:
+    """FDA gets the first 60% of names, COSING the last 60% (so 20% are in both)"""
+    cut_fda, cut_cosing = int(len(names) * 0.6), int(len(names) * 0.4)
+    return {
+        "ingredients": Table([{"INGREDIENT_NAME": name} for name in names[:cut_fda]]),
+        "COSING_ingredients": Table([{"INCI name": name} for name in names[cut_cosing:]]),
+        "ingredient_references_master": Table(unique=["ingredient_name", "title"], defaults={"fetched_at": now}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Supabase REST (PostgREST) API")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--names", help="ingredient names, one per line (default: 1000 generated names)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    if args.names:
+        with open(args.names) as f:
+            names = [line.strip() for line in f if line.strip()]
+    else:
+        names = [f"INGREDIENT {i}" for i in range(1000)]
+    PostgrestHandler.tables = seed_tables(names)
+    PostgrestHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), PostgrestHandler)
+    print(f"Mock PostgREST on http://127.0.0.1:{args.port} ({len(names)} ingredient names)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    papers = len(PostgrestHandler.tables["ingredient_references_master"].rows)
+    print(f"Served {PostgrestHandler.requests} requests, stored {papers} papers")
+
+
+if __name__ == "__main__":
+    main()
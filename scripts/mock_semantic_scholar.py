@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Semantic Scholar Graph API for testing populate_papers.py offline
+
+Usage:
+    python mock_semantic_scholar.py [--port 8765] [--rps 5] [--latency 0.2]
+    SEMANTIC_SCHOLAR_BASE=http://localhost:8765/graph/v1 python populate_papers.py
+
+Serves deterministic fake papers (about a third off topic) for GET /graph/v1/paper/search and
+POST /graph/v1/paper/batch and enforces its own request rate, answering 429 with a Retry-After
+header when clients go too fast.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class RateLimit:
+    """Thread-safe token bucket for the server side"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def fake_paper(query: str, rank: int) -> dict:
+    """Deterministic paper for a query, so reruns see the same results"""
+    digest = hashlib.sha1(f"{query}:{rank}".encode()).hexdigest()
+    topic = query.replace(" skin", "")
+    on_topic = int(digest[4:6], 16) % 3 != 0  # like real searches, some hits only match "skin"
+    return {
+        "paperId": digest,
+        "title": f"Effects of {topic} on skin barrier function ({rank + 1})" if on_topic
+                 else f"Transepidermal water loss in atopic skin ({rank + 1})",
+        "authors": [{"name": f"Author {digest[i:i + 4]}"} for i in range(0, 24, 4)],
+        "year": 1990 + int(digest[:4], 16) % 35,
+        "venue": ["J Cosmet Dermatol", "Int J Cosmet Sci", "Skin Pharmacol Physiol"][rank % 3],
+        "externalIds": {"DOI": f"10.0000/{digest[:12]}"},
+        "url": f"https://www.semanticscholar.org/paper/{digest}",
+        "abstract": f"We studied {topic if on_topic else 'barrier function'} in human skin. " * 8,
+    }
+
+
+def fake_metadata(paper_id: str):
+    """Batch lookup result for an id (null for ids this mock never served)"""
+    if paper_id.startswith("DOI:"):
+        digest = hashlib.sha1(paper_id.encode()).hexdigest()
+    elif len(paper_id) == 40:
+        digest = paper_id
+    else:
+        return None
+    return {
+        "paperId": digest,
+        "year": 1990 + int(digest[:4], 16) % 35,
+        "venue": ["J Cosmet Dermatol", "Int J Cosmet Sci", "Skin Pharmacol Physiol"][int(digest[4], 16) % 3],
+        "externalIds": {"DOI": f"10.0000/{digest[:12]}"},
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    rate_limit = None
+    latency = 0.0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def throttled(self) -> bool:
+        MockHandler.requests += 1
+        if not self.rate_limit.allow():
+            self.send_json(429, {"message": "Too Many Requests"}, {"Retry-After": "1"})
+            return True
+        time.sleep(self.latency)
+        return False
+
+    def do_POST(self):
+        # Read the body first so a 429 leaves the connection reusable
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.throttled():
+            return
+        url = urlparse(self.path)
+        if url.path.endswith("/paper/batch"):
+            ids = body.get("ids", [])
+            if len(ids) > 500:
+                self.send_json(400, {"error": "Cannot process more than 500 ids"})
+                return
+            self.send_json(200, [fake_metadata(paper_id) for paper_id in ids])
+        else:
+            self.send_json(404, {"error": f"unknown path {url.path}"})
+
+    def do_GET(self):
+        if self.throttled():
+            return
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path.endswith("/paper/search"):
+            query = params.get("query", [""])[0]
+            limit = int(params.get("limit", ["10"])[0])
+            # Roughly one in five queries finds nothing, like obscure INCI names do
+            hits = 0 if int(hashlib.sha1(query.encode()).hexdigest(), 16) % 5 == 0 else limit
+            papers = [fake_paper(query, rank) for rank in range(hits)]
+            self.send_json(200, {"total": hits, "offset": 0, "data": papers})
+        else:
+            self.send_json(404, {"error": f"unknown path {url.path}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Semantic Scholar API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rps", type=float, default=5.0, help="allowed requests/sec (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every response")
+    args = parser.parse_args()
+
+    MockHandler.rate_limit = RateLimit(args.rps, args.burst)
+    MockHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockHandler)
+    print(f"Mock Semantic Scholar on http://127.0.0.1:{args.port}/graph/v1 ({args.rps} req/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served {MockHandler.requests} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+BM25 relevance of fetched papers to the ingredient they were searched for
+
+Semantic Scholar ranks "{name} skin" by its own relevance, so the first few hits often only
+mention skin. populate_papers.py over-fetches candidates in the same single request and keeps
+the best PAPERS_PER_INGREDIENT by BM25 of the ingredient name against title + abstract
+(the title counts TITLE_WEIGHT times), scoring a whole checkpoint batch at once:
+
+    - Texts are tokenized as bytes in numpy: runs of lowercase ASCII letters/digits and
+      non-ASCII characters, so no per-token Python strings are built
+    - Only document tokens whose (length, first byte, last byte) matches a query term are
+      hashed (64-bit polynomial hash) and matched against the query terms by np.searchsorted
+    - Term frequencies are np.unique counts of (document, term) keys, document frequencies a
+      np.bincount over them (IDF is taken over the batch's candidates)
+    - A (document, term) pair counts when (the document's query, term) is a query term (np.isin)
+    - Scores are np.bincount sums over the matching pairs, divided by the query's maximum
+      (every term present, tf -> infinity), so relevance is in [0, 1] for short and long names
+
+A candidate is kept when it is among its query's top_k and scores at least min_score. The
+query's identifier tokens (single characters, tokens with a digit: "Vitamin C", "PEG-40")
+must all appear, or the candidate scores 0. A query with nothing to score (ideal score 0)
+keeps its first top_k candidates in search order, with a NaN score.
+
+Usage:
+    ranker = RelevanceRanker(top_k=4, min_score=0.2)
+    scores = ranker.score(queries, documents, query_of)  # documents: (title, abstract)
+    kept = ranker.select(scores, query_of)               # document indices, best first per query
+
+    python paper_relevance.py --benchmark 50000
+"""
+
+import re
+import time
+import argparse
+
+import numpy as np
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2
+TOP_K = 4
+MIN_SCORE = 0.2
+CANDIDATES = 20  # per ingredient in the benchmark, like populate_papers.py
+CHUNK_BYTES = 1 << 20  # texts tokenized per numpy pass
+HASH_BASE = 0x100000001B3
+# Token bytes: ASCII letters/digits, and every byte of a UTF-8 encoded non-ASCII character
+WORD_BYTES = np.zeros(256, dtype=bool)
+WORD_BYTES[np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)] = True
+WORD_BYTES[0x80:] = True
+WORD = re.compile(r"[a-z0-9\u0080-\U0010ffff]+")  # the same tokens, on str
+FINGERPRINT_LENGTH = 63  # token lengths are capped at this in fingerprints
+FINGERPRINTS = (FINGERPRINT_LENGTH + 1) << 16
+_powers = [np.zeros(0, dtype=np.uint64)]  # HASH_BASE ** (i + 1)
+
+
+def hash_powers(size: int) -> np.ndarray:
+    """Powers of HASH_BASE mod 2**64, grown on demand"""
+    if len(_powers[0]) < size:
+        size = 1 << max(size - 1, 1).bit_length()
+        _powers[0] = np.cumprod(np.full(size, HASH_BASE, dtype=np.uint64))  # wraps mod 2**64
+    return _powers[0]
+
+
+def token_bounds(data: np.ndarray):
+    """(starts, ends) of the tokens in a uint8 array of lowercased bytes"""
+    word = np.zeros(len(data) + 2, dtype=bool)
+    word[1:-1] = WORD_BYTES[data]
+    edges = np.flatnonzero(word[1:] != word[:-1])  # alternating token starts and ends
+    return edges[0::2], edges[1::2]
+
+
+def fingerprints(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """(capped length, first byte, last byte) of each token packed into an index below FINGERPRINTS"""
+    lengths = np.minimum(ends - starts, FINGERPRINT_LENGTH)
+    return (lengths << 16) | (data[starts].astype(np.int64) << 8) | data[ends - 1]
+
+
+def hash_tokens(data: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """64-bit hash of each token: sum of byte * HASH_BASE ** (i + 1) over its bytes, mod 2**64"""
+    lengths = ends - starts
+    if not len(lengths):
+        return np.zeros(0, dtype=np.uint64)
+    firsts = np.cumsum(lengths) - lengths
+    offsets = np.arange(firsts[-1] + lengths[-1]) - np.repeat(firsts, lengths)
+    values = data[np.repeat(starts, lengths) + offsets] * hash_powers(int(lengths.max()))[offsets]
+    return np.add.reduceat(values, firsts)
+
+
+def tokenize(texts: list, keep: np.ndarray = None):
+    """(index of the text, 64-bit hash, fingerprint) of every token, and the token count of each text
+
+    With `keep` (a boolean array over fingerprints) only the tokens whose fingerprint is set are
+    hashed and returned: a query vocabulary rules out almost every document token by its
+    length and first and last bytes, so most bytes are never hashed.
+    """
+    encoded = [text.lower().encode() if text else b"" for text in texts]
+    ends = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) + 1)  # + separator
+    owners, prints, counts = ([np.zeros(0, dtype=np.int64)] for _ in range(3))
+    hashes = [np.zeros(0, dtype=np.uint64)]
+    first = 0
+    while first < len(encoded):
+        base = ends[first - 1] if first else 0
+        last = max(int(np.searchsorted(ends, base + CHUNK_BYTES, side="right")), first + 1)
+        data = np.frombuffer(b"\n".join(encoded[first:last]), dtype=np.uint8)
+        starts, stops = token_bounds(data)
+        text_ends = ends[first:last] - base
+        counts.append(np.diff(np.searchsorted(starts, text_ends), prepend=0))
+        chunk_prints = fingerprints(data, starts, stops)
+        if keep is not None:
+            kept = keep[chunk_prints]
+            starts, stops, chunk_prints = starts[kept], stops[kept], chunk_prints[kept]
+        owners.append(first + np.searchsorted(text_ends, starts, side="right"))
+        hashes.append(hash_tokens(data, starts, stops))
+        prints.append(chunk_prints)
+        first = last
+    return np.concatenate(owners), np.concatenate(hashes), np.concatenate(prints), np.concatenate(counts)
+
+
+def identifier_tokens(query: str) -> str:
+    """The query's single characters and tokens with a digit ("C" in "Vitamin C", "40" in "PEG-40")"""
+    return " ".join(token for token in WORD.findall(query.lower())
+                    if len(token) == 1 or any(char.isdigit() for char in token))
+
+
+class RelevanceRanker:
+    """Vectorized BM25 over many (query, candidate documents) groups scored together"""
+
+    def __init__(self, top_k: int = TOP_K, min_score: float = MIN_SCORE, k1: float = K1, b: float = B,
+                 title_weight: int = TITLE_WEIGHT):
+        self.top_k = top_k
+        self.min_score = min_score
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+
+    def score(self, queries: list, documents: list, query_of) -> np.ndarray:
+        """Relevance in [0, 1] of each (title, abstract) document to queries[query_of[i]]
+
+        NaN for the documents of a query without a single token to score (select() then keeps
+        them in search order). Documents missing one of their query's identifier tokens score 0.
+        """
+        query_of = np.asarray(query_of, dtype=np.int64)
+        n_docs = len(documents)
+        query_owner, query_hashes, query_prints, _ = tokenize(queries)
+        if n_docs == 0 or len(query_hashes) == 0:
+            return np.full(n_docs, np.nan)
+
+        # Query terms are the vocabulary; other document tokens only count towards its length
+        vocabulary, query_terms = np.unique(query_hashes, return_inverse=True)
+        size = len(vocabulary)
+        query_keys = np.unique(query_owner * size + query_terms.ravel())  # distinct per query
+        query_index, query_terms = query_keys // size, query_keys % size
+        identifier_owner, identifier_hashes, _, _ = tokenize([identifier_tokens(query) for query in queries])
+        required = np.unique(identifier_owner * size + np.searchsorted(vocabulary, identifier_hashes))
+        keep = np.zeros(FINGERPRINTS, dtype=bool)
+        keep[query_prints] = True
+
+        texts = [f"{title or ''}\n" * self.title_weight + (abstract or "") for title, abstract in documents]
+        owner, hashes, _, lengths = tokenize(texts, keep)
+        at = np.minimum(np.searchsorted(vocabulary, hashes), size - 1)
+        hit = vocabulary[at] == hashes
+
+        pairs, tf = np.unique(owner[hit] * size + at[hit], return_counts=True)
+        docs, terms = pairs // size, pairs % size
+        df = np.bincount(terms, minlength=size)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        keys = query_of[docs] * size + terms
+        match = np.isin(keys, query_keys)
+        docs, terms, tf, keys = docs[match], terms[match], tf[match], keys[match]
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1))
+        weights = idf[terms] * tf * (self.k1 + 1) / (tf + norm[docs])
+        raw = np.bincount(docs, weights=weights, minlength=n_docs)
+
+        # "Vitamin D" is not about "Vitamin C", however much it says "vitamin"
+        found = np.bincount(docs[np.isin(keys, required)], minlength=n_docs)
+        needed = np.bincount(required // size, minlength=len(queries))
+        raw[found < needed[query_of]] = 0
+
+        ideal = np.bincount(query_index, weights=idf[query_terms] * (self.k1 + 1), minlength=len(queries))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(ideal[query_of] > 0, raw / ideal[query_of], np.nan)
+
+    def select(self, scores: np.ndarray, query_of) -> np.ndarray:
+        """Indices of the kept documents, grouped by query, best first (ties keep search order)
+
+        Unscored (NaN) documents keep their search order and are not held to min_score.
+        """
+        query_of = np.asarray(query_of, dtype=np.int64)
+        unscored = np.isnan(scores)
+        order = np.lexsort((np.arange(len(scores)), -np.where(unscored, 0, scores), query_of))
+        grouped = query_of[order]
+        first = np.searchsorted(grouped, grouped)  # position of each query's first document
+        rank = np.arange(len(order)) - first
+        keep = (rank < self.top_k) & ((scores[order] >= self.min_score) | unscored[order])
+        return order[keep]
+
+
+def synthetic_batch(n_docs: int, per_query: int = CANDIDATES, seed: int = 0):
+    """(queries, documents, query_of): INCI-like names with ~1,500 character abstracts; a third
+    of the candidates are about the ingredient, the rest share at most one word of its name"""
+    rng = np.random.default_rng(seed)
+    filler = np.asarray([f"term{i}" for i in range(5000)] + ["skin", "barrier", "patients", "topical"])
+    parts = np.asarray(["sodium", "hyaluronate", "glyceryl", "stearate", "ascorbic", "acid", "niacinamide",
+                        "panthenol", "retinol", "tocopherol", "acetate", "zinc", "oxide", "ceramide", "peg-40"])
+    n_queries = max(1, n_docs // per_query)
+    queries = [" ".join(rng.choice(parts, rng.integers(1, 4), replace=False)).title() for _ in range(n_queries)]
+    query_of = np.arange(n_docs) // per_query % n_queries
+    documents = []
+    for d in range(n_docs):
+        words = list(rng.choice(filler, 190))
+        name = queries[query_of[d]].split()
+        inserted = name * 4 if d % 3 == 0 else [rng.choice(name)] * int(rng.integers(0, 3))
+        for word in inserted:
+            words.insert(int(rng.integers(len(words))), word)
+        documents.append((" ".join(words[:10]).capitalize(), " ".join(words) + "."))
+    return queries, documents, query_of
+
+
+def benchmark(n_docs: int, batch: int = 2000):
+    """Score and select n_docs synthetic candidates in checkpoint-sized batches"""
+    queries, documents, query_of = synthetic_batch(n_docs)
+    ranker = RelevanceRanker()
+    scores, kept = np.zeros(n_docs), []
+    started = time.perf_counter()
+    for first in range(0, n_docs, batch):
+        # Renumber this batch's queries, as populate_papers.py does per checkpoint batch
+        batch_queries, batch_query_of = np.unique(query_of[first:first + batch], return_inverse=True)
+        batch_scores = ranker.score([queries[q] for q in batch_queries], documents[first:first + batch],
+                                    batch_query_of)
+        scores[first:first + batch] = batch_scores
+        kept.append(first + ranker.select(batch_scores, batch_query_of))
+    seconds = time.perf_counter() - started
+    kept = np.concatenate(kept)
+
+    on_topic = np.arange(n_docs) % 3 == 0
+    print(f"{n_docs} abstracts ({sum(len(a) for _, a in documents) / n_docs:,.0f} chars), {batch} per batch: "
+          f"{seconds:.2f}s, {n_docs / seconds:,.0f} abstracts/s")
+    print(f"  mean relevance: about the ingredient {scores[on_topic].mean():.2f}, "
+          f"others {scores[~on_topic].mean():.2f}")
+    first_hits = on_topic[np.arange(n_docs) % CANDIDATES < ranker.top_k]
+    print(f"  kept {len(kept)} of {n_docs}, {on_topic[kept].mean():.0%} about the ingredient "
+          f"(first {ranker.top_k} in search order: {first_hits.mean():.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 relevance ranking of fetched papers")
+    parser.add_argument("--benchmark", type=int, metavar="N", required=True,
+                        help=f"score N synthetic abstracts, {CANDIDATES} candidates per ingredient")
+    parser.add_argument("--batch", type=int, default=2000, help="candidates scored together (default: 2000)")
+    args = parser.parse_args()
+    benchmark(args.benchmark, args.batch)
+
+
+if __name__ == "__main__":
+    main()
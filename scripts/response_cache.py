@@ -0,0 +1,105 @@
+"""
+Persistent Semantic Scholar response cache used by populate_papers.py
+
+Successful API responses are stored in SQLite, keyed by method, URL and the sorted
+query parameters (the normalized search query plus the requested field set), with
+zlib-compressed JSON bodies. Entries expire after a TTL; when the cache grows past
+its size limit the least recently used entries are evicted.
+
+Usage:
+    from response_cache import ResponseCache
+
+    cache = ResponseCache("s2_cache.sqlite", ttl=30 * 86400, max_bytes=512 << 20)
+    key = cache.key("GET", url, params)
+    cache.get(key)          # -> decoded JSON or None (missing or expired)
+    cache.put(key, data)
+    cache.cache_info()      # -> {"hits": ..., "misses": ..., "entries": ..., "bytes": ...}
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+
+DEFAULT_TTL = 30 * 86400  # seconds
+DEFAULT_MAX_BYTES = 512 << 20  # compressed bodies
+EVICT_TO = 0.9  # evict down to this fraction of max_bytes
+
+
+class ResponseCache:
+    """SQLite-backed JSON response cache with TTL and LRU size eviction"""
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, isolation_level=None)  # autocommit
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+        self.bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(method: str, url: str, params: dict = None, body=None) -> str:
+        """Cache key for a request; parameter order does not matter"""
+        key = f"{method.upper()} {url}"
+        if params:
+            key += "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+        if body is not None:
+            key += " " + json.dumps(body, sort_keys=True)
+        return key
+
+    def get(self, key: str, allow_expired: bool = False):
+        """Decoded response, or None if missing (or expired, unless allow_expired)"""
+        row = self.conn.execute("SELECT body, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (not allow_expired and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, data):
+        """Store a response, evicting least recently used entries if over the size limit"""
+        body = zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, body, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, body, len(body), now, now),
+        )
+        self.bytes += len(body) - (old[0] if old else 0)
+        if self.bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size limit"""
+        self.conn.execute("BEGIN")
+        self.conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self.bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * EVICT_TO
+        if self.bytes > target:
+            rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed")
+            doomed = []
+            for key, size in rows:
+                if self.bytes <= target:
+                    break
+                doomed.append((key,))
+                self.bytes -= size
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.execute("COMMIT")
+
+    def cache_info(self) -> dict:
+        entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self.bytes}
+
+    def close(self):
+        self.conn.close()
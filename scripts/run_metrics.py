@@ -0,0 +1,296 @@
+"""
+Logging and run metrics for long populate_papers.py runs
+
+BufferedLog timestamps a line and hands it to a writer thread, which keeps the log file
+open and writes console and file output in batches, so logging never waits on disk.
+Metrics holds counters, gauges and cumulative histograms (search and insert latency,
+retries, 429s, papers per ingredient); it renders as Prometheus text (served on a local
+/metrics endpoint) or as one JSON object per line for a metrics file. ThroughputEta turns
+the observed completion rate over a sliding window into an ETA.
+
+Usage:
+    from run_metrics import BufferedLog, Metrics, MetricsServer, ThroughputEta
+
+    log = BufferedLog("populate_papers.log")
+    log("message")                        # returns immediately
+    log.close()                           # drain and close
+
+    metrics = Metrics(prefix="dermodel_papers_")
+    metrics.counter("retries_total", "Requests retried")
+    metrics.histogram("search_seconds", "Search latency", LATENCY_BUCKETS)
+    metrics.inc("retries_total")
+    with metrics.timer("search_seconds"):
+        ...
+    MetricsServer(metrics, port=9108).start()   # curl localhost:9108/metrics
+"""
+
+import sys
+import json
+import time
+import queue
+import atexit
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+WRITE_BATCH = 1000  # lines per write
+
+
+class BufferedLog:
+    """Callable logger: console + file output written by a background thread"""
+
+    def __init__(self, path: str, console=sys.stdout):
+        self.path = path  # may be changed before the first line is written
+        self.console = console
+        self.lines = queue.SimpleQueue()
+        self.second = None
+        self.stamp = ""
+        self.writer = None
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def timestamp(self) -> str:
+        """Formatted once per second instead of once per line"""
+        now = int(time.time())
+        if now != self.second:
+            self.stamp = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+            self.second = now
+        return self.stamp
+
+    def __call__(self, message: str):
+        if self.writer is None:
+            with self.lock:
+                if self.writer is None:
+                    self.writer = threading.Thread(target=self.write_lines, name="log-writer", daemon=True)
+                    self.writer.start()
+        self.lines.put(f"[{self.timestamp()}] {message}\n")
+
+    def write_lines(self):
+        with open(self.path, "a") as f:
+            while True:
+                batch = [self.lines.get()]
+                while len(batch) < WRITE_BATCH:
+                    try:
+                        batch.append(self.lines.get_nowait())
+                    except queue.Empty:
+                        break
+                done = batch[-1] is None
+                text = "".join(batch[:-1] if done else batch)
+                self.console.write(text)
+                self.console.flush()
+                f.write(text)
+                f.flush()
+                if done:
+                    return
+
+    def close(self):
+        """Write everything logged so far; later lines start a new writer"""
+        with self.lock:
+            if self.writer is not None:
+                self.lines.put(None)
+                self.writer.join()
+                self.writer = None
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return low
+                return low + (self.bounds[i] - low) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "sum": round(self.sum, 6),
+                "p50": round(self.quantile(0.5), 6), "p95": round(self.quantile(0.95), 6),
+                "buckets": dict(zip([*map(str, self.bounds), "+Inf"], self.counts))}
+
+
+class Metrics:
+    """Counters, gauges and histograms; safe to update from any thread"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.started = time.monotonic()
+        self.help = {}
+        self.counters = {}
+        self.gauges = {}  # name -> value or callable
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    # Declaring an existing metric again is a no-op, so components can declare what they use
+    def counter(self, name: str, description: str):
+        self.help.setdefault(name, description)
+        self.counters.setdefault(name, 0)
+
+    def gauge(self, name: str, description: str, value=0):
+        self.help.setdefault(name, description)
+        self.gauges[name] = value
+
+    def histogram(self, name: str, description: str, buckets=LATENCY_BUCKETS):
+        self.help.setdefault(name, description)
+        self.histograms.setdefault(name, Histogram(buckets))
+
+    def inc(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] += n
+
+    def set(self, name: str, value):
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self.lock:
+            self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def rate(self, name: str) -> float:
+        """Counter per second since the registry was created"""
+        return self.counters[name] / max(time.monotonic() - self.started, 1e-9)
+
+    def gauge_values(self) -> dict:
+        values = {}
+        for name, value in list(self.gauges.items()):
+            value = value() if callable(value) else value
+            if value is not None:
+                values[name] = value
+        return values
+
+    def snapshot(self) -> dict:
+        """Everything as one JSON-serializable dict"""
+        with self.lock:
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "uptime_seconds": round(time.monotonic() - self.started, 3),
+                **self.counters,
+                **self.gauge_values(),
+                **{name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+
+        def header(name, kind):
+            lines.append(f"# HELP {self.prefix}{name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        with self.lock:
+            for name, value in self.counters.items():
+                header(name, "counter")
+                lines.append(f"{self.prefix}{name} {value}")
+            for name, value in self.gauge_values().items():
+                header(name, "gauge")
+                lines.append(f"{self.prefix}{name} {value}")
+            for name, histogram in self.histograms.items():
+                header(name, "histogram")
+                cumulative = 0
+                for bound, n in zip([*map(str, histogram.bounds), "+Inf"], histogram.counts):
+                    cumulative += n
+                    lines.append(f'{self.prefix}{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{self.prefix}{name}_sum {histogram.sum}")
+                lines.append(f"{self.prefix}{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path: str):
+        with open(path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+
+class ThroughputEta:
+    """Completion rate over the last `window` seconds, and the time left at that rate"""
+
+    def __init__(self, total: int, window: float = 600):
+        self.total = total
+        self.window = window
+        self.samples = deque([(time.monotonic(), 0)])
+
+    def update(self, done: int):
+        now = time.monotonic()
+        self.samples.append((now, done))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+
+    def rate(self) -> float:
+        (start, first), (end, last) = self.samples[0], self.samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+    def seconds_left(self):
+        """None until something has completed"""
+        rate = self.rate()
+        done = self.samples[-1][1]
+        return (self.total - done) / rate if rate > 0 else None
+
+
+def format_duration(seconds) -> str:
+    if seconds is None:
+        return "unknown"
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+class MetricsServer:
+    """Serve GET /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1"):
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = registry.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = json.dumps(registry.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    def start(self) -> "MetricsServer":
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
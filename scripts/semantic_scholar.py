@@ -0,0 +1,184 @@
+"""
+Async Semantic Scholar client used by populate_papers.py
+
+Features:
+    - Token-bucket rate limiter shared by every request, so runs use the full allowed rate
+    - Bounded concurrency (at most N requests in flight)
+    - Adaptive backoff on 429: honors Retry-After (or, without one, waits RATE_LIMIT_BACKOFF
+      seconds doubling per attempt), halves the rate, then recovers gradually
+    - Permanent 4xx rejections (bad query, unknown id) are an empty result, not a failure to retry
+    - Optional on-disk cache of GET responses (response_cache.py); offline mode serves only from it
+    - Request latency, retry, 429, error and cache counts recorded in a run_metrics.Metrics registry
+"""
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from run_metrics import Metrics
+
+USER_AGENT = "Dermodel 1.0 (interactive skincare education database)"
+RATE_LIMIT_BACKOFF = 60  # seconds paused after a 429 without Retry-After, doubled per attempt
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests/sec with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float = 1, min_rate: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, retry_after: float = None):
+        """Rate limited: halve the rate and pause everyone until Retry-After"""
+        self.rate = max(self.min_rate, self.rate / 2)
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self.tokens = 0
+        self.updated = self.paused_until
+
+    def reward(self):
+        """Successful request: creep back towards the configured rate"""
+        self.rate = min(self.max_rate, self.rate * 1.05)
+
+
+def parse_retry_after(value: str):
+    """Retry-After header as seconds (it may be a number or an HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class SemanticScholarClient:
+    """Rate-limited, bounded-concurrency aiohttp client (use as `async with`)"""
+
+    def __init__(self, api_key: str = None, rate: float = 1.0, concurrency: int = 4,
+                 max_retries: int = 3, timeout: float = 15, log=print, cache=None, offline: bool = False,
+                 metrics: Metrics = None, rate_limit_backoff: float = RATE_LIMIT_BACKOFF):
+        self.headers = {"User-Agent": USER_AGENT}
+        if api_key:
+            self.headers["x-api-key"] = api_key
+        self.limiter = TokenBucket(rate)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.rate_limit_backoff = rate_limit_backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.log = log
+        self.cache = cache
+        self.offline = offline
+        self.session = None
+        self.requests = 0
+        self.rate_limited = 0
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.histogram("s2_request_seconds", "Semantic Scholar request latency (successful attempts, body included)")
+        for name, description in (("s2_requests_total", "Semantic Scholar HTTP requests sent"),
+                                  ("s2_rate_limited_total", "Requests answered 429"),
+                                  ("s2_retries_total", "Attempts after the first"),
+                                  ("s2_server_errors_total", "Requests answered 5xx"),
+                                  ("s2_rejected_total", "Requests answered 4xx other than 429 (treated as no results)"),
+                                  ("s2_failures_total", "Requests given up on (timeouts, connection errors, retries exhausted)"),
+                                  ("s2_cache_hits_total", "Responses served from the response cache")):
+            self.metrics.counter(name, description)
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def request(self, method: str, url: str, label: str, **kwargs):
+        """Send one API request with retries; returns the decoded JSON, {} if the API rejected the
+        request for good (4xx other than 429), or None if it failed transiently (or, offline, is
+        not cached)"""
+        cache_key = None
+        if self.cache is not None and method == "GET":
+            cache_key = self.cache.key(method, url, kwargs.get("params"))
+            data = self.cache.get(cache_key, allow_expired=self.offline)
+            if data is not None:
+                self.metrics.inc("s2_cache_hits_total")
+                return data
+        if self.offline:
+            return None
+
+        for attempt in range(self.max_retries + 1):
+            backoff = 0
+            if attempt:
+                self.metrics.inc("s2_retries_total")
+            async with self.semaphore:
+                await self.limiter.acquire()
+                started = time.perf_counter()
+                try:
+                    async with self.session.request(method, url, **kwargs) as response:
+                        self.requests += 1
+                        self.metrics.inc("s2_requests_total")
+                        if response.status == 429:
+                            self.rate_limited += 1
+                            self.metrics.inc("s2_rate_limited_total")
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            if retry_after is None:
+                                # No hint from the server: retrying at the paced rate would just be refused again
+                                retry_after = self.rate_limit_backoff * 2 ** attempt
+                            self.limiter.penalize(retry_after)
+                            self.log(f"  Rate limited on {label} (attempt {attempt + 1}/{self.max_retries + 1}), "
+                                     f"pausing {retry_after:.0f}s, slowing to {self.limiter.rate:.2f} req/s")
+                        elif response.status >= 500:
+                            self.metrics.inc("s2_server_errors_total")
+                            self.log(f"  Server error {response.status} on {label}, retrying")
+                            backoff = 2 ** attempt
+                        elif response.status >= 400:
+                            # Asking again gets the same answer, so there is nothing to retry later either
+                            self.metrics.inc("s2_rejected_total")
+                            self.log(f"  Rejected with {response.status} on {label}, treated as no results")
+                            return {}
+                        else:
+                            response.raise_for_status()
+                            self.limiter.reward()
+                            data = await response.json()
+                            self.metrics.observe("s2_request_seconds", time.perf_counter() - started)
+                            if cache_key is not None:
+                                self.cache.put(cache_key, data)
+                            return data
+                except asyncio.TimeoutError:
+                    self.metrics.inc("s2_failures_total")
+                    self.log(f"  Timeout on {label}")
+                    return None
+                except aiohttp.ClientError as e:
+                    self.metrics.inc("s2_failures_total")
+                    self.log(f"  Error on {label}: {e}")
+                    return None
+            # The 429 pause lives in the shared limiter; server errors back off per request
+            await asyncio.sleep(backoff)
+
+        self.metrics.inc("s2_failures_total")
+        self.log(f"  Giving up on {label} after {self.max_retries + 1} attempts")
+        return None
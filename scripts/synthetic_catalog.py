@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Synthetic product catalogs in the sss.csv format (product_name, brand, ingredients)
+
+Ingredient lists are drawn from a realistic INCI vocabulary with the mess real catalogs
+have: parentheses ("Water (Aqua)", "Tocopherol (Vitamin E)"), acronyms (PEG-40, PPG-26,
+EDTA, PCA, MEA), numbered series, botanicals, inconsistent casing and spacing, trailing
+punctuation, repeated ingredients within a list, duplicate product rows and empty cells.
+Popularity is Zipf-like, so a few ingredients (water, glycerin) are in most products.
+
+Usage:
+    python synthetic_catalog.py --products 100000 --output sss_synthetic.csv [--vocabulary 20000] [--seed 0]
+
+    from synthetic_catalog import generate_catalog, inci_vocabulary
+"""
+
+import csv
+import random
+import argparse
+from collections import deque
+
+COMMON = [
+    "Water (Aqua)", "Glycerin", "Butylene Glycol", "Propanediol", "Niacinamide", "Dimethicone",
+    "Cetearyl Alcohol", "Caprylic/Capric Triglyceride", "Phenoxyethanol", "Ethylhexylglycerin",
+    "Sodium Hyaluronate", "Hyaluronic Acid", "Panthenol", "Allantoin", "Squalane", "Tocopherol (Vitamin E)",
+    "Tocopheryl Acetate", "Fragrance (Parfum)", "Xanthan Gum", "Carbomer", "Citric Acid", "Sodium Citrate",
+    "Disodium EDTA", "Sodium PCA", "Arginine PCA", "Cocamide MEA", "Acetamide MEA", "Triethanolamine",
+    "Sodium Lauryl Sulfate", "Sodium Laureth Sulfate", "Cocamidopropyl Betaine", "Salicylic Acid",
+    "Glycolic Acid", "Lactic Acid", "Ascorbic Acid", "Retinol", "Retinyl Palmitate", "Ceramide NP",
+    "Ceramide AP", "Cholesterol", "Adenosine", "Zinc Oxide", "Titanium Dioxide", "CI 77891 (Titanium Dioxide)",
+    "CI 77491 (Iron Oxides)", "Mica", "Silica", "Kaolin", "Bentonite", "Stearic Acid", "Glyceryl Stearate",
+    "Isopropyl Myristate", "Isohexadecane", "Cyclopentasiloxane", "Polyacrylamide", "C13-14 Isoparaffin",
+    "Acrylates/C10-30 Alkyl Acrylate Crosspolymer", "Ammonium Acryloyldimethyltaurate/VP Copolymer",
+    "Sodium Benzoate", "Potassium Sorbate", "Methylparaben", "Propylparaben", "BHT", "Benzyl Alcohol",
+    "1,2-Hexanediol", "Caprylyl Glycol", "Pentylene Glycol", "Dipropylene Glycol", "Alcohol Denat.",
+    "Limonene", "Linalool", "Citronellol", "Geraniol", "Urea", "Betaine", "Trehalose", "Sodium Chloride",
+]
+SERIES = [  # (pattern, low, high): numbered INCI families
+    ("PEG-{}", 4, 150), ("PPG-{}", 1, 70), ("PEG-{} Hydrogenated Castor Oil", 7, 100),
+    ("Polysorbate {}", 20, 85), ("Laureth-{}", 1, 30), ("Ceteareth-{}", 2, 60), ("Steareth-{}", 2, 100),
+    ("Polyquaternium-{}", 1, 80), ("PEG-{} Stearate", 8, 100), ("PPG-{} Methyl Glucose Ether", 10, 20),
+    ("Acrylates/Steareth-{} Methacrylate Copolymer", 20, 20), ("Palmitoyl Tripeptide-{}", 1, 38),
+]
+GENERA = [
+    "Aloe", "Camellia", "Centella", "Glycyrrhiza", "Butyrospermum", "Simmondsia", "Argania", "Rosa",
+    "Lavandula", "Chamomilla", "Calendula", "Vitis", "Citrus", "Olea", "Cocos", "Helianthus", "Prunus",
+    "Hamamelis", "Melaleuca", "Curcuma", "Avena", "Panax", "Ginkgo", "Vaccinium", "Rosmarinus",
+]
+SPECIES = [
+    "Barbadensis", "Sinensis", "Asiatica", "Glabra", "Parkii", "Chinensis", "Spinosa", "Canina",
+    "Angustifolia", "Recutita", "Officinalis", "Vinifera", "Limon", "Europaea", "Nucifera", "Annuus",
+    "Amygdalus Dulcis", "Virginiana", "Alternifolia", "Longa", "Sativa", "Ginseng", "Biloba",
+    "Macrocarpon", "Aurantium Dulcis",
+]
+PARTS = ["Leaf", "Seed", "Flower", "Root", "Fruit", "Peel", "Kernel", "Callus Culture", "Bark"]
+PREPARATIONS = ["Extract", "Oil", "Water", "Juice", "Powder", "Butter", "Seed Oil", "Leaf Extract"]
+SALTS = ["Sodium", "Disodium", "Potassium", "Magnesium", "Zinc", "Calcium", "Ammonium", "TEA-", "MEA-"]
+ANIONS = ["Lauroyl Glutamate", "Cocoyl Isethionate", "Stearoyl Lactylate", "Ascorbyl Phosphate",
+          "Hyaluronate", "Gluconate", "Lactate", "Polyacrylate", "Cetearyl Sulfate", "Myristate"]
+BRANDS = ["Lumiere", "Dermacore", "Aqualis", "Verdant", "Norda", "Kiyomi", "Solace", "Botanix", "Clarity", "Orbis"]
+LINES = ["Hydra", "Pure", "Daily", "Calm", "Bright", "Renew", "Barrier", "Clear", "Gentle", "Intense"]
+TYPES = ["Cream", "Serum", "Toner", "Cleanser", "Sunscreen SPF 50", "Moisturizer", "Essence", "Mask", "Balm", "Gel"]
+
+
+def inci_vocabulary(size, seed=0):
+    """`size` distinct INCI-style names, most common first."""
+    rng = random.Random(seed)
+    names = list(COMMON)
+    seen = set(names)
+
+    def add(name):
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+
+    for pattern, low, high in SERIES:
+        for number in range(low, high + 1, max(1, (high - low) // 12)):
+            add(pattern.format(number))
+    attempts = 0
+    while len(names) < size and attempts < size * 20:
+        attempts += 1
+        kind = rng.random()
+        if kind < 0.6:
+            part = rng.choice(PARTS)
+            add(f"{rng.choice(GENERA)} {rng.choice(SPECIES)} {part} {rng.choice(PREPARATIONS)}")
+        elif kind < 0.8:
+            salt = rng.choice(SALTS)
+            add(f"{salt}{'' if salt.endswith('-') else ' '}{rng.choice(ANIONS)}")
+        else:
+            pattern, low, high = rng.choice(SERIES)
+            add(pattern.format(rng.randint(low, high)))
+    # Beyond what the word lists can combine, extend with numbered CI colorants
+    number = 10000
+    while len(names) < size:
+        add(f"CI {number}")
+        number += 7
+    return names[:size]
+
+
+def messy(name, rng):
+    """A raw spelling of `name` as catalogs write it."""
+    roll = rng.random()
+    if roll < 0.08:
+        name = name.upper()
+    elif roll < 0.14:
+        name = name.lower()
+    elif roll < 0.17:
+        name = name.replace(" ", "  ", 1)
+    if rng.random() < 0.03:
+        name += rng.choice([".", ";", " *"])
+    if rng.random() < 0.02:
+        name = f" {name} "
+    return name
+
+
+def zipf_index(rng, size, exponent=1.1):
+    """Index in [0, size) with P(i) ~ 1 / (i + 1)^exponent (inverse CDF of the continuous power law)."""
+    u = rng.random()
+    x = (1 - u * (1 - size ** (1 - exponent))) ** (1 / (1 - exponent))
+    return min(size - 1, int(x) - 1)
+
+
+def generate_catalog(products, vocabulary=None, seed=0):
+    """Yield (product_name, brand, ingredients) rows."""
+    rng = random.Random(seed)
+    names = inci_vocabulary(vocabulary or max(500, products // 5), seed)
+    recent = deque(maxlen=1000)
+    for i in range(products):
+        brand = rng.choice(BRANDS)
+        product_name = f"{brand} {rng.choice(LINES)} {rng.choice(TYPES)} {i}"
+        if rng.random() < 0.01:
+            yield product_name, brand, ""
+            continue
+        count = rng.randint(6, 45)
+        chosen = ["Water (Aqua)"] if rng.random() < 0.8 else []
+        for _ in range(count * 4):
+            if len(chosen) >= count:
+                break
+            name = names[zipf_index(rng, len(names))]
+            if name not in chosen:
+                chosen.append(name)
+        if rng.random() < 0.05:
+            chosen.append(rng.choice(chosen))  # same ingredient listed twice
+        row = (product_name, brand, ",".join(messy(name, rng) for name in chosen))
+        recent.append(row)
+        yield row
+        if rng.random() < 0.02:
+            yield rng.choice(recent)  # duplicate product row (re-scraped listing)
+
+
+def write_catalog(path, products, vocabulary=None, seed=0):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["product_name", "brand", "ingredients"])
+        rows = 0
+        for row in generate_catalog(products, vocabulary, seed):
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic sss.csv product catalog")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--vocabulary", type=int, help="distinct INCI names (default: products / 5, min 500)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="sss_synthetic.csv")
+    args = parser.parse_args()
+    rows = write_catalog(args.output, args.products, args.vocabulary, args.seed)
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
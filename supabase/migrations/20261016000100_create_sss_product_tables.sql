@@ -0,0 +1,51 @@
+-- =====================================================
+-- Migration: Product / Ingredient Tables from process_ingredients.py
+-- Date: 2026-10-16
+-- Description: Tables loaded by scripts/load_product_tables.py
+--              (products.csv, ingredients.csv, product_ingredients.csv).
+--              Idempotent so it can also bootstrap a local Postgres.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS sss_products (
+  product_id TEXT PRIMARY KEY,                  -- UUIDv5 of the product name
+  product_name TEXT NOT NULL,
+  ingredient_count INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS sss_ingredients (
+  ingredient_id TEXT PRIMARY KEY,               -- UUIDv5 of the normalized ingredient name
+  ingredient_name TEXT,
+  product_count INTEGER,                        -- ingredient occurrences across products
+  avg_position REAL                             -- lower = typically higher concentration
+);
+
+CREATE TABLE IF NOT EXISTS sss_product_ingredients_join (
+  product_id TEXT NOT NULL REFERENCES sss_products(product_id) ON DELETE CASCADE,
+  ingredient_id TEXT NOT NULL REFERENCES sss_ingredients(ingredient_id) ON DELETE CASCADE,
+  position INTEGER
+);
+
+-- The loader upserts with ON CONFLICT (product_id, ingredient_id)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sss_product_ingredients_join_pair
+  ON sss_product_ingredients_join(product_id, ingredient_id);
+
+-- "Products containing ingredient X" lookups
+CREATE INDEX IF NOT EXISTS idx_sss_product_ingredients_join_ingredient
+  ON sss_product_ingredients_join(ingredient_id);
+
+-- Public read access (the frontend queries these tables with the anon key)
+ALTER TABLE sss_products ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sss_ingredients ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sss_product_ingredients_join ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to sss_products" ON sss_products;
+CREATE POLICY "Allow public read access to sss_products"
+  ON sss_products FOR SELECT TO public USING (true);
+
+DROP POLICY IF EXISTS "Allow public read access to sss_ingredients" ON sss_ingredients;
+CREATE POLICY "Allow public read access to sss_ingredients"
+  ON sss_ingredients FOR SELECT TO public USING (true);
+
+DROP POLICY IF EXISTS "Allow public read access to sss_product_ingredients_join" ON sss_product_ingredients_join;
+CREATE POLICY "Allow public read access to sss_product_ingredients_join"
+  ON sss_product_ingredients_join FOR SELECT TO public USING (true);
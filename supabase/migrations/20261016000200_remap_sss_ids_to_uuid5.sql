@@ -0,0 +1,71 @@
+-- =====================================================
+-- Migration: Remap sss_* ids to UUIDv5
+-- Date: 2026-10-16
+-- Description: process_ingredients.py used to give every product and
+--              ingredient a random uuid4 on each run; it now derives a
+--              UUIDv5 from the name (PRODUCT_NAMESPACE /
+--              INGREDIENT_NAMESPACE). Rows loaded before that keep their
+--              old ids, which the next load_product_tables.py
+--              --delete-missing would delete, cascading to
+--              product_favorites. This rewrites the existing ids to the
+--              ones the pipeline computes and moves favorites and join rows
+--              along. Rows already on their UUIDv5 are left alone, so it is
+--              safe to re-run.
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+
+-- Same namespaces as process_ingredients.py: uuid5(NAMESPACE_DNS, "...dermodel.app")
+CREATE TEMP TABLE product_id_map AS
+SELECT product_id AS old_id,
+       uuid_generate_v5(uuid_generate_v5(uuid_ns_dns(), 'products.dermodel.app'), product_name)::text AS new_id
+FROM sss_products;
+DELETE FROM product_id_map WHERE old_id = new_id;
+
+CREATE TEMP TABLE ingredient_id_map AS
+SELECT ingredient_id AS old_id,
+       uuid_generate_v5(uuid_generate_v5(uuid_ns_dns(), 'ingredients.dermodel.app'), ingredient_name)::text AS new_id
+FROM sss_ingredients
+WHERE ingredient_name IS NOT NULL;
+DELETE FROM ingredient_id_map WHERE old_id = new_id;
+
+-- ---------- Products ----------
+-- New rows first so children can point at them; a loader run since the
+-- switch may already have inserted some of them
+INSERT INTO sss_products (product_id, product_name, ingredient_count)
+SELECT m.new_id, p.product_name, p.ingredient_count
+FROM product_id_map m JOIN sss_products p ON p.product_id = m.old_id
+ON CONFLICT (product_id) DO NOTHING;
+
+-- Oldest favorite wins when a user already has the product under both ids
+INSERT INTO product_favorites (user_id, product_id, notes, created_at)
+SELECT f.user_id, m.new_id, f.notes, f.created_at
+FROM product_favorites f JOIN product_id_map m ON f.product_id = m.old_id
+ORDER BY f.created_at
+ON CONFLICT (user_id, product_id) DO NOTHING;
+
+INSERT INTO sss_product_ingredients_join (product_id, ingredient_id, position)
+SELECT m.new_id, j.ingredient_id, j.position
+FROM sss_product_ingredients_join j JOIN product_id_map m ON j.product_id = m.old_id
+ON CONFLICT (product_id, ingredient_id) DO NOTHING;
+
+-- Cascades to the old favorites and join rows copied above
+DELETE FROM sss_products p USING product_id_map m WHERE p.product_id = m.old_id;
+
+-- ---------- Ingredients ----------
+INSERT INTO sss_ingredients (ingredient_id, ingredient_name, product_count, avg_position)
+SELECT m.new_id, i.ingredient_name, i.product_count, i.avg_position
+FROM ingredient_id_map m JOIN sss_ingredients i ON i.ingredient_id = m.old_id
+ON CONFLICT (ingredient_id) DO NOTHING;
+
+INSERT INTO sss_product_ingredients_join (product_id, ingredient_id, position)
+SELECT j.product_id, m.new_id, j.position
+FROM sss_product_ingredients_join j JOIN ingredient_id_map m ON j.ingredient_id = m.old_id
+ON CONFLICT (product_id, ingredient_id) DO NOTHING;
+
+-- Cascades to the old join rows (and to sss_ingredient_neighbors, which the
+-- loader rebuilds from ingredient_neighbors.csv)
+DELETE FROM sss_ingredients i USING ingredient_id_map m WHERE i.ingredient_id = m.old_id;
+
+DROP TABLE product_id_map;
+DROP TABLE ingredient_id_map;
@@ -0,0 +1,20 @@
+-- =====================================================
+-- Migration: Unique (ingredient_name, title) on References
+-- Date: 2026-10-16
+-- Description: scripts/populate_papers.py inserts papers with one
+--              bulk upsert per checkpoint
+--              (ON CONFLICT (ingredient_name, title) DO NOTHING)
+--              instead of a SELECT + INSERT per paper.
+-- =====================================================
+
+-- Remove duplicates left by earlier runs (keep one row per ingredient/title)
+DELETE FROM ingredient_references_master a
+USING ingredient_references_master b
+WHERE a.ingredient_name = b.ingredient_name
+  AND a.title = b.title
+  AND a.ctid > b.ctid;
+
+ALTER TABLE ingredient_references_master
+  DROP CONSTRAINT IF EXISTS uq_ingredient_references_master_ingredient_title,
+  ADD CONSTRAINT uq_ingredient_references_master_ingredient_title
+    UNIQUE (ingredient_name, title);
@@ -0,0 +1,15 @@
+-- =====================================================
+-- Migration: Name Indexes for Keyset Pagination
+-- Date: 2026-10-16
+-- Description: scripts/populate_papers.py pages the FDA and COSING
+--              tables with ORDER BY name WHERE name > last LIMIT 1000.
+--              These indexes turn every page into a short index range
+--              scan instead of a sort of the whole table.
+--              (ingredients_master is already keyed by name.)
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_ingredients_ingredient_name
+  ON public.ingredients("INGREDIENT_NAME");
+
+CREATE INDEX IF NOT EXISTS idx_cosing_ingredients_inci_name
+  ON public."COSING_ingredients"("INCI name");
@@ -0,0 +1,26 @@
+-- =====================================================
+-- Migration: Ingredient Neighbors ("frequently used with")
+-- Date: 2026-10-16
+-- Description: Top-k co-occurring ingredients per ingredient, exported by
+--              process_ingredients.py --neighbors K (or ingredient_cooccurrence.py)
+--              and replaced wholesale by scripts/load_product_tables.py.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS sss_ingredient_neighbors (
+  ingredient_id TEXT NOT NULL REFERENCES sss_ingredients(ingredient_id) ON DELETE CASCADE,
+  neighbor_id TEXT NOT NULL REFERENCES sss_ingredients(ingredient_id) ON DELETE CASCADE,
+  rank SMALLINT NOT NULL,                       -- 1 = most similar
+  cooccurrence INTEGER NOT NULL,                -- products containing both ingredients
+  similarity REAL NOT NULL,                     -- position-weighted cosine similarity
+  PRIMARY KEY (ingredient_id, neighbor_id)
+);
+
+-- "Frequently used with X" reads the first k ranks of one ingredient
+CREATE INDEX IF NOT EXISTS idx_sss_ingredient_neighbors_rank
+  ON sss_ingredient_neighbors(ingredient_id, rank);
+
+ALTER TABLE sss_ingredient_neighbors ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow public read access to sss_ingredient_neighbors" ON sss_ingredient_neighbors;
+CREATE POLICY "Allow public read access to sss_ingredient_neighbors"
+  ON sss_ingredient_neighbors FOR SELECT TO public USING (true);
@@ -0,0 +1,78 @@
+-- =====================================================
+-- Migration: Incremental Paper Refresh
+-- Date: 2026-10-16
+-- Description: scripts/populate_papers.py --incremental searches only
+--              ingredient names without stored papers, plus names whose
+--              papers were last fetched more than --max-age-days ago,
+--              most used first. The diff runs server-side in one call
+--              instead of re-running the whole ~25h job.
+-- =====================================================
+
+-- When the ingredient's papers were last searched (existing rows count as fetched now)
+ALTER TABLE ingredient_references_master
+  ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+-- Newest fetch per ingredient is an index-only scan
+CREATE INDEX IF NOT EXISTS idx_ingredient_references_master_name_fetched
+  ON ingredient_references_master(ingredient_name, fetched_at);
+
+-- Names to search, as one JSON array (not subject to PostgREST max-rows):
+-- [{"name", "last_fetched" (null = never stored), "product_count"}], ordered by
+-- product_count (sss_ingredients, from process_ingredients.py), then oldest first
+CREATE OR REPLACE FUNCTION paper_refresh_candidates(
+  source TEXT DEFAULT 'tables',         -- 'tables' (FDA + COSING), 'master', or 'auto'
+  max_age_days DOUBLE PRECISION DEFAULT NULL  -- NULL = new names only
+)
+RETURNS JSONB AS $$
+  WITH use_master AS (
+    SELECT source = 'master' OR (source = 'auto' AND EXISTS (SELECT 1 FROM ingredients_master)) AS yes
+  ),
+  names AS (
+    SELECT DISTINCT TRIM(raw.name) AS name
+    FROM (
+      SELECT m.name FROM ingredients_master m, use_master WHERE use_master.yes
+      UNION ALL
+      SELECT u."INGREDIENT_NAME" FROM ingredients u, use_master WHERE NOT use_master.yes
+      UNION ALL
+      SELECT c."INCI name" FROM "COSING_ingredients" c, use_master WHERE NOT use_master.yes
+    ) raw
+    WHERE TRIM(raw.name) <> ''
+  ),
+  stored AS (
+    SELECT r.ingredient_name, MAX(r.fetched_at) AS last_fetched
+    FROM ingredient_references_master r
+    GROUP BY r.ingredient_name
+  ),
+  popularity AS (
+    SELECT LOWER(s.ingredient_name) AS key, MAX(s.product_count) AS product_count
+    FROM sss_ingredients s
+    GROUP BY 1
+  ),
+  candidates AS (
+    SELECT n.name, st.last_fetched, p.product_count
+    FROM names n
+    LEFT JOIN stored st ON st.ingredient_name = n.name
+    LEFT JOIN popularity p ON p.key = LOWER(n.name)
+    WHERE st.last_fetched IS NULL
+       OR st.last_fetched < NOW() - make_interval(secs => max_age_days * 86400)
+  )
+  SELECT COALESCE(jsonb_agg(to_jsonb(c) ORDER BY c.product_count DESC NULLS LAST,
+                                                 c.last_fetched ASC NULLS FIRST, c.name), '[]'::jsonb)
+  FROM candidates c;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION paper_refresh_candidates IS 'Ingredient names without papers or with papers older than max_age_days, most used first';
+
+-- Called after a refreshed ingredient's papers are written (its old papers stay, now current)
+CREATE OR REPLACE FUNCTION touch_ingredient_references(names TEXT[])
+RETURNS INTEGER AS $$
+  WITH touched AS (
+    UPDATE ingredient_references_master
+    SET fetched_at = NOW()
+    WHERE ingredient_name = ANY(names)
+    RETURNING 1
+  )
+  SELECT COUNT(*)::INTEGER FROM touched;
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION touch_ingredient_references IS 'Mark the stored papers of these ingredients as fetched now';
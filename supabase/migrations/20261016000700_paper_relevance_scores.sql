@@ -0,0 +1,20 @@
+-- =====================================================
+-- Migration: Paper Relevance Scores
+-- Date: 2026-10-16
+-- Description: scripts/populate_papers.py searches 20 candidates per
+--              ingredient and keeps the 4 most relevant by BM25 of the
+--              ingredient name against title + abstract
+--              (scripts/paper_relevance.py). The score is stored with
+--              each paper so the app can show the best ones first.
+-- =====================================================
+
+-- Normalized BM25 score in [0, 1] (NULL for papers stored before scoring, and for
+-- names with nothing to score, whose papers are kept in search order)
+ALTER TABLE ingredient_references_master
+  ADD COLUMN IF NOT EXISTS relevance_score REAL;
+
+COMMENT ON COLUMN ingredient_references_master.relevance_score IS 'Relevance of title + abstract to ingredient_name (0-1, BM25), NULL if not scored';
+
+-- An ingredient's papers, most relevant first
+CREATE INDEX IF NOT EXISTS idx_ingredient_references_master_name_relevance
+  ON ingredient_references_master(ingredient_name, relevance_score DESC NULLS LAST);
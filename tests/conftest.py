@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+
+# The pipeline modules live at the repository root and in scripts/, like the scripts import them
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def catalog_path():
+    """Small raw catalog (sss.csv layout) with the messy cases the parser has to handle"""
+    return os.path.join(FIXTURES, "catalog.csv")
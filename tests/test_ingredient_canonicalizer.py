@@ -0,0 +1,42 @@
+"""
+Merges (and refusals to merge) of the canonical ingredient index
+"""
+
+from ingredient_canonicalizer import CanonicalIndex
+
+
+def build(*names, preferred=()):
+    index = CanonicalIndex()
+    for name in preferred:
+        index.add(name, preferred=True)
+    for name in names:
+        index.add(name)
+    return index.build()
+
+
+def test_spacing_variants_merge():
+    index = build("acryloyldimethyl taurate", preferred=["ACRYLOYLDIMETHYLTAURATE"])
+    assert index.canonical("acryloyldimethyl taurate") == "ACRYLOYLDIMETHYLTAURATE"
+
+
+def test_spacing_never_merges_different_numbers():
+    index = build("babathcathnur-11 6copolymer", preferred=["BABATHCATHNUR-116 COPOLYMER"])
+    assert index.canonical("babathcathnur-11 6copolymer") == "babathcathnur-11 6copolymer"
+    assert index.stats()["spacing"] == 0
+
+
+def test_shared_cas_number_needs_matching_numbers():
+    index = CanonicalIndex()
+    index.add("PEG-8", cas_number="25322-68-3", preferred=True)
+    index.add("PEG-40", cas_number="25322-68-3", preferred=True)
+    index.add("ARGININE PCA", cas_number="56265-06-6", preferred=True)
+    index.add("Arginine Pidolate", cas_number="56265-06-6")
+    index.build()
+    assert index.canonical("PEG-40") == "PEG-40"
+    assert index.canonical("Arginine Pidolate") == "ARGININE PCA"
+
+
+def test_typo_attaches_to_preferred_name():
+    index = build("niacinamdie extract", "glyceryl stearate se", preferred=["NIACINAMIDE EXTRACT", "GLYCERYL STEARATE"])
+    assert index.canonical("niacinamdie extract") == "NIACINAMIDE EXTRACT"
+    assert index.canonical("glyceryl stearate se") == "glyceryl stearate se"  # "se" is an identifier
@@ -0,0 +1,72 @@
+"""
+Co-occurrence neighbors of the fixture catalog against a dense B^T B computed in numpy
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("scipy")
+
+from ingredient_cooccurrence import WEIGHTINGS, iter_neighbors
+from process_ingredients import load_products, process
+
+
+@pytest.fixture(scope="module")
+def join_table(catalog_path):
+    return process(load_products(catalog_path))[2]
+
+
+def dense_products(join_table, weighting):
+    """Ingredient ids, B^T B counts and cosine similarities from dense product x ingredient matrices."""
+    product_codes, _ = pd.factorize(join_table["product_id"])
+    ingredient_codes, ingredient_ids = pd.factorize(join_table["ingredient_id"])
+    binary = np.zeros((product_codes.max() + 1, len(ingredient_ids)))
+    weighted = np.zeros_like(binary)
+    weights = WEIGHTINGS[weighting](join_table["position"].to_numpy(dtype=np.float64))
+    for p, i, weight in zip(product_codes, ingredient_codes, weights):
+        binary[p, i] = 1
+        weighted[p, i] = max(weighted[p, i], weight)  # a repeated ingredient keeps its first position
+
+    norms = np.sqrt((weighted ** 2).sum(axis=0))
+    return list(ingredient_ids), binary.T @ binary, (weighted.T @ weighted) / np.outer(norms, norms)
+
+
+def dense_top_k(counts, similarity, top_k, min_count):
+    """Per ingredient code, the best top_k neighbor similarities (self and rare pairs excluded)."""
+    best = {}
+    for i in range(len(counts)):
+        candidates = [j for j in range(len(counts)) if j != i and counts[i, j] >= min_count]
+        best[i] = sorted((similarity[i, j] for j in candidates), reverse=True)[:top_k]
+    return best
+
+
+@pytest.mark.parametrize("max_block_nnz", [20_000_000, 5])
+@pytest.mark.parametrize("weighting", ["log", "none"])
+def test_neighbors_match_dense_products(join_table, max_block_nnz, weighting):
+    blocks = list(iter_neighbors(join_table, top_k=3, weighting=weighting, min_count=1,
+                                 max_block_nnz=max_block_nnz))
+    if max_block_nnz == 5:
+        assert len(blocks) > 1  # the row-blocking path actually ran
+    actual = pd.concat(blocks, ignore_index=True)
+    ids, counts, similarity = dense_products(join_table, weighting)
+    best = dense_top_k(counts, similarity, top_k=3, min_count=1)
+    assert len(actual) == sum(len(row) for row in best.values()) > 0
+
+    for ingredient_id, group in actual.groupby("ingredient_id", sort=False):
+        i = ids.index(ingredient_id)
+        j = [ids.index(neighbor) for neighbor in group["neighbor_id"]]
+        assert group["rank"].tolist() == list(range(1, len(group) + 1))
+        assert group["cooccurrence"].tolist() == counts[i, j].astype(int).tolist()
+        assert group["similarity"].to_numpy() == pytest.approx(similarity[i, j], abs=1e-4)
+        # Pairs can tie within float32 rounding, so compare the similarities of the top k, not their ids
+        assert group["similarity"].to_numpy() == pytest.approx(best[i], abs=1e-4)
+
+
+def test_min_count_drops_rare_pairs(join_table):
+    actual = pd.concat(iter_neighbors(join_table, top_k=50, min_count=2, max_block_nnz=5), ignore_index=True)
+    ids, counts, _ = dense_products(join_table, "log")
+    expected = {(ids[i], ids[j]) for i, j in zip(*np.nonzero(counts >= 2)) if i != j}
+
+    assert len(actual) > 0
+    assert set(zip(actual["ingredient_id"], actual["neighbor_id"])) == expected
@@ -0,0 +1,85 @@
+"""
+Ingredient search bundle: build -> write -> read round trip against a brute-force startswith scan
+"""
+
+import uuid
+
+import pandas as pd
+import pytest
+
+from ingredient_search_bundle import SearchBundle, build_bundle, collect_entries, search_key, write_bundle
+from process_ingredients import load_products, process
+
+EXTRA_NAMES = ["Crème de Rose Extract", "Crema Base", "Straße Water", "Ölbaum Leaf Oil", "緑茶 エキス", "緑 Tea", "Ölbaum Leaf Oil"]
+# Tiny blocks and scan limit, so lookups cross block heads and both the precomputed and the scanned path run
+OPTIONS = {"top_k": 3, "scan_limit": 3, "block": 4}
+
+
+@pytest.fixture(scope="module")
+def ingredients(catalog_path):
+    fixture = process(load_products(catalog_path))[1]
+    shared = pd.DataFrame({"ingredient_name": [f"Sodium {word}" for word in
+                                               ("Hydrolyzed Silk", "Hydroxymethylglycinate", "Hyaluronate Crosspolymer",
+                                                "Citrate", "Lactate", "Laurate", "Levulinate")]})
+    shared["ingredient_id"] = [str(uuid.uuid5(uuid.NAMESPACE_DNS, name)) for name in shared["ingredient_name"]]
+    shared["product_count"] = [40, 7, 7, 25, 3, 3, 0]
+    return pd.concat([fixture, shared], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def bundle(ingredients, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bundle") / "ingredient_search.bin")
+    write_bundle(build_bundle(ingredients, EXTRA_NAMES, **OPTIONS), path)
+    return SearchBundle.load(path)
+
+
+def brute_force(entries, query, limit):
+    """Entries with a word starting with the query, most used first (ties alphabetical by key)."""
+    query = search_key(query)
+    if not query:
+        return []
+    matches = [(key, name, count) for key, name, count, _ in entries
+               if any(key[i:].startswith(query) for i in range(len(key)) if i == 0 or key[i - 1] == " ")]
+    matches.sort(key=lambda match: (-match[2], match[0]))
+    return [(name, count) for _, name, count in matches[:limit]]
+
+
+def all_queries(entries):
+    """Every prefix of every word start (shared prefixes included), plus a few misses."""
+    queries = {"zzz", "sodium zzz", "緑茶 x", "", "  "}
+    for key, _, _, _ in entries:
+        for i in range(len(key)):
+            if i == 0 or key[i - 1] == " ":
+                queries.update(key[i:j] for j in range(i + 1, len(key) + 1))
+    return sorted(queries)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 20])
+def test_lookups_match_brute_force(ingredients, bundle, limit):
+    entries = collect_entries(ingredients, EXTRA_NAMES)
+    assert bundle.stats()["prefixes"] > 0
+
+    for query in all_queries(entries):
+        found = [(result["name"], result["product_count"]) for result in bundle.search(query, limit)]
+        assert found == brute_force(entries, query, limit), query
+
+
+def test_shared_and_non_ascii_prefixes(bundle):
+    assert [result["name"] for result in bundle.search("sodium hy", 3)] == \
+        ["Sodium Hydrolyzed Silk", "Sodium Hyaluronate Crosspolymer", "Sodium Hydroxymethylglycinate"]
+    assert [result["name"] for result in bundle.search("CRÈ")] == ["Crème de Rose Extract"]
+    assert [result["name"] for result in bundle.search("crem")] == ["Crema Base"]  # accents are not folded
+    assert [result["name"] for result in bundle.search("öl")] == ["Ölbaum Leaf Oil"]
+    assert [result["name"] for result in bundle.search("strasse")] == ["Straße Water"]
+    assert [result["name"] for result in bundle.search("緑")] == ["緑 Tea", "緑茶 エキス"]
+    assert [result["name"] for result in bundle.search("エキ")] == ["緑茶 エキス"]
+    assert bundle.search("zzz") == [] and bundle.search("") == []
+
+
+def test_entries_keep_ids_and_counts(ingredients, bundle):
+    expected = ingredients.set_index("ingredient_name")
+    for result in bundle.search("sodium", 20):
+        row = expected.loc[result["name"]]
+        assert result["ingredient_id"] == row["ingredient_id"]
+        assert result["product_count"] == row["product_count"]
+    assert bundle.search("crème")[0]["ingredient_id"] is None  # extra names have no id
@@ -0,0 +1,100 @@
+"""
+load_product_tables.load() against a real Postgres: two full loads of the fixture output,
+then a --delta load with removals
+
+Needs a scratch database; every run works in its own schema and drops it afterwards:
+
+    DERMODEL_TEST_DSN=postgresql://postgres@localhost/postgres python -m pytest tests/test_load_product_tables.py
+"""
+
+import os
+import uuid
+
+import pandas as pd
+import pytest
+
+import load_product_tables
+from load_product_tables import load
+from process_ingredients import export_tables, load_products, process, write_deltas
+
+DSN = os.environ.get("DERMODEL_TEST_DSN")
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "supabase", "migrations")
+SCHEMA_FILES = ["20261016000100_create_sss_product_tables.sql", "20261016000500_create_sss_ingredient_neighbors.sql"]
+
+pytestmark = [
+    pytest.mark.skipif(not DSN, reason="set DERMODEL_TEST_DSN to a scratch Postgres database"),
+    pytest.mark.skipif(load_product_tables.psycopg is None, reason="psycopg is not installed"),
+]
+
+
+@pytest.fixture
+def dsn():
+    """DSN whose search_path is a fresh schema holding the sss_* tables of the migrations"""
+    from psycopg.conninfo import make_conninfo
+
+    schema = f"load_test_{uuid.uuid4().hex[:12]}"
+    with load_product_tables.psycopg.connect(DSN, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        conn.execute(f"SET search_path TO {schema}")
+        for file_name in SCHEMA_FILES:
+            with open(os.path.join(MIGRATIONS, file_name)) as f:
+                conn.execute(f.read())
+    try:
+        yield make_conninfo(DSN, options=f"-c search_path={schema}")
+    finally:
+        with load_product_tables.psycopg.connect(DSN, autocommit=True) as conn:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def export(catalog_df, output_dir):
+    output_dir.mkdir()
+    export_tables(*process(catalog_df)[:3], str(output_dir))
+    return output_dir
+
+
+def table_keys(dsn):
+    """{table: set of key tuples} as stored in the database"""
+    keys = {}
+    with load_product_tables.psycopg.connect(dsn) as conn:
+        for table, _, key, _ in load_product_tables.TABLES:
+            keys[table] = set(conn.execute(f"SELECT {', '.join(key)} FROM {table}").fetchall())
+    return keys
+
+
+def csv_keys(output_dir):
+    keys = {}
+    for table, file_name, key, _ in load_product_tables.TABLES:
+        df = pd.read_csv(output_dir / f"{file_name}.csv", dtype=str)
+        keys[table] = set(df[key].itertuples(index=False, name=None))
+    return keys
+
+
+def test_full_loads_are_idempotent_and_delta_removes_rows(dsn, catalog_path, tmp_path):
+    catalog = load_products(catalog_path)
+    previous = export(catalog, tmp_path / "previous")
+    # Next run: two products dropped (with the ingredients only they used) and one reformulated
+    changed = catalog.drop(index=catalog.index[-2:]).copy()
+    changed.loc[changed.index[0], "ingredients"] = "Water, Glycerin, Niacinamide"
+    current = export(changed, tmp_path / "current")
+    write_deltas(str(current), str(previous))
+
+    expected = csv_keys(previous)
+    total = sum(len(pd.read_csv(previous / f"{file_name}.csv")) for _, file_name, _, _ in load_product_tables.TABLES)
+    assert load(dsn, str(previous)) == total
+    assert table_keys(dsn) == expected
+    assert load(dsn, str(previous)) == total  # second full load: same rows, nothing duplicated
+    assert table_keys(dsn) == expected
+
+    load(dsn, str(current), delta=True)
+    after = table_keys(dsn)
+    assert after == csv_keys(current)
+    removed = pd.read_csv(current / "delta" / "products_removed.csv", dtype=str)
+    assert len(removed) == 2
+    assert not {(product_id,) for product_id in removed["product_id"]} & after["sss_products"]
+    assert len(after["sss_product_ingredients_join"]) < len(expected["sss_product_ingredients_join"])
+
+    # Changed rows were updated in place, not just inserted
+    ingredients = pd.read_csv(current / "ingredients.csv")
+    with load_product_tables.psycopg.connect(dsn) as conn:
+        stored = dict(conn.execute("SELECT ingredient_id, product_count FROM sss_ingredients").fetchall())
+    assert stored == dict(zip(ingredients["ingredient_id"], ingredients["product_count"]))
@@ -0,0 +1,70 @@
+"""
+merge_shards.py on shard checkpoints and logs written to a temporary directory
+"""
+
+import json
+
+from checkpoint_journal import CheckpointJournal
+from merge_shards import merge_checkpoints, merge_logs
+
+
+def write_shard(path, names, total_papers):
+    with CheckpointJournal(str(path)) as journal:
+        journal.commit(names, total_papers=total_papers)
+
+
+def test_first_merge_imports_legacy_checkpoint(tmp_path):
+    legacy = tmp_path / "checkpoint.json"
+    legacy.write_text(json.dumps({"processed": ["Glycerin", "Water"], "total_papers": 8}))
+    write_shard(tmp_path / "checkpoint.shard0of2.jsonl", ["Niacinamide"], 4)
+    write_shard(tmp_path / "checkpoint.shard1of2.jsonl", ["Retinol"], 3)
+    output = tmp_path / "checkpoint.jsonl"
+
+    shards = sorted(str(path) for path in tmp_path.glob("checkpoint.shard*.jsonl"))
+    merge_checkpoints(shards, str(output), str(legacy))
+    merged = CheckpointJournal(str(output)).load()
+    assert set(merged.processed) == {"Glycerin", "Water", "Niacinamide", "Retinol"}
+    assert merged.total_papers == 15
+
+
+def test_shards_skip_legacy_names_without_writing_the_journal(tmp_path):
+    legacy = tmp_path / "checkpoint.json"
+    legacy.write_text(json.dumps({"processed": ["Glycerin"], "total_papers": 4}))
+    output = tmp_path / "checkpoint.jsonl"
+
+    # What a --shard run reads as already done
+    merged = CheckpointJournal(str(output), legacy_path=str(legacy)).load(write=False)
+    assert list(merged.processed) == ["Glycerin"]
+    assert not output.exists()
+
+
+def test_merge_logs_can_rewrite_an_input(tmp_path):
+    shard = tmp_path / "populate_papers.shard0of2.log"
+    shard.write_text("[2026-10-16 10:00:02] b\n")
+    output = tmp_path / "populate_papers.log"
+    output.write_text("[2026-10-16 10:00:01] a\n  continued\n")
+
+    assert merge_logs([str(output), str(shard)], str(output)) == 2
+    assert output.read_text().splitlines() == [
+        "[2026-10-16 10:00:01] [populate_papers.log] a", "  continued", "[2026-10-16 10:00:02] [0/2] b",
+    ]
+    assert not (tmp_path / "populate_papers.log.tmp").exists()
+
+
+def test_second_merge_keeps_earlier_progress(tmp_path):
+    legacy = tmp_path / "checkpoint.json"
+    legacy.write_text(json.dumps({"processed": ["Glycerin"], "total_papers": 5}))
+    shard = tmp_path / "checkpoint.shard0of1.jsonl"
+    write_shard(shard, ["Water"], 3)
+    output = str(tmp_path / "checkpoint.jsonl")
+
+    for _ in range(2):
+        merge_checkpoints([str(shard)], output, str(legacy))
+        merged = CheckpointJournal(output).load()
+        assert (set(merged.processed), merged.total_papers) == ({"Glycerin", "Water"}, 8)
+
+    # The shard ran on (its total is cumulative): only its 4 new papers are added
+    write_shard(shard, ["Retinol"], 7)
+    merge_checkpoints([str(shard)], output, str(legacy))
+    merged = CheckpointJournal(output).load()
+    assert (set(merged.processed), merged.total_papers) == ({"Glycerin", "Water", "Retinol"}, 12)
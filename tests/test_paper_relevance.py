@@ -0,0 +1,65 @@
+"""
+BM25 relevance ranking of hand-written candidate papers
+"""
+
+import numpy as np
+
+import paper_relevance
+from paper_relevance import RelevanceRanker, identifier_tokens, synthetic_batch, tokenize
+
+FILLER = " ".join(f"filler{i}" for i in range(40))
+
+
+def rank(queries, documents, query_of, **kwargs):
+    ranker = RelevanceRanker(**kwargs)
+    scores = ranker.score(queries, documents, query_of)
+    return scores, ranker.select(scores, query_of)
+
+
+def test_identifier_tokens_must_match():
+    documents = [
+        ("Topical vitamin D in psoriasis", f"Vitamin D analogues and the skin. {FILLER}"),
+        ("Topical vitamin C and photoaging", f"Vitamin C serums and the skin. {FILLER}"),
+    ]
+    scores, kept = rank(["Vitamin C"], documents, [0, 0])
+    assert scores[0] == 0
+    assert scores[1] > 0.5
+    assert list(kept) == [1]
+    assert identifier_tokens("PEG-40 Hydrogenated Castor Oil") == "40"
+    assert identifier_tokens("Vitamin B3") == "b3"
+
+
+def test_non_ascii_names_are_scored():
+    documents = [
+        ("Unrelated", f"Moisturizers and the skin barrier. {FILLER}"),
+        ("Extrait de rosé", f"Rosé extract in topical care. {FILLER}"),
+    ]
+    scores, kept = rank(["Rosé Extract"], documents, [0, 0])
+    assert scores[1] > scores[0]
+    assert list(kept) == [1]
+
+
+def test_unscorable_query_keeps_search_order():
+    documents = [(f"Paper {i}", FILLER) for i in range(6)]
+    scores, kept = rank(["(+)-", "Glycerin"], documents, [0, 0, 0, 0, 0, 1])
+    assert np.isnan(scores[:5]).all() and not np.isnan(scores[5])
+    assert list(kept) == [0, 1, 2, 3]  # "Glycerin" is absent from its one candidate
+
+
+def test_tokenizer_chunks_and_filtering_agree(monkeypatch):
+    _, documents, _ = synthetic_batch(200)
+    texts = [abstract for _, abstract in documents]
+    owner, hashes, prints, counts = tokenize(texts)
+    assert counts.sum() == len(hashes) == len(owner)
+    assert np.array_equal(np.bincount(owner, minlength=len(texts)), counts)
+
+    keep = np.zeros(prints.max() + 1, dtype=bool)
+    keep[prints[:50]] = True
+    kept_owner, kept_hashes, _, kept_counts = tokenize(texts, keep)
+    assert np.array_equal(kept_counts, counts)
+    assert set(kept_hashes) == set(hashes[keep[prints]])
+    assert np.array_equal(kept_owner, owner[keep[prints]])
+
+    monkeypatch.setattr(paper_relevance, "CHUNK_BYTES", 5000)  # ~3 abstracts per numpy pass
+    for expected, actual in zip((owner, hashes, prints, counts), tokenize(texts)):
+        assert np.array_equal(expected, actual)
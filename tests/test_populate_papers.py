@@ -0,0 +1,163 @@
+"""
+Database reads and writes of populate_papers.py, against in-process fakes and the mock
+PostgREST of scripts/mock_postgrest.py
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import populate_papers
+from checkpoint_journal import CheckpointJournal
+from mock_postgrest import PostgrestHandler, Table, seed_tables
+from populate_papers import RowsRejected, send_paper_chunk, upsert_papers
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = str(body)
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(populate_papers, "log", lambda message: None)
+
+
+def papers(count, bad=()):
+    return [{"ingredient_name": "Glycerin", "title": f"Paper {i}", "bad": i in bad} for i in range(count)]
+
+
+def test_rejected_rows_are_isolated(monkeypatch):
+    def send(chunk):
+        if any(paper["bad"] for paper in chunk):
+            raise RowsRejected("409: duplicate key value violates unique constraint")
+        return len(chunk)
+
+    monkeypatch.setattr(populate_papers, "send_paper_chunk", send)
+    failures = populate_papers.metrics.counters["insert_failures_total"]
+    assert upsert_papers(papers(8, bad={2, 5})) == 6
+    assert populate_papers.metrics.counters["insert_failures_total"] == failures + 2
+
+
+@pytest.mark.parametrize("error", [RuntimeError("503: Service Unavailable"), requests.ConnectionError("refused")])
+def test_outage_is_raised_without_splitting(monkeypatch, error):
+    calls = []
+
+    def send(chunk):
+        calls.append(chunk)
+        raise error
+
+    monkeypatch.setattr(populate_papers, "send_paper_chunk", send)
+    with pytest.raises(type(error)):
+        upsert_papers(papers(8))
+    assert len(calls) == 1
+
+
+@pytest.mark.skipif(populate_papers.USE_SUPABASE_PY, reason="REST API path only")
+@pytest.mark.parametrize("status, raised", [(400, RowsRejected), (409, RowsRejected), (401, RuntimeError),
+                                            (503, RuntimeError)])
+def test_rest_status_classification(monkeypatch, status, raised):
+    monkeypatch.setattr(populate_papers.http, "post", lambda *args, **kwargs: FakeResponse(status, {"code": "x"}))
+    with pytest.raises(raised):
+        send_paper_chunk(papers(2))
+
+
+def test_writer_failure_stops_the_pipeline(monkeypatch, tmp_path):
+    async def search(client, ingredient, limit):
+        await asyncio.sleep(0)
+        return [{"paperId": ingredient, "title": f"{ingredient} in skin care", "abstract": ingredient}]
+
+    def save_checkpoint(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(populate_papers, "search_semantic_scholar", search)
+    monkeypatch.setattr(populate_papers, "insert_papers", len)
+    monkeypatch.setattr(populate_papers, "save_checkpoint", save_checkpoint)
+    args = argparse.Namespace(rps=0, concurrency=4, candidates=20, min_relevance=0.2, offline=False,
+                              dry_run=False, incremental=False, metrics_file=None)
+    # More results than the queues hold: before the fix the fetchers blocked on a full queue forever
+    remaining = [f"Ingredient {i}" for i in range(5 * populate_papers.FETCH_QUEUE_SIZE)]
+    state = {"session_papers": 0, "total_papers": 0}
+
+    with CheckpointJournal(str(tmp_path / "checkpoint.jsonl")) as checkpoint:
+        with pytest.raises(OSError, match="No space left"):
+            asyncio.run(asyncio.wait_for(populate_papers.populate(remaining, checkpoint, set(), state, args), 30))
+
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    """Mock PostgREST on a free port with populate_papers pointed at it; yields its tables"""
+    tables = seed_tables([])
+    monkeypatch.setattr(PostgrestHandler, "tables", tables)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PostgrestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(populate_papers, "SUPABASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(populate_papers, "USE_SUPABASE_PY", False)
+    yield tables
+    server.shutdown()
+    server.server_close()
+
+
+def test_keyset_paging_keeps_rows_tied_across_page_boundaries(monkeypatch, postgrest):
+    monkeypatch.setattr(populate_papers, "PAGE_SIZE", 4)
+    # Citric Acid straddles the first boundary, Glycerin fills more than a whole page
+    names = ["Aqua", "Biotin", "Citric Acid", "Citric Acid", "Citric Acid", "Dimethicone",
+             *["Glycerin"] * 6, "Zinc Oxide", None]
+    rows = [{"name": name, "cas_number": f"{i}-00-0"} for i, name in enumerate(names)]
+    random.Random(0).shuffle(rows)
+    postgrest["ingredients_master"] = Table(rows)
+
+    fetched = populate_papers.fetch_keyset("ingredients_master", "name,cas_number", "name")
+    assert Counter((row["name"], row["cas_number"]) for row in fetched) == \
+        Counter((row["name"], row["cas_number"]) for row in rows if row["name"] is not None)
+
+
+def test_name_tables_page_to_their_distinct_names(monkeypatch, postgrest):
+    monkeypatch.setattr(populate_papers, "PAGE_SIZE", 3)
+    fda = ["Water", "Glycerin", "Glycerin", "Glycerin", "Niacinamide", "Squalane", "Water", ""]
+    cosing = ["Glycerin", "Retinol", "Retinol", "Tocopherol", "Urea", "Xanthan Gum", "Zinc Oxide"]
+    postgrest["ingredients"] = Table([{"INGREDIENT_NAME": name} for name in fda])
+    postgrest["COSING_ingredients"] = Table([{"INCI name": name} for name in cosing])
+
+    assert populate_papers.fetch_all_ingredients("tables") == sorted({*fda, *cosing} - {""})
+
+
+def test_incremental_searches_only_missing_and_stale_names(monkeypatch, postgrest, tmp_path):
+    names = ["Glycerin", "Niacinamide", "Retinol", "Squalane", "Urea", "Water"]
+    postgrest["ingredients"] = Table([{"INGREDIENT_NAME": name} for name in names])
+    old = (datetime.now(timezone.utc) - timedelta(days=200)).isoformat()
+    postgrest["ingredient_references_master"].insert([
+        {"ingredient_name": "Glycerin", "title": "Fresh paper"},        # fetched now: skipped
+        {"ingredient_name": "Niacinamide", "title": "Old paper", "fetched_at": old},  # stale: searched again
+    ], ["ingredient_name", "title"], None)
+
+    monkeypatch.chdir(tmp_path)
+    with CheckpointJournal("checkpoint.jsonl") as checkpoint:
+        # Retinol was searched before and had no papers; Niacinamide is done but stale
+        checkpoint.commit(["Retinol", "Niacinamide"], total_papers=1)
+
+    searched = []
+
+    async def search(client, ingredient, limit):
+        searched.append(ingredient)
+        return []
+
+    monkeypatch.setattr(populate_papers, "search_semantic_scholar", search)
+    monkeypatch.setattr(sys, "argv", ["populate_papers.py", "--incremental", "--max-age-days", "30",
+                                      "--no-cache", "--rps", "1000"])
+    populate_papers.main()
+
+    assert sorted(searched) == ["Niacinamide", "Squalane", "Urea", "Water"]
@@ -0,0 +1,175 @@
+"""
+Parity of the vectorized process_ingredients.py steps with the original row-by-row code
+
+The reference implementations below are the original STEP 2 helpers, STEP 3 expansion and
+STEP 6 join table build, kept here (not in the pipeline) as the definition of correct output.
+"""
+
+import filecmp
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingredient_normalizer import ACRONYMS, PARENTHESES_PATTERN, TRAILING_PUNCTUATION, Normalizer
+from process_ingredients import (OUTPUT_FILES, assign_ids, build_join_table, dedupe_join_table, expand_products,
+                                 export_tables, load_products, process, process_streaming, unique_ingredients)
+
+
+# ---------- Reference implementations (original code) ----------
+def remove_parentheses(text):
+    """Remove anything inside parentheses () including the parentheses."""
+    return re.sub(PARENTHESES_PATTERN, '', text)
+
+def title_case_ingredient(name):
+    """Title case each word, keeping common cosmetic acronyms uppercase."""
+    if name and len(name) > 1:
+        # Keep common cosmetic acronyms uppercase
+        words = name.split()
+        for i, word in enumerate(words):
+            if any(word.upper().startswith(acr) for acr in ACRONYMS):
+                words[i] = word.upper()
+            else:
+                words[i] = word.title()
+        name = ' '.join(words)
+
+    return name if name else None
+
+def normalize_ingredient(name):
+    """Clean spacing and unify formatting."""
+    if not isinstance(name, str):
+        return None
+
+    # Remove parentheses content
+    name = remove_parentheses(name)
+
+    # Remove extra whitespace and normalize spaces
+    name = ' '.join(name.split())
+
+    # Remove trailing punctuation
+    name = name.rstrip(TRAILING_PUNCTUATION)
+
+    # Title case for consistency (preserves common acronyms)
+    return title_case_ingredient(name)
+
+def split_ingredients(cell):
+    """Split ingredients by comma and clean them."""
+    if not isinstance(cell, str):
+        return []
+
+    items = cell.split(',')
+    cleaned = [normalize_ingredient(i) for i in items]
+    # remove empty or None
+    return [x for x in cleaned if x]
+
+def expand_products_loop(df):
+    """Reference row-by-row expansion."""
+    records = []
+    for idx, row in df.iterrows():
+        product_name = row["product_name"]
+        ingredient_cell = row["ingredients"]
+        ingredients = split_ingredients(ingredient_cell)
+
+        # Track position for each ingredient (important for concentration)
+        for position, ing in enumerate(ingredients, 1):
+            records.append({
+                "product_name": product_name,
+                "ingredient": ing,
+                "position": position  # Added: position in ingredient list
+            })
+
+    return pd.DataFrame(records)
+
+def build_join_table_loop(expanded_df, product_ids, ingredient_ids):
+    """Reference row-by-row join table build."""
+    join_rows = []
+    for _, row in expanded_df.iterrows():
+        join_rows.append({
+            "product_id": product_ids[row["product_name"]],
+            "ingredient_id": ingredient_ids[row["ingredient"]],
+            "position": row["position"]  # Added: preserve position info
+        })
+
+    return dedupe_join_table(pd.DataFrame(join_rows))
+
+
+# ---------- Tests ----------
+@pytest.fixture
+def catalog(catalog_path):
+    return load_products(catalog_path)
+
+
+def test_normalizer_matches_reference(catalog):
+    normalizer = Normalizer()
+    cells = catalog["ingredients"][catalog["ingredients"].map(lambda c: isinstance(c, str))]
+    tokens = list(cells.str.split(',').explode()) + ["peg-40 hydrogenated castor oil (emulsifier)", "", "  ", "."]
+    for token in tokens:
+        assert normalizer(token) == normalize_ingredient(token), token
+
+
+def test_expand_products_matches_loop(catalog):
+    pd.testing.assert_frame_equal(expand_products(catalog), expand_products_loop(catalog),
+                                  check_dtype=False, check_index_type=False)
+
+
+def test_join_table_matches_loop(catalog):
+    expanded_df = expand_products(catalog)
+    unique_ingredients_df, _ = unique_ingredients(expanded_df)
+    product_ids, ingredient_ids = assign_ids(catalog["product_name"].unique(), unique_ingredients_df["ingredient"])
+    pd.testing.assert_frame_equal(
+        build_join_table(expanded_df, product_ids, ingredient_ids),
+        build_join_table_loop(expand_products_loop(catalog), product_ids, ingredient_ids),
+        check_dtype=False,
+    )
+
+
+def test_unique_ingredients_counts_match_value_counts(catalog):
+    expanded_df = expand_products(catalog)
+    unique_ingredients_df, stats = unique_ingredients(expanded_df)
+    expected = expanded_df["ingredient"].value_counts()
+    assert list(unique_ingredients_df["ingredient"]) == list(expanded_df["ingredient"].drop_duplicates())
+    assert np.array_equal(unique_ingredients_df["product_count"], expected[unique_ingredients_df["ingredient"]])
+
+
+def assert_same_tables(expected_dir, actual_dir):
+    _, mismatch, errors = filecmp.cmpfiles(expected_dir, actual_dir, OUTPUT_FILES, shallow=False)
+    assert not mismatch + errors
+
+
+@pytest.fixture
+def batch_dir(catalog_path, tmp_path):
+    """The serial batch run's tables: the output every other mode must reproduce byte for byte"""
+    output_dir = tmp_path / "batch"
+    output_dir.mkdir()
+    export_tables(*process(load_products(catalog_path))[:3], str(output_dir))
+    return output_dir
+
+
+def test_parallel_output_is_byte_identical(catalog_path, batch_dir, tmp_path):
+    output_dir = tmp_path / "parallel"
+    output_dir.mkdir()
+    export_tables(*process(load_products(catalog_path), workers=2)[:3], str(output_dir))
+    assert_same_tables(batch_dir, output_dir)
+
+
+@pytest.mark.parametrize("chunksize, workers", [(4, 1), (5, 2), (100, 1)])
+def test_streaming_output_is_byte_identical(catalog_path, batch_dir, tmp_path, chunksize, workers):
+    output_dir = tmp_path / "streamed"
+    output_dir.mkdir()
+    process_streaming(catalog_path, chunksize, str(output_dir), workers)
+    assert_same_tables(batch_dir, output_dir)
+
+
+def test_streaming_rejects_missing_category_column(catalog_path, tmp_path):
+    with pytest.raises(ValueError, match="no column 'shade'"):
+        process_streaming(catalog_path, 4, str(tmp_path), stats=True, category_column="shade")
+    assert not list(tmp_path.iterdir())  # checked before anything is written
+
+
+def test_streaming_counts_categories(catalog_path, tmp_path):
+    process_streaming(catalog_path, 4, str(tmp_path), stats=True, category_column="brand")
+    counts = pd.read_csv(tmp_path / "ingredient_category_counts.csv")
+    ingredients = pd.read_csv(tmp_path / "ingredients.csv")
+    glycerin = ingredients.loc[ingredients["ingredient_name"] == "Glycerin", "ingredient_id"].item()
+    assert sorted(counts.loc[counts["ingredient_id"] == glycerin, "category"]) == ["Acme"]
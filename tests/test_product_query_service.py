@@ -0,0 +1,137 @@
+"""
+Product query service over the fixture catalog's tables: ProductIndex.query against plain
+Python set filters, and the HTTP API
+"""
+
+import json
+import threading
+import urllib.request
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from process_ingredients import load_products, process
+from product_query_service import ProductIndex, serve
+
+
+@pytest.fixture(scope="module")
+def base_url(catalog_path):
+    server = serve(ProductIndex(*process(load_products(catalog_path))[:3]), 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+
+@pytest.mark.parametrize("name", ["Sodium Hyaluronate", "Caprylic/Capric Triglyceride"])
+def test_ingredient_path_segment_is_unquoted(base_url, name):
+    by_path = get(f"{base_url}/ingredients/{quote(name, safe='')}/products")
+    by_query = get(f"{base_url}/products?with={quote(name, safe='')}")
+    assert by_path["total"] == by_query["total"] > 0
+    assert [row["product_id"] for row in by_path["data"]] == [row["product_id"] for row in by_query["data"]]
+
+
+# ---------- ProductIndex.query ----------
+def random_tables(n_products=3000, n_ingredients=40, seed=0):
+    """Tables large enough that the sorted-array (not bitmap) set operations run too."""
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, n_ingredients + 1)
+    rows = []
+    for p in range(n_products):
+        size = rng.integers(0, 12)
+        chosen = rng.choice(n_ingredients, size=size, replace=False, p=popularity / popularity.sum())
+        rows += [(f"p{p}", f"i{i}", position) for position, i in enumerate(chosen, 1)]
+    join_table = pd.DataFrame(rows, columns=["product_id", "ingredient_id", "position"])
+    sizes = join_table.groupby("product_id").size()
+    products = pd.DataFrame({"product_id": [f"p{p}" for p in range(n_products)],
+                             "product_name": [f"Product {rng.integers(n_products // 2)}" for _ in range(n_products)]})
+    products["ingredient_count"] = products["product_id"].map(sizes)
+    ingredients = pd.DataFrame({"ingredient_id": [f"i{i}" for i in range(n_ingredients)],
+                                "ingredient_name": [f"Ingredient {i}" for i in range(n_ingredients)]})
+    return products, ingredients, join_table
+
+
+@pytest.fixture(scope="module", params=["fixture", "random"])
+def tables(request, catalog_path):
+    if request.param == "fixture":
+        return process(load_products(catalog_path))[:3]
+    return random_tables()
+
+
+def brute_force(tables, with_, any_, without, sort):
+    """Product ids matching the filters in `sort` order, by set operations on the join table."""
+    products, ingredients, join_table = tables
+    ids = dict(zip(ingredients["ingredient_name"], ingredients["ingredient_id"]))
+    contents = {product_id: {} for product_id in products["product_id"]}
+    for product_id, ingredient_id, position in join_table.itertuples(index=False):
+        contents[product_id].setdefault(ingredient_id, position)
+
+    required = {ids[name] for name in with_}
+    optional = {ids[name] for name in any_}
+    excluded = {ids[name] for name in without}
+    matches = [product_id for product_id, found in contents.items()
+               if required <= found.keys() and (not optional or optional & found.keys())
+               and not excluded & found.keys()]
+
+    # Ties are broken by product name, then by the product's place in the table
+    rows = products.reset_index(drop=True)
+    name_order = {product_id: (name, row) for row, (product_id, name)
+                  in enumerate(zip(rows["product_id"], rows["product_name"]))}
+    if sort == "name":
+        score = {product_id: 0 for product_id in matches}
+    elif sort == "ingredient_count":
+        counts = dict(zip(rows["product_id"], rows["ingredient_count"].fillna(0)))
+        score = {product_id: counts[product_id] for product_id in matches}
+    else:
+        ranked_by = required or optional
+        score = {product_id: sum(contents[product_id].get(code, 32767) for code in ranked_by)
+                 for product_id in matches}
+    return sorted(matches, key=lambda product_id: (score[product_id], name_order[product_id]))
+
+
+def names_by_popularity(tables):
+    products, ingredients, join_table = tables
+    counts = join_table["ingredient_id"].value_counts()
+    ordered = ingredients.assign(count=ingredients["ingredient_id"].map(counts).fillna(0))
+    return ordered.sort_values("count", ascending=False, kind="stable")["ingredient_name"].tolist()
+
+
+FILTERS = [
+    # (with, any, without) as indices into the ingredient names, most used first
+    ((0,), (), ()),
+    ((2,), (), (0,)),
+    ((0, 1), (), ()),
+    ((0, 1, 2), (), (3,)),
+    ((), (1, 2), ()),
+    ((), (2, 3, 4), (0,)),
+    ((0,), (1, 3), ()),
+    ((1,), (2, 4), (0, 3)),
+    ((0, -1), (), ()),            # the least used ingredient: tiny or empty intersections
+]
+
+
+@pytest.mark.parametrize("sort", ["position", "name", "ingredient_count"])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_query_matches_set_filters(tables, filters, sort):
+    index = ProductIndex(*tables)
+    names = names_by_popularity(tables)
+    with_, any_, without = ([names[i] for i in group] for group in filters)
+    expected = brute_force(tables, with_, any_, without, sort)
+    listed = {(product_id, ingredient_id): position for product_id, ingredient_id, position
+              in tables[2].iloc[::-1].itertuples(index=False)}  # first position of a repeated ingredient
+
+    for offset, limit in [(0, 1000), (0, 3), (2, 5), (len(expected) - 1, 10), (len(expected) + 5, 10)]:
+        offset = max(offset, 0)
+        total, page, shown = index.query(with_, any_, without, sort=sort, offset=offset, limit=limit)
+        assert total == len(expected)
+        assert index.product_ids[page].tolist() == expected[offset:offset + limit]
+        for code, positions in shown.items():
+            assert positions.tolist() == [listed.get((product_id, index.ingredient_ids[code]), -1)
+                                          for product_id in index.product_ids[page]]
@@ -0,0 +1,104 @@
+"""
+ResponseCache TTL, LRU eviction and storage, and the offline client that reads from it
+"""
+
+import asyncio
+import json
+import sqlite3
+import types
+import zlib
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import response_cache
+from response_cache import EVICT_TO, ResponseCache
+from semantic_scholar import SemanticScholarClient
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable replacement for the cache's time.time()"""
+    now = types.SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(response_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    key = cache.key("GET", "https://api/paper/search", {"query": "glycerin", "limit": 20})
+    cache.put(key, {"data": [1]})
+
+    clock.value += 60
+    assert cache.get(key) == {"data": [1]}
+    clock.value += 1
+    assert cache.get(key) is None
+    assert cache.get(key, allow_expired=True) == {"data": [1]}  # what offline mode reads
+    assert cache.cache_info()["hits"] == 2 and cache.cache_info()["misses"] == 1
+
+
+def test_key_ignores_parameter_order():
+    assert ResponseCache.key("get", "u", {"a": 1, "b": 2}) == ResponseCache.key("GET", "u", {"b": 2, "a": 1})
+    assert ResponseCache.key("GET", "u", {"a": 1}) != ResponseCache.key("GET", "u", {"a": 2})
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    body = {"data": "x" * 200}
+    size = len(zlib.compress(json.dumps(body, separators=(",", ":")).encode()))
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=3600, max_bytes=5 * size)
+    for i in range(5):
+        clock.value += 1
+        cache.put(f"k{i}", body)
+    assert cache.cache_info()["entries"] == 5
+
+    clock.value += 1
+    cache.get("k0")  # now the most recently used
+    clock.value += 1
+    cache.put("k5", body)  # over max_bytes: evict the oldest accesses down to EVICT_TO
+
+    kept = {f"k{i}" for i in range(6) if cache.get(f"k{i}") is not None}
+    assert kept == {"k0", "k3", "k4", "k5"}
+    assert cache.bytes == 4 * size <= 5 * size * EVICT_TO
+    assert cache.cache_info()["bytes"] == cache.bytes
+
+
+def test_bodies_are_zlib_json_and_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    data = {"total": 2, "data": [{"paperId": "a1", "title": "Niacinamide – 5 %", "authors": [{"name": "Müller"}]},
+                                 {"paperId": "b2", "title": None, "year": 2021}]}
+    cache = ResponseCache(path)
+    cache.put("key", data)
+    cache.close()
+
+    (body,) = sqlite3.connect(path).execute("SELECT body FROM responses WHERE key = 'key'").fetchone()
+    assert json.loads(zlib.decompress(body)) == data
+    reopened = ResponseCache(path)
+    assert reopened.get("key") == data
+    assert reopened.bytes == len(body)
+
+
+def test_offline_miss_returns_none_without_a_request(tmp_path):
+    requests = []
+
+    async def search(request):
+        requests.append(request)
+        return web.json_response({"data": []})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", search)
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+        async with TestServer(app) as server:
+            url = str(server.make_url("/paper/search"))
+            cache.put(cache.key("GET", url, {"query": "water"}), {"data": ["cached"]})
+            async with SemanticScholarClient(rate=1000, log=lambda message: None, cache=cache,
+                                             offline=True) as client:
+                hit = await client.request("GET", url, "water", params={"query": "water"})
+                miss = await client.request("GET", url, "glycerin", params={"query": "glycerin"})
+                return hit, miss, client.requests
+
+    hit, miss, sent = asyncio.run(main())
+    assert hit == {"data": ["cached"]}
+    assert miss is None
+    assert sent == 0 and requests == []
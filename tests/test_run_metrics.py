@@ -0,0 +1,77 @@
+"""
+Histogram quantile interpolation and the windowed ETA of run_metrics.py
+"""
+
+import types
+
+import pytest
+
+import run_metrics
+from run_metrics import Histogram, ThroughputEta, format_duration
+
+
+@pytest.fixture
+def histogram():
+    histogram = Histogram([0.1, 0.5, 1.0])
+    for value in [0.02, 0.05, 0.08, 0.1,   # (0, 0.1]: a value on a bound belongs to that bucket
+                  0.2, 0.3, 0.4, 0.5,      # (0.1, 0.5]
+                  0.7, 0.9]:               # (0.5, 1.0]
+        histogram.observe(value)
+    return histogram
+
+
+@pytest.mark.parametrize("q, expected", [
+    (0.2, 0.05),   # rank 2 of the 4 in (0, 0.1]
+    (0.4, 0.1),    # the last one in the first bucket
+    (0.5, 0.2),    # rank 1 of the 4 in (0.1, 0.5]
+    (0.9, 0.75),   # rank 1 of the 2 in (0.5, 1.0]
+    (1.0, 1.0),
+])
+def test_quantile_interpolates_inside_the_bucket(histogram, q, expected):
+    assert histogram.quantile(q) == pytest.approx(expected)
+
+
+def test_quantile_edge_cases(histogram):
+    assert Histogram([1.0]).quantile(0.5) == 0.0  # nothing observed
+    histogram.observe(30.0)  # +Inf bucket: no upper bound to interpolate towards
+    assert histogram.quantile(1.0) == 1.0
+    assert histogram.counts == [4, 4, 2, 1]
+    assert histogram.snapshot()["buckets"] == {"0.1": 4, "0.5": 4, "1.0": 2, "+Inf": 1}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable replacement for run_metrics' time.monotonic()"""
+    now = types.SimpleNamespace(value=0.0)
+    monkeypatch.setattr(run_metrics, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_eta_uses_only_the_recent_window(clock):
+    eta = ThroughputEta(total=100, window=60)
+    assert eta.rate() == 0.0 and eta.seconds_left() is None
+
+    for clock.value, done in [(30, 30), (60, 60)]:  # 1/s
+        eta.update(done)
+    assert eta.rate() == pytest.approx(1.0)
+
+    for clock.value, done in [(90, 70), (120, 80)]:  # slowed to 1/3 per second
+        eta.update(done)
+    # Samples older than the window are evicted, so the first minute's pace no longer counts
+    assert [t for t, _ in eta.samples] == [60, 90, 120]
+    assert eta.rate() == pytest.approx(1 / 3)
+    assert eta.seconds_left() == pytest.approx(60)
+
+
+def test_eta_after_a_stall_keeps_two_samples(clock):
+    eta = ThroughputEta(total=100, window=60)
+    for clock.value, done in [(30, 30), (60, 60), (1000, 60)]:
+        eta.update(done)
+    assert list(eta.samples) == [(60, 60), (1000, 60)]
+    assert eta.rate() == 0.0
+    assert format_duration(eta.seconds_left()) == "unknown"
+
+
+def test_format_duration():
+    assert format_duration(75) == "1m15s"
+    assert format_duration(3 * 3600 + 125) == "3h02m"
@@ -0,0 +1,66 @@
+"""
+SemanticScholarClient retries against a local aiohttp server
+"""
+
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from semantic_scholar import SemanticScholarClient
+
+BACKOFF = 0.1
+
+
+def run_client(responses, **kwargs):
+    """(client result, request count, seconds taken) of one GET answered by `responses` in turn"""
+    requests = []
+
+    async def search(request):
+        requests.append(request)
+        status, headers = responses[min(len(requests), len(responses)) - 1]
+        return web.json_response({"data": []}, status=status, headers=headers)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", search)
+        async with TestServer(app) as server:
+            async with SemanticScholarClient(rate=1000, log=lambda message: None, rate_limit_backoff=BACKOFF,
+                                             **kwargs) as client:
+                started = time.perf_counter()
+                data = await client.request("GET", str(server.make_url("/paper/search")), "search")
+                return data, len(requests), time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def test_rate_limit_without_retry_after_backs_off_exponentially():
+    data, sent, seconds = run_client([(429, {}), (429, {}), (200, {})])
+    assert data == {"data": []}
+    assert sent == 3
+    assert seconds >= BACKOFF + 2 * BACKOFF
+
+
+def test_retry_after_takes_precedence():
+    data, sent, seconds = run_client([(429, {"Retry-After": "0"}), (200, {})])
+    assert data == {"data": []}
+    assert seconds < BACKOFF
+
+
+def test_exhausted_retries_return_none():
+    data, sent, _ = run_client([(429, {"Retry-After": "0"})], max_retries=2)
+    assert data is None
+    assert sent == 3
+
+
+def test_permanent_client_error_is_an_empty_result():
+    data, sent, _ = run_client([(400, {}), (200, {})])
+    assert data == {}  # not None: the name is checkpointed instead of searched again every run
+    assert sent == 1
+
+
+def test_server_errors_are_retried():
+    data, sent, _ = run_client([(503, {}), (200, {})])
+    assert data == {"data": []}
+    assert sent == 2